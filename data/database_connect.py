@@ -1,19 +1,57 @@
 import pandas as pd
+import numpy as np
+import io
 import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+import sys
+import time
+import json
+from concurrent.futures import ThreadPoolExecutor
 
-load_dotenv()
+# File location
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_DIR = os.path.join(BASE_DIR, '..', 'src', 'csv')
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src', 'backtest'))
+from price_store import (
+    MANIFEST, ROOT_STORE_DIR, append_store, convert_csv_sector, open_store, read_csv_prices, write_store,
+)
 
-# Get environment variables
-DB_CONN = os.environ.get('DB_CONNECTION')
+# cluster, db and ticker_collection are created on first use (see connect), so
+# importing this module neither reads .env nor imports pymongo
+DB_NAME = "sector_historical_data"
+COLLECTION_NAME = "ticker_data"
+_LAZY_NAMES = ('DB_CONN', 'cluster', 'db', 'ticker_collection')
 
-cluster = MongoClient(DB_CONN)
-db = cluster["sector_historical_data"]
-ticker_collection = db["ticker_data"]
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Adj Close']
+# Compound index the bulk loader's match + sort can walk without an in-memory sort
+SECTOR_INDEX = [("Sector", 1), ("TickerSymbol", 1), ("Date", 1)]
+
+def connect():
+    """
+    Function to read .env and open the Atlas client, once per process
+    Returns the ticker collection
+    """
+    if 'ticker_collection' not in globals():
+        from pymongo import MongoClient
+        from dotenv import load_dotenv
+        load_dotenv()
+        # Get environment variables
+        global DB_CONN, cluster, db, ticker_collection
+        DB_CONN = os.environ.get('DB_CONNECTION')
+        cluster = MongoClient(DB_CONN)
+        db = cluster[DB_NAME]
+        ticker_collection = db[COLLECTION_NAME]
+    return ticker_collection
+
+def __getattr__(name):
+    # database_connect.ticker_collection (and cluster, db) still work, connecting on first access
+    if name in _LAZY_NAMES:
+        connect()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_stock_data_sector(sector):
     data = {}
+    ticker_collection = connect()
 
     # Step 1: Extract unique tickers for the given sector
     sector_tickers = ticker_collection.distinct("TickerSymbol", {"Sector": sector})
@@ -55,13 +93,338 @@ def get_stock_data_sector(sector):
 
     return data
 
+def ensure_indexes(collection=None):
+    """
+    Function to create the (Sector, TickerSymbol, Date) index used by the bulk loader
+    """
+    collection = connect() if collection is None else collection
+    return collection.create_index(SECTOR_INDEX)
+
+def check_indexes(collection=None):
+    """
+    Function to print a recommendation when the sector index is missing
+    """
+    collection = connect() if collection is None else collection
+    indexed = [[tuple(key) for key in info['key']] for info in collection.index_information().values()]
+    if SECTOR_INDEX not in indexed:
+        print("Recommended index missing: create (Sector, TickerSymbol, Date) with ensure_indexes()")
+        return False
+    return True
+
+def _sector_query(sector, start=None, end=None, ticker=None):
+    """
+    Function to build the filter for a sector (optionally one ticker) and [start, end) dates
+    """
+    query = {"Sector": sector}
+    if ticker is not None:
+        query["TickerSymbol"] = ticker
+    date_range = {}
+    if start is not None:
+        date_range["$gte"] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        date_range["$lt"] = pd.Timestamp(end).to_pydatetime()
+    if date_range:
+        query["Date"] = date_range
+    return query
+
+def _read_columns(cursor):
+    """
+    Function to drain a cursor into one list per field instead of a list of documents
+    """
+    fields = ['TickerSymbol', 'Date'] + PRICE_FIELDS
+    columns = {field: [] for field in fields}
+    appends = [(field, columns[field].append) for field in fields]
+    for doc in cursor:
+        for field, append in appends:
+            append(doc.get(field))
+    return columns
+
+def _columns_to_frames(columns):
+    """
+    Function to split ticker-sorted columns into {ticker: DataFrame}
+    """
+    data = {}
+    symbols = np.asarray(columns['TickerSymbol'])
+    if len(symbols) == 0:
+        return data
+    # Rows arrive sorted by ticker, so each ticker is one contiguous run
+    starts = np.flatnonzero(np.concatenate([[True], symbols[1:] != symbols[:-1]]))
+    ends = np.append(starts[1:], len(symbols))
+    dates = pd.to_datetime(columns['Date'])
+
+    for first, last in zip(starts, ends):
+        ticker = str(symbols[first])
+        try:
+            values = {}
+            for field in PRICE_FIELDS:
+                # Per ticker so dtypes are inferred the same way get_stock_data_sector does
+                array = np.asarray(columns[field][first:last])
+                if array.dtype == object:
+                    # Missing values come back as None
+                    array = pd.to_numeric(array)
+                values[field] = array
+            index = pd.DatetimeIndex(dates[first:last], name='Date')
+            data[ticker] = pd.DataFrame(values, index=index, columns=PRICE_FIELDS)
+        except Exception as e:
+            print(f"Error processing data for {ticker}: {e}")
+    return data
+
+def get_stock_data_sector_bulk(sector, start=None, end=None, collection=None,
+                               batch_size=10000, concurrent=False, max_workers=8):
+    """
+    Function to load a whole sector with one projected cursor
+    - start / end: optional date range, filtered on the server (end is exclusive)
+    - batch_size: documents per cursor round trip
+    - concurrent: run one cursor per ticker on a thread pool sharing the client's
+      connection pool instead of a single sector-wide cursor
+    Returns the same {ticker: DataFrame} dict as get_stock_data_sector
+    """
+    collection = connect() if collection is None else collection
+    started = time.perf_counter()
+    projection = {"_id": 0, "TickerSymbol": 1, "Date": 1, **{field: 1 for field in PRICE_FIELDS}}
+    # Sorting on the index keys lets the server walk (Sector, TickerSymbol, Date) in order
+    sort = [("TickerSymbol", 1), ("Date", 1)]
+
+    def read(query):
+        cursor = collection.find(query, dict(projection), batch_size=batch_size).sort(sort)
+        return _columns_to_frames(_read_columns(cursor))
+
+    if concurrent:
+        sector_tickers = sorted(collection.distinct("TickerSymbol", {"Sector": sector}))
+        data = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for ticker_data in pool.map(lambda ticker: read(_sector_query(sector, start, end, ticker)), sector_tickers):
+                data.update(ticker_data)
+    else:
+        data = read(_sector_query(sector, start, end))
+
+    elapsed = time.perf_counter() - started
+    rows = sum(len(df) for df in data.values())
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Loaded {rows} rows for {len(data)} {sector} tickers in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return data
+
+def _csv_last_date(csv_path):
+    """
+    Function to read the date of the last row of a CSV without parsing the whole file
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        first = line.split(b',', 1)[0].decode()
+        if first and first != 'Date':
+            return pd.Timestamp(first)
+    return None
+
+def _repair_csv_tail(csv_path):
+    """
+    Function to cut a torn last line (no trailing newline) off a CSV, as left by
+    an append that was killed part way; the next sync fetches those bars again
+    Returns True when the file was cut
+    """
+    with open(csv_path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return False
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return False
+        # Back to the end of the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return True
+            end = start
+        f.truncate(0)
+        return True
+
+def _load_sync_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_sync_state(state, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+def _local_last_dates(sector, state, csv_dir):
+    """
+    Function to find the last stored date per ticker
+    - Uses the sync state when the CSV has not changed since it was recorded,
+      otherwise reads the tail of the CSV
+    """
+    last_dates = {}
+    sector_dir = os.path.join(csv_dir, sector)
+    for name in os.listdir(sector_dir):
+        if not name.endswith('_data_his.csv'):
+            continue
+        ticker = name[:-len('_data_his.csv')]
+        csv_path = os.path.join(sector_dir, name)
+        stat = os.stat(csv_path)
+        entry = state.get(ticker)
+        if entry and entry.get('stat') == [stat.st_mtime_ns, stat.st_size]:
+            last_dates[ticker] = pd.Timestamp(entry['last_date'])
+        else:
+            if _repair_csv_tail(csv_path):
+                print(f"Cut a torn last line off {name}")
+            last_dates[ticker] = _csv_last_date(csv_path)
+    return last_dates
+
+def _append_csv(csv_path, df):
+    """
+    Function to append rows to the end of a CSV in place
+    - Only the new rows are written; if the write fails the file is truncated
+      back to its previous size, and a line torn by a kill is cut off by
+      _repair_csv_tail on the next sync
+    Returns (number of bytes written, the rows as reading the CSV gives them back)
+    """
+    # repr keeps the shortest round-trip digits, the default format drops the 17th
+    text = df.to_csv(index_label='Date', float_format=lambda value: repr(float(value)))
+    # Parsed like convert_csv_sector parses the whole file, so the store matches it
+    rows = pd.read_csv(io.StringIO(text), parse_dates=['Date']).set_index('Date')
+    if os.path.exists(csv_path):
+        text = text.split('\n', 1)[1]
+    data = text.encode()
+    with open(csv_path, 'ab') as f:
+        size = f.tell()
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(size)
+            raise
+    return len(data), rows
+
+def sync_sector(sector, collection=None, csv_dir=CSV_DIR, store_dir=None):
+    """
+    Function to bring the local CSVs and price store up to date with new bars only
+    - Asks the server for each ticker's latest date and skips tickers with nothing new
+    - Fetches only the bars after the last stored date, in one projected cursor
+    - Appends them to the end of each CSV and writes only those tickers' new rows
+      into the price store (built from the CSVs when there is none yet)
+    Returns a summary dict (tickers checked/updated/skipped, rows and bytes)
+    """
+    import bson
+    collection = connect() if collection is None else collection
+    started = time.perf_counter()
+    store_dir = store_dir or os.path.join(ROOT_STORE_DIR, sector)
+    state_path = os.path.join(store_dir, 'sync_state.json')
+    state = _load_sync_state(state_path)
+    os.makedirs(os.path.join(csv_dir, sector), exist_ok=True)
+    local_last = _local_last_dates(sector, state, csv_dir)
+    # Checked before the CSVs change: new bars go straight into the store only for
+    # tickers whose stored bars are the CSV's as it is now (not stale, same last date)
+    store = open_store(sector, store_dir)
+    in_step = set()
+    if store is not None:
+        for ticker in store.tickers:
+            dates, _ = store.arrays(ticker)
+            if (not store.is_stale(ticker) and len(dates) and local_last.get(ticker) is not None
+                    and pd.Timestamp(dates[-1]) == local_last[ticker]):
+                in_step.add(ticker)
+        del store
+
+    # One small aggregation instead of pulling any bars for unchanged tickers
+    remote_last = {
+        doc['_id']: pd.Timestamp(doc['last'])
+        for doc in collection.aggregate([
+            {"$match": {"Sector": sector}},
+            {"$group": {"_id": "$TickerSymbol", "last": {"$max": "$Date"}}},
+        ])
+    }
+    stale = sorted(ticker for ticker, last in remote_last.items()
+                   if local_last.get(ticker) is None or last > local_last[ticker])
+
+    summary = {
+        'tickers': len(remote_last),
+        'updated': 0,
+        'skipped': len(remote_last) - len(stale),
+        'rows': 0,
+        'bytes_transferred': 0,
+        'bytes_written': 0,
+    }
+    new_bars = {}
+    if stale:
+        clauses = []
+        for ticker in stale:
+            clause = {"TickerSymbol": ticker}
+            if local_last.get(ticker) is not None:
+                clause["Date"] = {"$gt": local_last[ticker].to_pydatetime()}
+            clauses.append(clause)
+        projection = {"_id": 0, "TickerSymbol": 1, "Date": 1, **{field: 1 for field in PRICE_FIELDS}}
+        cursor = collection.find({"Sector": sector, "$or": clauses}, projection, batch_size=10000)
+        cursor = cursor.sort([("TickerSymbol", 1), ("Date", 1)])
+
+        def counted(docs):
+            for doc in docs:
+                summary['bytes_transferred'] += len(bson.encode(doc))
+                yield doc
+
+        new_bars = _columns_to_frames(_read_columns(counted(cursor)))
+        for ticker, df in new_bars.items():
+            csv_path = os.path.join(csv_dir, sector, f"{ticker}_data_his.csv")
+            written, new_bars[ticker] = _append_csv(csv_path, df)
+            summary['bytes_written'] += written
+            summary['rows'] += len(df)
+            summary['updated'] += 1
+            print(f"Appended {len(df)} rows for {ticker}")
+
+    # Record what is stored now so the next run can skip reading the CSVs
+    for ticker in set(local_last) | set(remote_last):
+        csv_path = os.path.join(csv_dir, sector, f"{ticker}_data_his.csv")
+        if not os.path.exists(csv_path):
+            continue
+        stat = os.stat(csv_path)
+        if ticker in new_bars:
+            last = new_bars[ticker].index[-1]
+        else:
+            last = local_last.get(ticker) or _csv_last_date(csv_path)
+        state[ticker] = {'last_date': last.isoformat(), 'stat': [stat.st_mtime_ns, stat.st_size]}
+    _save_sync_state(state, state_path)
+
+    if summary['updated']:
+        if os.path.exists(os.path.join(store_dir, MANIFEST)):
+            sources = {ticker: os.path.join(csv_dir, sector, f"{ticker}_data_his.csv") for ticker in new_bars}
+            # New, stale or out of step tickers get their whole history from the CSV
+            replace = {ticker: read_csv_prices(sources[ticker]) for ticker in new_bars if ticker not in in_step}
+            appended = {ticker: df for ticker, df in new_bars.items() if ticker in in_step}
+            append_store(appended, sector, store_dir=store_dir, sources=sources, replace=replace)
+        else:
+            convert_csv_sector(sector, source_dir=csv_dir, store_dir=store_dir)
+
+    summary['seconds'] = time.perf_counter() - started
+    print(f"Synced {sector}: {summary['updated']} updated, {summary['skipped']} unchanged, "
+          f"{summary['rows']} rows, {summary['bytes_transferred']:,} bytes transferred, "
+          f"{summary['bytes_written']:,} bytes written in {summary['seconds']:.2f}s")
+    return summary
+
 if __name__ == "__main__":
+    # python database_connect.py [--sync]
     sector = "HealthCare"
-    data = get_stock_data_sector(sector)
+    check_indexes()
+    if '--sync' in sys.argv:
+        sync_sector(sector)
+        sys.exit()
 
-for ticker, df in data.items():
-    filename = f"{ticker}.csv"
-    df.to_csv(f'../csv/HealthCare/{ticker}_data_his.csv')
-    print(f"Saved data for {ticker} to {filename}")
+    data = get_stock_data_sector_bulk(sector)
 
+    for ticker, df in data.items():
+        filename = f"{ticker}.csv"
+        df.to_csv(os.path.join(CSV_DIR, sector, f'{ticker}_data_his.csv'))
+        print(f"Saved data for {ticker} to {filename}")
 
+    # Also refresh the columnar price store read by the backtest
+    sources = {ticker: os.path.join(CSV_DIR, sector, f'{ticker}_data_his.csv') for ticker in data}
+    write_store(data, sector, sources=sources)
+    print(f"Saved {len(data)} tickers to the {sector} price store")
@@ -1,8 +1,13 @@
 import pandas as pd
 import os
+import sys
+import logging
 import numpy as np
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
+from indicators import IndicatorPipeline, ema, sma, wilder_rsi
+from indicator_cache import DiskCache
+from price_store import open_store
+from trade_simulator import simulate_trades
+from instrumentation import log, stage, count, instrumented_run
 
 
 # File location
@@ -16,6 +21,12 @@ tickers = [ "LLY", "UNH", "JNJ", "ABBV", "MRK", "ABT", "TMO", "ISRG", "AMGN", "D
             "MCK", "REGN", "CVS", "BDX", "HCA", "EW", "COR", "A", "GEHC", "RMD",
             "HUM", "IQV",] 
 
+# Evaluation settings
+COMMS = 0.008  # 0.8% commission fee
+INITIAL_BALANCE = 5000
+DRAWDOWN_THRESHOLD = -0.10
+MAX_HOLD_DAYS = 14  # max 14 day holding period
+
 # Get the test data from the csv folder 
 def get_stock_data_csv(tickers):
     data = {}
@@ -23,23 +34,48 @@ def get_stock_data_csv(tickers):
         csv_path = os.path.join(ROOT_DATA_DIR, sector, f"{ticker}_data_his.csv")
         
         try:
-            df = pd.read_csv(csv_path, parse_dates=['Date'])
-            df.set_index('Date', inplace=True)
+            with stage('load', ticker):
+                df = pd.read_csv(csv_path, parse_dates=['Date'])
+                df.set_index('Date', inplace=True)
             data[ticker] = df
         except Exception as e:
-            print(f"Error reading {ticker}.csv, Error:{e}")
-            print(f"File not found: {csv_path}")
+            log.warning("Error reading %s.csv, Error:%s", ticker, e)
+            log.warning("File not found: %s", csv_path)
     
     return data
 
 
+def get_stock_data(tickers):
+    """
+    Function to load stock data from the columnar price store (see price_store.py),
+    falling back to the CSV files for tickers that are missing or stale in the store
+    """
+    store = open_store(sector)
+    if store is None:
+        return get_stock_data_csv(tickers)
+
+    data = {}
+    csv_tickers = []
+    for ticker in tickers:
+        if ticker in store and not store.is_stale(ticker):
+            with stage('load', ticker):
+                data[ticker] = store.frame(ticker)
+        else:
+            csv_tickers.append(ticker)
+    data.update(get_stock_data_csv(csv_tickers))
+    # Keep the caller's ticker order
+    return {ticker: data[ticker] for ticker in tickers if ticker in data}
+
+
 def calculate_ema(data, ema_periods):
     """
     Function to Calculate Exponential Moving Averages
     """
-    df = data.copy()
+    # Shallow copy: the new columns go on df, the price columns are shared
+    df = data.copy(deep=False)
+    close = df['Close'].to_numpy()
     for period in ema_periods:
-        df[f'EMA_{period}'] = df['Close'].ewm(span=period, adjust=False).mean()
+        df[f'EMA_{period}'] = ema(close, period)
     return df
 
 
@@ -47,40 +83,20 @@ def calculate_sma(data, sma_periods):
     """
     Function to Calculate Simple Moving Averages
     """
-    df = data.copy()
+    df = data.copy(deep=False)
+    close = df['Close'].to_numpy()
     for period in sma_periods:
-        df[f'SMA_{period}'] = df['Close'].rolling(window=period).mean()
+        df[f'SMA_{period}'] = sma(close, period)
     return df
 
 def calculate_rsi(data, rsi_period=2):
     """
     Function to calculate RSI with settings matching ThinkorSwim:
     - RSI length: 2
-    - Average Type: Wilder's (handled by EWM)
+    - Average Type: Wilder's (see indicators.wilder_rsi)
+    The caller's DataFrame is left untouched.
     """
-    df = data
-    df['change']  = df['Close'] - df['Close'].shift(1)
-    df['gain'] = np.where(df['change'] >= 0, df['change'], 0)
-    df['loss'] = np.where(df['change'] < 0, -1 * df['change'], 0)
-    
-    #Initialize avg_gain and avg_loss
-    df['avg_gain'] = 0.0
-    df['avg_loss'] = 0.0
-
-    # Calculate the initial average gain and loss
-    df.loc[df.index[rsi_period], 'avg_gain'] = df['gain'].rolling(window=rsi_period).mean().iloc[rsi_period]
-    df.loc[df.index[rsi_period], 'avg_loss'] = df['loss'].rolling(window=rsi_period).mean().iloc[rsi_period]
-
-   # Apply Wilder's smoothing
-    for i in range(rsi_period + 1, len(df)):
-        df.loc[df.index[i], 'avg_gain'] = (df.loc[df.index[i-1], 'avg_gain'] * (rsi_period - 1) + df.loc[df.index[i], 'gain']) / rsi_period
-        df.loc[df.index[i], 'avg_loss'] = (df.loc[df.index[i-1], 'avg_loss'] * (rsi_period - 1) + df.loc[df.index[i], 'loss']) / rsi_period
-    
-    df['rs'] = df['avg_gain'] / df['avg_loss']
-    df['rsi'] = 100 - (100 / (1 + df['rs']))
-    df.dropna()
-
-    return df['rsi']
+    return pd.Series(wilder_rsi(data['Close'].to_numpy(), rsi_period), index=data.index, name='rsi')
 
 def calculate_stochastics(data, k_period=8, d_period=3):
     """
@@ -94,148 +110,193 @@ def calculate_stochastics(data, k_period=8, d_period=3):
     d = k.rolling(window=d_period).mean()
     return pd.DataFrame({'%K': k, '%D': d})
 
-def bullish_strategy(data):
+def bullish_strategy(data, dtype=np.float64, cache=None, confirm=None):
     """
     Function to apply the bullish strategy
     - EMA: 8, 21, 34
     - SMA: 100, 200
     - RSI: 2 day period
     - Stochastics: 8, 3
-
+    - dtype: np.float32 stores the indicator columns in single precision
+    - cache: optional indicator_cache.DiskCache to reuse series of unchanged prices
+    - confirm: optional timeframes.TrendConfirmation, entries also need the
+      weekly / monthly trend of the last completed periods
+    The input frames are not modified; data maps to new frames.
     """
     # Think about how to optimize the strategy for different entry points, 8 vs 21 vs 34 vs 50
-    # Calculate EMAs and SMAs
+    # Declare every indicator once; each ticker fills one preallocated block
+    pipeline = IndicatorPipeline([8, 21, 34], [50, 100, 200], rsi_period=2, stoch_periods=(8, 3), dtype=dtype)
     for ticker in data:
-        df = data[ticker]
-
-        df = calculate_ema(df, [8, 21, 34])
-        df = calculate_sma(df, [50,100, 200])
-
-        # RSI
-        bullish_rsi = calculate_rsi(df)
-        # Stochastics
-        bullish_stochas = calculate_stochastics(df)
-
-        ema_sma_trend_mask = (
-            (df['EMA_8'] > df['EMA_21']) &
-            (df['EMA_21'] > df['EMA_34']) &
-            (df['SMA_50'] > df['SMA_100']) &
-            (df['SMA_100'] > df['SMA_200'])
-        )
-        retracement_stochas_mask = (bullish_stochas['%K'] <= 40) & (bullish_stochas['%D'] <= 40)
-        retracement_rsi_mask = bullish_rsi <= 10
-        low_bar_mask = df['Adj Close'] > df['Low']
-
-        single_mask =  ema_sma_trend_mask & retracement_stochas_mask & retracement_rsi_mask  & low_bar_mask
-         # Need to research a weighted structure algo in order to determine an optimal entry point but not all requierments are met
-        df['Entry Point'] = np.where(single_mask, 1, 0)
-        df = df.dropna()
+        count('bars', len(data[ticker]))
+        # Warm-up bars are never stored, dropna would remove them
+        with stage('indicators', ticker):
+            indicators = pipeline.run(data[ticker], skip_warmup=True, cache=cache, ticker=ticker)
+        df = data[ticker].iloc[pipeline.warmup:]
+
+        with stage('masks', ticker):
+            ema_sma_trend_mask = (
+                (indicators['EMA_8'] > indicators['EMA_21']) &
+                (indicators['EMA_21'] > indicators['EMA_34']) &
+                (indicators['SMA_50'] > indicators['SMA_100']) &
+                (indicators['SMA_100'] > indicators['SMA_200'])
+            )
+            retracement_stochas_mask = (indicators['%K'] <= 40) & (indicators['%D'] <= 40)
+            retracement_rsi_mask = indicators['rsi'] <= 10
+            low_bar_mask = df['Adj Close'] > df['Low']
+
+            single_mask =  ema_sma_trend_mask & retracement_stochas_mask & retracement_rsi_mask  & low_bar_mask
+            if confirm is not None:
+                single_mask &= confirm.mask(ticker, data[ticker])[pipeline.warmup:]
+             # Need to research a weighted structure algo in order to determine an optimal entry point but not all requierments are met
+             # (scoring.py scores each condition and ranks the best tickers of every day across a panel)
+            entry_point = np.where(single_mask, 1, 0)
+
+            # Same rows dropna kept, but as a slice (no copy) when they are contiguous,
+            # which they are unless the prices have gaps past the warm-up
+            columns = pipeline.columns[:-2]  # %K and %D stay off the frame
+            kept = df.notna().to_numpy().all(axis=1) & indicators[columns].notna().to_numpy().all(axis=1)
+            rows = np.flatnonzero(kept)
+            if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                rows = slice(rows[0], rows[-1] + 1)
+            df = pd.concat([df.iloc[rows], indicators[columns].iloc[rows]], axis=1)
+            df['Entry Point'] = entry_point[rows]
         data[ticker] = df
         
     return data
 
-def evaluate_strategy(data):
+def restrict_entries(df, start=None, end=None):
+    """
+    Function to clear the entry points outside an inclusive date range
+    - The bars around the range stay, so indicators have their warm-up and the
+      last entries still see their exit bars
+    """
+    outside = np.zeros(len(df), dtype=bool)
+    if start is not None:
+        outside |= df.index < pd.Timestamp(start)
+    if end is not None:
+        outside |= df.index > pd.Timestamp(end)
+    if outside.any():
+        df['Entry Point'] = np.where(outside, 0, df['Entry Point'].to_numpy())
+    return df
+
+def evaluate_entries(df, comms=COMMS, drawdown_threshold=DRAWDOWN_THRESHOLD, max_hold_days=MAX_HOLD_DAYS, exits=None):
+    """
+    Function to calculate the PNL of every entry point of one ticker
+    - exits: optional exit_rules.ExitEngine replacing the best-close exit
+      (drawdown_threshold and max_hold_days are then unused)
+    Returns the entry rows with PNL, End date, Position, Start Price and Stop Loss
+    """
+    # Find entry points
+    is_entry = (df['Entry Point'] == 1).to_numpy()
+    entries = df[is_entry].copy()
+
+    # Evaluate all entries at once on the Adj Close array (see trade_simulator.py)
+    if exits is not None:
+        trades = exits.run_frame(df, np.flatnonzero(is_entry))
+    else:
+        trades = simulate_trades(df['Adj Close'].to_numpy(), np.flatnonzero(is_entry),
+                                 comms, drawdown_threshold, max_hold_days)
+    has_exit = trades['exit_index'] >= 0
+    won = trades['position'] == 1
+
+    # Calculate PNLs
+    entries['PNL'] = trades['pnl']
+    entries['End date'] = pd.NaT
+    end_dates = df.index[trades['exit_index'][has_exit]]
+    entries.loc[has_exit, 'End date'] = end_dates
+
+    # Track positions, prices are only kept for winning trades
+    entries['Position'] = trades['position'].astype(np.int64)
+    entries['Start Price'] = np.where(won, trades['start_price'], None)
+    entries['Stop Loss'] = np.where(won & trades['stop_hit'], trades['exit_price'], None)
+
+    # Per entry lines only at DEBUG; the loop is skipped entirely otherwise
+    if log.isEnabledFor(logging.DEBUG):
+        for i, pnl, end_date in zip(entries.index, entries['PNL'], entries['End date']):
+            log.debug("Entry date: %s, PNL: %s, End date: %s", i, pnl, end_date)
+
+    return entries
+
+def reinvest_winnings(entries, ticker, balance):
+    """
+    Function to compound the winning trades of one ticker into the balance
+    Returns the new balance and the amount reinvested for this ticker
+    """
+    reinvested = 0
+    for i, row in entries.iterrows():
+        if row['PNL'] > 0 and row['Position'] == 1:
+            reinvest_amount = row['PNL'] * balance
+            balance += reinvest_amount
+            reinvested += reinvest_amount
+            entries.at[i, 'Reinvested Amount'] = reinvest_amount
+            entries.at[i, 'Total Amount'] = balance
+            log.debug("Reinvested $%.2f at entry: %s for %s", reinvest_amount, i, ticker)
+    return balance, reinvested
+
+def entry_point_columns(entries):
+    """
+    Function to select the exported columns of the evaluated entries
+    """
+    # Check if 'Date' column exists, if not, use the index as Date
+    if 'Date' not in entries.columns:
+        entries['Date'] = entries.index
+
+    # Select the desired columns
+    return entries[['Date', 'Entry Point', 'Adj Close', 'PNL', 'End date', 'Position', 'Start Price', 'Stop Loss']]
+
+def evaluate_strategy(data, sink=None, exits=None):
     """
     Function to evaluate the strategy
+    - sink: optional results_store.ResultSink; each ticker's entries are handed
+      to it as soon as they are evaluated
+    - exits: optional exit_rules.ExitEngine (see evaluate_entries)
     """
     entry_points = []
-    comms = 0.008  # 0.8% commission fee
-    inital_balance = 5000
-    drawdown_threshold = -0.10
-    max_hold_days = 14  # max 14 day holding period
+    inital_balance = INITIAL_BALANCE
     total_reinvested = 0
 
     for ticker in data:
-        df = data[ticker]
-        
-        # Find entry points
-        entries = df[df['Entry Point'] == 1].copy()
-        
-        # Calculate PNLs
-        entries['PNL'] = np.nan
-        entries['End date'] = pd.NaT
-
-        # Initalize tracking
-        entries['Position'] = 0
-        entries['Start Price'] = None
-        entries ['Stop Loss'] = None
-
-
-        for i, row in entries.iterrows():
-            start_price = row['Adj Close']
-            start_index = df.index.get_loc(i)
-            
-            # Find the best PNL in a 14 day window
-            max_pnl = -999 #ludicrously low so it always gets overwritten
-            stop_loss = None
-
-             # check if there is a trade being identified at the end of the dataset
-            if start_index + max_hold_days >= len(df):
-                max_hold_days = len(df) - start_index - 1
-
-            
-            for end_index in range(start_index + 1, start_index + max_hold_days + 1):
-                end_price = df.iloc[end_index]['Adj Close']
-                pnl = (end_price - start_price) / start_price - comms
-                if pnl > max_pnl:
-                    max_pnl = pnl
-                    max_end_date = df.index[end_index]
-
-                    #Check stop loss 
-                    if abs(pnl) > drawdown_threshold * start_price:
-                        stop_loss = end_price
-                        break
-
-            entries.at[i, 'PNL'] = max_pnl
-            entries.at[i, 'End date'] = max_end_date
-
-            #Manage Position
-            if max_pnl > 0: 
-                entries.at[i, 'Position'] = 1
-                entries.at[i, 'Start Price'] = start_price
-                entries.at[i, 'Stop Loss'] = stop_loss
-            else:
-                entries.at[i, 'Position'] = 0
-
-            print(f"Entry date: {i}, PNL: {entries.at[i, 'PNL']}, End date: {entries.at[i, 'End date']}")
-        
-        #Reinvest winnings
-        for i, row in entries.iterrows():
-            if row['PNL'] > 0 and row['Position'] == 1:
-                reinvest_amount = row['PNL'] * inital_balance
-                inital_balance += reinvest_amount
-                total_reinvested += reinvest_amount
-                entries.at[i, 'Reinvested Amount'] = reinvest_amount
-                entries.at[i, 'Total Amount'] = inital_balance
-                print(f"Reinvested ${reinvest_amount:.2f} at entry: {i} for {ticker}")
-
-        # Check if 'Date' column exists, if not, use the index as Date
-        if 'Date' not in entries.columns:
-            entries['Date'] = entries.index
-
-        # Select the desired columns
-        ticker_entry_points = entries[['Date', 'Entry Point', 'Adj Close', 'PNL', 'End date', 'Position', 'Start Price', 'Stop Loss']]
-        entry_points.append((ticker, ticker_entry_points))
-        print(f"Total reinvested amount: ${total_reinvested:.2f} for {ticker}")
+        with stage('evaluate', ticker):
+            entries = evaluate_entries(data[ticker], exits=exits)
+
+            #Reinvest winnings
+            inital_balance, reinvested = reinvest_winnings(entries, ticker, inital_balance)
+            total_reinvested += reinvested
+
+            entry_points.append((ticker, entry_point_columns(entries)))
+        if sink is not None:
+            sink.add(ticker, entry_points[-1][1])
+        count('entries', len(entries))
+        log.info("Total reinvested amount: $%.2f for %s", total_reinvested, ticker)
     
     return entry_points, inital_balance
 
-def plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker):
-    # calculate EMAs
-    ema_data = calculate_ema(data[ticker], ema_periods)
-
-    sma_data = calculate_sma(data[ticker], [100, 200])
+def plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker, cache=None):
+    # plotly takes longer to import than the backtest itself, so only plotting pays for it
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
+
+    # Reuse the indicator columns bullish_strategy left on the frame; anything
+    # else comes from the indicator cache (or is computed) in one pipeline run
+    ema_data = data[ticker]
+    pipeline = IndicatorPipeline(
+        [period for period in ema_periods if f'EMA_{period}' not in ema_data],
+        [period for period in sma_periods if f'SMA_{period}' not in ema_data],
+        rsi_period=None if 'rsi' in ema_data else 2,
+        stoch_periods=(8, 3),
+    )
+    computed = pipeline.run(ema_data, cache=cache, ticker=ticker)
+    ema_data = pd.concat([ema_data, computed.drop(columns=['%K', '%D'])], axis=1)
 
-    stochastics_data = calculate_stochastics(data[ticker])
-    k = stochastics_data['%K']
-    d = stochastics_data['%D']
+    k = computed['%K']
+    d = computed['%D']
 
     # Normalize k and d
     k_normalized = ((k - k.min()) / (k.max() - k.min())) * 40 + 30
     d_normalized = ((d - d.min()) / (d.max() - d.min())) * 40 + 30
     
      # RSI
-    bullish_rsi = calculate_rsi(data[ticker])
+    bullish_rsi = ema_data['rsi']
     rsi_normalized = ((bullish_rsi - bullish_rsi.min()) / (bullish_rsi.max() - bullish_rsi.min())) * 40 + 30
 
      # Create subplots
@@ -273,8 +334,8 @@ def plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker):
     for period in sma_periods:
         fig.add_trace(
             go.Scatter(
-                x=sma_data.index.strftime('%Y-%m-%d'),
-                y=sma_data[f'SMA_{period}'],
+                x=ema_data.index.strftime('%Y-%m-%d'),
+                y=ema_data[f'SMA_{period}'],
                 name=f'SMA_{period}'
             ),
             row=1, col=1
@@ -333,33 +394,57 @@ def plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker):
 if __name__ == "__main__":
     ema_periods = [8, 21, 34]
     sma_periods = [50,100, 200]
-    data = get_stock_data_csv(tickers)
-    data = bullish_strategy(data)
-    entry_points,inital_balance = evaluate_strategy(data)
-
-
-
- # Plot strategy for each ticker
-    for ticker in tickers:
-        if ticker in data:
-            df = data[ticker]
-            if df['Entry Point'].sum() > 3:
-                plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker)
-            else:
-                print(f"Skipping plot for {ticker} as no valid entry points were found.")
-        else:
-            print(f"{ticker} did not have any valid data.")
-
-# Export results for each ticker
-
-    for ticker, ticker_entry_points in entry_points:
-        #testing purposes
-        print(f"\nWriting CSV for {ticker}:")
-        print(f"Number of rows: {len(ticker_entry_points)}")
-        print(f"Number of entry points: {ticker_entry_points['Entry Point'].sum()}")
-
-        if not ticker_entry_points.empty:
-            ticker_entry_points.to_csv(f'{ticker}_results.csv', index=False)
-            print(f"Results exported for {ticker}")
+    # Indicator series are reused across runs while the prices are unchanged
+    cache = DiskCache()
+    # BACKTEST_LOG_LEVEL, BACKTEST_INSTRUMENT, BACKTEST_PROFILE and BACKTEST_REPORT
+    # control the output (see instrumentation.py)
+    with instrumented_run('backtest_bullish_entry'):
+        data = get_stock_data(tickers)
+        data = bullish_strategy(data, cache=cache)
+        # Every ticker's entries go to one results dataset (see results_store.py),
+        # written in the background while the remaining tickers are evaluated
+        from results_store import ResultSink
+        sink = ResultSink(metadata={
+            'script': 'backtest_bullish_entry', 'sector': sector, 'tickers': list(data),
+            'comms': COMMS, 'drawdown_threshold': DRAWDOWN_THRESHOLD, 'max_hold_days': MAX_HOLD_DAYS,
+            'initial_balance': INITIAL_BALANCE,
+        })
+        entry_points,inital_balance = evaluate_strategy(data, sink=sink)
+        with stage('export'):
+            sink.close(final_balance=inital_balance)
+        log.info("Results written to %s", sink.dataset_dir)
+
+     # Plot strategy for each ticker
+        if '--html' in sys.argv:
+            # Static, downsampled HTML reports for every qualifying ticker (see charts.py)
+            from charts import write_reports
+            with stage('plot'):
+                written = write_reports(data, ema_periods, sma_periods, cache=cache)
+            log.info("Wrote %d charts", len(written))
         else:
-            print(f"No valid entry points found for {ticker}")
+            for ticker in tickers:
+                if ticker in data:
+                    df = data[ticker]
+                    if df['Entry Point'].sum() > 3:
+                        with stage('plot', ticker):
+                            plot_ema_sma_strategy(data, ema_periods, sma_periods, ticker, cache=cache)
+                    else:
+                        log.info("Skipping plot for %s as no valid entry points were found.", ticker)
+                else:
+                    log.info("%s did not have any valid data.", ticker)
+
+    # Per-ticker CSV exports in the working directory, only on request
+
+        if '--csv' in sys.argv:
+            for ticker, ticker_entry_points in entry_points:
+                #testing purposes
+                log.debug("\nWriting CSV for %s:", ticker)
+                log.debug("Number of rows: %d", len(ticker_entry_points))
+                log.debug("Number of entry points: %d", ticker_entry_points['Entry Point'].sum())
+
+                if not ticker_entry_points.empty:
+                    with stage('export', ticker):
+                        ticker_entry_points.to_csv(f'{ticker}_results.csv', index=False)
+                    log.info("Results exported for %s", ticker)
+                else:
+                    log.info("No valid entry points found for %s", ticker)
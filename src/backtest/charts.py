@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import numpy as np
+from plotly.subplots import make_subplots
+import plotly.graph_objects as go
+
+from indicators import IndicatorPipeline
+from indicator_cache import DiskCache
+from backtest_bullish_entry import BASE_DIR, tickers, get_stock_data, bullish_strategy
+
+
+REPORT_DIR = os.path.join(BASE_DIR, '../', 'reports')
+# Most points drawn per trace; longer series are downsampled for display
+MAX_POINTS = 1500
+# plot_ema_sma_strategy is only drawn for tickers with more entries than this
+MIN_ENTRIES = 3
+
+
+def lttb(x, y, threshold):
+    """
+    Function to downsample a line with Largest-Triangle-Three-Buckets
+    - Keeps the first and last points and, per bucket, the point forming the
+      largest triangle with the previous kept point and the next bucket's mean,
+      so peaks and troughs survive
+    Returns the indices of the kept points
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        start, stop = edges[b], edges[b + 1]
+        next_start, next_stop = stop, edges[b + 2] if b + 2 < len(edges) else n
+        next_x = x[next_start:next_stop].mean()
+        next_y = y[next_start:next_stop].mean()
+        bucket_x = x[start:stop]
+        bucket_y = y[start:stop]
+        area = np.abs((x[previous] - next_x) * (bucket_y - y[previous]) - (x[previous] - bucket_x) * (next_y - y[previous]))
+        # NaN warm-up bars never win over a real point
+        area = np.where(np.isnan(area), -1.0, area)
+        previous = start + int(np.argmax(area))
+        kept[b + 1] = previous
+    return kept
+
+
+def decimate_ohlc(dates, df, max_points=MAX_POINTS):
+    """
+    Function to merge consecutive bars into at most max_points candles (and volume bars)
+    """
+    n = len(df)
+    if n <= max_points:
+        return dates, df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), df['Volume'].to_numpy()
+    starts = np.unique(np.linspace(0, n, max_points, endpoint=False).astype(np.int64))
+    ends = np.r_[starts[1:], n] - 1
+    return (
+        dates[starts],
+        df['Open'].to_numpy()[starts],
+        np.maximum.reduceat(df['High'].to_numpy(), starts),
+        np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        df['Close'].to_numpy()[ends],
+        np.add.reduceat(df['Volume'].to_numpy(), starts),
+    )
+
+
+def _line(dates, values, max_points, **kwargs):
+    values = np.asarray(values, dtype=np.float64)
+    kept = lttb(dates.view('int64'), values, max_points)
+    return go.Scattergl(x=dates[kept], y=values[kept], mode='lines', **kwargs)
+
+
+def _normalized(values):
+    # Same 30-70 scaling plot_ema_sma_strategy draws RSI and Stochastics with
+    values = np.asarray(values, dtype=np.float64)
+    low, high = np.nanmin(values), np.nanmax(values)
+    return (values - low) / (high - low) * 40 + 30
+
+
+def build_figure(df, ticker, ema_periods, sma_periods, max_points=MAX_POINTS, cache=None):
+    """
+    Function to build the plot_ema_sma_strategy chart for one bullish_strategy frame
+    - Indicator columns already on the frame are reused, the rest (Stochastics) come
+      from the indicator cache or are computed once
+    - Lines are LTTB downsampled to max_points and drawn with WebGL, candles and
+      volume are merged into at most max_points bars
+    """
+    pipeline = IndicatorPipeline(
+        [period for period in ema_periods if f'EMA_{period}' not in df],
+        [period for period in sma_periods if f'SMA_{period}' not in df],
+        rsi_period=None if 'rsi' in df else 2,
+        stoch_periods=(8, 3),
+    )
+    computed = pipeline.run(df, cache=cache, ticker=ticker)
+
+    def column(name):
+        return (df[name] if name in df else computed[name]).to_numpy()
+
+    dates = df.index.to_numpy(dtype='datetime64[ns]')
+    fig = make_subplots(
+        rows=4, cols=1, shared_xaxes=True,
+        vertical_spacing=0.02,
+        row_heights=[0.4, 0.1, 0.1, 0.1],
+        subplot_titles=(f'{ticker} Price Chart with EMAs and SMAs', 'RSI', 'Stochastics', 'Volume')
+    )
+
+    candle_dates, open_, high, low, close, volume = decimate_ohlc(dates, df, max_points)
+    fig.add_trace(go.Candlestick(x=candle_dates, open=open_, high=high, low=low, close=close, name='Price'), row=1, col=1)
+    for period in ema_periods:
+        fig.add_trace(_line(dates, column(f'EMA_{period}'), max_points, name=f'EMA_{period}'), row=1, col=1)
+    for period in sma_periods:
+        fig.add_trace(_line(dates, column(f'SMA_{period}'), max_points, name=f'SMA_{period}'), row=1, col=1)
+
+    # Entry points are few, so every one is drawn
+    entries = df['Entry Point'].to_numpy() == 1
+    fig.add_trace(go.Scattergl(x=dates[entries], y=df['Close'].to_numpy()[entries], mode='markers',
+                               marker=dict(color='green', size=8), name='Entry Points'), row=1, col=1)
+
+    fig.add_trace(_line(dates, _normalized(column('rsi')), max_points, line=dict(color='blue'), name='RSI'), row=2, col=1)
+    fig.add_hline(y=70, line=dict(dash='dash', color='red'), row=2, col=1)
+    fig.add_hline(y=30, line=dict(dash='dash', color='green'), row=2, col=1)
+
+    fig.add_trace(_line(dates, _normalized(column('%K')), max_points, name='%K', line=dict(color='blue', width=2)), row=3, col=1)
+    fig.add_trace(_line(dates, _normalized(column('%D')), max_points, name='%D', line=dict(color='orange', width=2)), row=3, col=1)
+    fig.add_hline(y=40, line=dict(color='green', width=2, dash='dash'), row=3, col=1)
+    fig.add_hline(y=60, line=dict(color='red', width=2, dash='dash'), row=3, col=1)
+
+    fig.add_trace(go.Bar(x=candle_dates, y=volume, name='Volume'), row=4, col=1)
+
+    fig.update_layout(
+        title=f"{ticker} Stock Analysis",
+        xaxis=dict(rangeslider=dict(visible=False), type="date", tickformat="%Y-%m-%d"),
+        xaxis2_title="Date",
+        yaxis1_title="Price",
+        yaxis2_title="Indicators",
+        height=900,
+        showlegend=True
+    )
+    return fig
+
+
+def write_reports(data, ema_periods, sma_periods, out_dir=None, min_entries=MIN_ENTRIES,
+                  max_points=MAX_POINTS, cache=None):
+    """
+    Function to write one HTML chart per ticker with more than min_entries entry points
+    - data: {ticker: DataFrame} as returned by bullish_strategy
+    - All pages load one plotly.min.js written next to them, and index.html links them
+    Returns the paths written
+    """
+    out_dir = out_dir or REPORT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for ticker, df in data.items():
+        if df['Entry Point'].sum() <= min_entries:
+            continue
+        fig = build_figure(df, ticker, ema_periods, sma_periods, max_points, cache)
+        path = os.path.join(out_dir, f'{ticker}.html')
+        fig.write_html(path, include_plotlyjs='directory', auto_open=False)
+        written.append(path)
+
+    links = '\n'.join(f'<li><a href="{os.path.basename(path)}">{os.path.splitext(os.path.basename(path))[0]}</a></li>'
+                      for path in written)
+    with open(os.path.join(out_dir, 'index.html'), 'w') as f:
+        f.write(f'<html><body><h1>Bullish entry charts</h1><ul>\n{links}\n</ul></body></html>\n')
+    return written
+
+
+if __name__ == "__main__":
+    # python charts.py [out_dir]: write the sector's charts as static HTML
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    cache = DiskCache()
+    data = bullish_strategy(get_stock_data(tickers), cache=cache)
+    start = time.perf_counter()
+    written = write_reports(data, [8, 21, 34], [50, 100, 200], out_dir, cache=cache)
+    print(f"Wrote {len(written)} charts to {out_dir or REPORT_DIR} in {time.perf_counter() - start:.2f}s")
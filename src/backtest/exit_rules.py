@@ -0,0 +1,277 @@
+import numpy as np
+
+from trade_simulator import NO_PNL
+from backtest_bullish_entry import COMMS, MAX_HOLD_DAYS
+
+
+# Bars looked at after an entry when no TimeExit sets the horizon
+HORIZON = MAX_HOLD_DAYS
+
+# One row per trade, like trade_simulator.TRADE_DTYPE plus the rule that closed it
+EXIT_DTYPE = np.dtype([
+    ('entry_index', np.int64),
+    ('exit_index', np.int64),    # -1 when there was no bar to exit on
+    ('start_price', np.float64),
+    ('exit_price', np.float64),
+    ('pnl', np.float64),
+    ('rule', np.int16),          # index into the engine's rules, -1 for the end of the horizon / data
+    ('stop_hit', np.bool_),      # closed by a StopLoss or TrailingStop
+    ('position', np.int8),       # 1 when the trade made money after commission
+])
+
+# Rules see the bars after each entry as (entries x horizon) windows: column j
+# is bar entry + 1 + j. Each rule returns a trigger matrix and the fill price
+# of every triggered cell; the engine takes the first triggered column of every
+# row (the first-passage bar) across all rules. Prices are the Adj Close
+# basis of the trades: Open / High / Low are scaled by Adj Close / Close.
+
+
+class Windows:
+    """
+    Windows of the bars after every entry, built on first use and shared by the rules
+    """
+
+    def __init__(self, arrays, entry_index, horizon):
+        self.arrays = arrays
+        self.entry_index = entry_index
+        self.horizon = horizon
+        self.hold_days = np.minimum(horizon, len(arrays['Adj Close']) - entry_index - 1)
+        self.in_window = np.arange(horizon) < self.hold_days[:, None]
+        self.entry_price = np.asarray(arrays['Adj Close'], dtype=np.float64)[entry_index]
+        # Row k holds the bar numbers entry + 1 ... entry + horizon; cells past
+        # the data repeat the last bar and are masked by in_window
+        self.bars = entry_index[:, None] + 1 + np.arange(horizon)
+        self._cache = {}
+
+    def window(self, name, lag=0):
+        """
+        Function to return (entries x horizon) values of a column, on the Adj Close basis
+        - lag=1 gives the bar before each one (the entry bar for column 0)
+        Only the windowed cells are gathered, so the cost follows the number of entries
+        """
+        key = (name, lag)
+        if key not in self._cache:
+            values = np.take(np.asarray(self.arrays[name], dtype=np.float64), self.bars - lag, mode='clip')
+            if name in ('Open', 'High', 'Low') and 'Close' in self.arrays:
+                values *= self.window('Adj Close', lag) / self.window('Close', lag)
+            self._cache[key] = values
+        return self._cache[key]
+
+
+class StopLoss:
+    """
+    Exit when the Low reaches pct below the entry price
+    Filled at the stop, or at the Open when the bar gaps through it
+    """
+    stop = True
+
+    def __init__(self, pct):
+        self.pct = pct
+
+    def evaluate(self, windows):
+        level = (windows.entry_price * (1 - self.pct))[:, None]
+        hit = windows.window('Low') <= level
+        return hit, np.minimum(level, windows.window('Open'))
+
+
+class ProfitTarget:
+    """
+    Exit when the High reaches pct above the entry price
+    Filled at the target, or at the Open when the bar gaps through it
+    """
+    stop = False
+
+    def __init__(self, pct):
+        self.pct = pct
+
+    def evaluate(self, windows):
+        level = (windows.entry_price * (1 + self.pct))[:, None]
+        hit = windows.window('High') >= level
+        return hit, np.maximum(level, windows.window('Open'))
+
+
+class TrailingStop:
+    """
+    Exit when the Low falls pct below the highest High since the entry
+    - The peak only counts bars before the one tested (the entry price to start
+      with), since the order of a bar's High and Low is unknown
+    """
+    stop = True
+
+    def __init__(self, pct):
+        self.pct = pct
+
+    def evaluate(self, windows):
+        high = np.where(windows.in_window, windows.window('High'), -np.inf)
+        running = np.maximum.accumulate(high, axis=1)
+        # Peak up to the previous bar, starting from the entry price
+        peak = np.empty_like(running)
+        peak[:, 0] = windows.entry_price
+        np.maximum(running[:, :-1], windows.entry_price[:, None], out=peak[:, 1:])
+        level = peak * (1 - self.pct)
+        hit = windows.window('Low') <= level
+        return hit, np.minimum(level, windows.window('Open'))
+
+
+class TimeExit:
+    """
+    Exit at the close of the days-th bar after the entry
+    """
+    stop = False
+
+    def __init__(self, days):
+        self.days = days
+
+    def evaluate(self, windows):
+        hit = np.zeros(windows.in_window.shape, dtype=bool)
+        if 0 < self.days <= windows.horizon:
+            hit[:, self.days - 1] = True
+        return hit, windows.window('Adj Close')
+
+
+class IndicatorExit:
+    """
+    Exit at the close of the bar where `fast` crosses below `slow`
+    - Columns of the frame, e.g. IndicatorExit('Close', 'EMA_8') or
+      IndicatorExit('EMA_8', 'EMA_21'); the averages are built on Close, so
+      compare them with Close rather than Adj Close (the two differ by the
+      dividend adjustment)
+    - A cross needs fast at or above slow on the bar before, so being under
+      already at the entry does not count
+    """
+    stop = False
+
+    def __init__(self, fast='Close', slow='EMA_8'):
+        self.fast = fast
+        self.slow = slow
+
+    def evaluate(self, windows):
+        below = windows.window(self.fast) < windows.window(self.slow)
+        was_above = windows.window(self.fast, lag=1) >= windows.window(self.slow, lag=1)
+        return below & was_above, windows.window('Adj Close')
+
+
+class AllOf:
+    """
+    Exit at the close of the first bar where every rule triggers together
+    """
+    stop = False
+
+    def __init__(self, *rules):
+        self.rules = rules
+
+    def evaluate(self, windows):
+        hit = np.logical_and.reduce([rule.evaluate(windows)[0] for rule in self.rules])
+        return hit, windows.window('Adj Close')
+
+
+def _columns(rule):
+    # Frame columns a rule reads, besides the price fields
+    if isinstance(rule, IndicatorExit):
+        return [rule.fast, rule.slow]
+    if isinstance(rule, AllOf):
+        return [column for inner in rule.rules for column in _columns(inner)]
+    return []
+
+
+class ExitEngine:
+    """
+    Composable exit rules evaluated for all entries of a ticker at once
+    - rules: checked together on every bar; a trade closes on the first bar any
+      of them triggers, and on the same bar the rule listed first wins (list
+      stops before targets for the conservative fill)
+    - horizon: bars looked at after each entry (default: the longest TimeExit,
+      else HORIZON); a trade still open then closes at the last bar's close
+    """
+
+    def __init__(self, rules, horizon=None, comms=COMMS):
+        self.rules = list(rules)
+        days = [rule.days for rule in self.rules if isinstance(rule, TimeExit)]
+        self.horizon = horizon or max(days, default=HORIZON)
+        self.comms = comms
+
+    @property
+    def columns(self):
+        names = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+        for rule in self.rules:
+            names += [column for column in _columns(rule) if column not in names]
+        return names
+
+    def run(self, arrays, entry_index):
+        """
+        Function to close every entry of one ticker
+        - arrays: {column: full-length array} with self.columns
+        Returns an EXIT_DTYPE structured array in entry order
+        """
+        entry_index = np.asarray(entry_index, dtype=np.int64)
+        n_entries = len(entry_index)
+        result = np.zeros(n_entries, dtype=EXIT_DTYPE)
+        result['entry_index'] = entry_index
+        result['exit_index'] = -1
+        result['exit_price'] = np.nan
+        result['pnl'] = NO_PNL
+        result['rule'] = -1
+        if n_entries == 0:
+            return result
+
+        windows = Windows(arrays, entry_index, self.horizon)
+        result['start_price'] = windows.entry_price
+        # Default exit: the close of the last bar in the window
+        last = np.maximum(windows.hold_days - 1, 0)
+        offset = last.copy()
+        rule_index = np.full(n_entries, -1, dtype=np.int16)
+        rows = np.arange(n_entries)
+        price = windows.window('Adj Close')[rows, last]
+
+        for i, rule in enumerate(self.rules):
+            hit, fill = rule.evaluate(windows)
+            hit = hit & windows.in_window
+            fired = hit.any(axis=1)
+            # argmax gives the first True of each row
+            first = hit.argmax(axis=1)
+            # Earlier bars win; on the same bar the earlier rule keeps it
+            better = fired & ((first < offset) | (rule_index < 0) & (first <= offset))
+            offset = np.where(better, first, offset)
+            price = np.where(better, fill[rows, first], price)
+            rule_index = np.where(better, i, rule_index)
+
+        has_exit = windows.hold_days > 0
+        pnl = (price - windows.entry_price) / windows.entry_price - self.comms
+        stops = np.array([getattr(rule, 'stop', False) for rule in self.rules] + [False])
+        result['exit_index'] = np.where(has_exit, entry_index + 1 + offset, -1)
+        result['exit_price'] = np.where(has_exit, price, np.nan)
+        result['pnl'] = np.where(has_exit, pnl, NO_PNL)
+        result['rule'] = np.where(has_exit, rule_index, -1)
+        result['stop_hit'] = has_exit & stops[rule_index]
+        result['position'] = result['pnl'] > 0
+        return result
+
+    def run_frame(self, df, entry_index):
+        return self.run({column: df[column].to_numpy() for column in self.columns if column in df}, entry_index)
+
+
+def parse_exits(spec, comms=COMMS):
+    """
+    Function to build an ExitEngine from a spec such as
+    'stop=0.05,target=0.10,trail=0.08,time=14,cross=EMA_8'
+    - cross=SLOW exits when the Close crosses below SLOW, cross=FAST/SLOW
+      when FAST crosses below SLOW
+    - Rules keep the spec's order, which decides same-bar ties
+    """
+    rules = []
+    for item in spec.split(','):
+        name, _, value = item.strip().partition('=')
+        if name == 'stop':
+            rules.append(StopLoss(float(value)))
+        elif name == 'target':
+            rules.append(ProfitTarget(float(value)))
+        elif name == 'trail':
+            rules.append(TrailingStop(float(value)))
+        elif name == 'time':
+            rules.append(TimeExit(int(value)))
+        elif name == 'cross':
+            fast, _, slow = value.rpartition('/')
+            rules.append(IndicatorExit(fast or 'Close', slow))
+        else:
+            raise ValueError(f"Unknown exit rule {name!r} in {spec!r}, expected stop, target, trail, time or cross")
+    return ExitEngine(rules, comms=comms)
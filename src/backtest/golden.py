@@ -0,0 +1,300 @@
+import io
+import os
+import sys
+import glob
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+
+from price_store import PRICE_COLUMNS
+from backtest_bullish_entry import (
+    BASE_DIR, ROOT_DATA_DIR, sector, get_stock_data_csv, bullish_strategy, calculate_stochastics, evaluate_strategy,
+)
+
+
+GOLDEN_DIR = os.path.join(BASE_DIR, '../', 'golden')
+INDICATORS_FILE = 'indicators.npz'
+TRADES_DIR = 'trades'
+# Default tolerances: tight enough that only rounding-order differences pass
+RTOL = 1e-9
+ATOL = 1e-12
+# Columns compared for equality whatever the tolerance
+EXACT_COLUMNS = ['Entry Point', 'Position']
+TRADE_DATE_COLUMNS = ['Date', 'End date']
+
+# Layout of a golden snapshot (src/golden/<sector>/):
+# - indicators.npz: '<ticker>/Date' (datetime64[ns] as int64) and '<ticker>/<column>'
+#   for the EMA/SMA/rsi/%K/%D/Entry Point columns on the rows bullish_strategy keeps
+# - trades/<ticker>_results.csv: evaluate_strategy's entry points, as the main
+#   script's --csv export writes them (header only when there are none)
+
+
+def quiet(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+def sector_tickers():
+    paths = glob.glob(os.path.join(ROOT_DATA_DIR, sector, '*_data_his.csv'))
+    return sorted(os.path.basename(p).replace('_data_his.csv', '') for p in paths)
+
+
+def indicator_columns(df):
+    return df.drop(columns=PRICE_COLUMNS)
+
+
+def with_stochastics(raw, strategy):
+    """
+    Function to add %K and %D (which bullish_strategy does not keep) to its frames
+    """
+    frames = {}
+    for ticker, df in strategy.items():
+        stochastics = calculate_stochastics(raw[ticker]).reindex(df.index)
+        frames[ticker] = pd.concat([indicator_columns(df), stochastics], axis=1)
+    return frames
+
+
+def trades_by_ticker(strategy):
+    entry_points, _ = quiet(lambda: evaluate_strategy(strategy))
+    return dict(entry_points)
+
+
+def normalize_trades(df):
+    """
+    Function to put trades through the CSV round trip the fixtures went through
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return read_trades(buffer)
+
+
+def read_trades(path):
+    return pd.read_csv(path, parse_dates=TRADE_DATE_COLUMNS, float_precision='round_trip')
+
+
+# Engines: functions of the raw {ticker: DataFrame} returning (indicators, trades),
+# each {ticker: DataFrame} or None when the engine does not produce it
+
+def engine_reference(raw):
+    strategy = bullish_strategy(dict(raw))
+    return with_stochastics(raw, strategy), trades_by_ticker(strategy)
+
+
+def engine_float32(raw):
+    strategy = bullish_strategy(dict(raw), dtype=np.float32)
+    return with_stochastics(raw, strategy), trades_by_ticker(strategy)
+
+
+def engine_cached(raw):
+    import tempfile
+    from indicator_cache import DiskCache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DiskCache(cache_dir)
+        bullish_strategy(dict(raw), cache=cache)
+        # Second run is served from the cache
+        strategy = bullish_strategy(dict(raw), cache=cache)
+        return with_stochastics(raw, strategy), trades_by_ticker(strategy)
+
+
+def engine_streaming(raw):
+    from streaming import IndicatorState
+    frames = {}
+    for ticker, df in raw.items():
+        state = IndicatorState(ticker)
+        columns = [df[column].to_numpy().tolist() for column in ('High', 'Low', 'Close', 'Adj Close')]
+        rows = [state.update({'Date': date, 'High': high, 'Low': low, 'Close': close, 'Adj Close': adj_close})
+                for date, high, low, close, adj_close in zip(df.index, *columns)]
+        frame = pd.DataFrame(rows).set_index('Date')
+        # Keep the rows bullish_strategy's dropna keeps
+        columns = [column for column in frame.columns if column not in ('%K', '%D', 'Entry Point')]
+        kept = frame[columns].notna().all(axis=1).to_numpy() & df.notna().all(axis=1).to_numpy()
+        frames[ticker] = frame[kept]
+    return frames, None
+
+
+def engine_panel(raw):
+    from panel import Panel, bullish_strategy_panel, panel_to_frames
+    panel = Panel.from_frames(raw)
+    out = bullish_strategy_panel(panel)
+    strategy = panel_to_frames(panel, out)
+    frames = {}
+    for j, ticker in enumerate(panel.tickers):
+        rows = out['kept'][:, j]
+        frames[ticker] = indicator_columns(strategy[ticker])
+        frames[ticker]['%K'] = out['%K'][rows, j]
+        frames[ticker]['%D'] = out['%D'][rows, j]
+    return frames, trades_by_ticker(strategy)
+
+
+def engine_parallel(raw):
+    from parallel_runner import run_parallel
+    entry_points, _, _ = run_parallel(raw, max_workers=2)
+    return None, dict(entry_points)
+
+
+ENGINES = {
+    'reference': engine_reference,
+    'float32': engine_float32,
+    'cached': engine_cached,
+    'streaming': engine_streaming,
+    'panel': engine_panel,
+    'parallel': engine_parallel,
+}
+
+
+def snapshot(raw, golden_dir):
+    """
+    Function to write the reference engine's outputs as the golden fixtures
+    """
+    indicators, trades = engine_reference(raw)
+    os.makedirs(os.path.join(golden_dir, TRADES_DIR), exist_ok=True)
+    arrays = {}
+    for ticker, df in indicators.items():
+        arrays[f'{ticker}/Date'] = df.index.to_numpy(dtype='datetime64[ns]').view('int64')
+        for column in df.columns:
+            arrays[f'{ticker}/{column}'] = df[column].to_numpy()
+    np.savez_compressed(os.path.join(golden_dir, INDICATORS_FILE), **arrays)
+    for ticker, df in trades.items():
+        df.to_csv(os.path.join(golden_dir, TRADES_DIR, f'{ticker}_results.csv'), index=False)
+    return len(indicators), sum(len(df) for df in trades.values())
+
+
+def load_golden(golden_dir):
+    """
+    Function to read the golden fixtures back as ({ticker: indicators}, {ticker: trades})
+    """
+    indicators = {}
+    with np.load(os.path.join(golden_dir, INDICATORS_FILE)) as arrays:
+        columns = {}
+        for key in arrays.files:
+            ticker, column = key.split('/', 1)
+            columns.setdefault(ticker, {})[column] = arrays[key]
+        for ticker, values in columns.items():
+            index = pd.DatetimeIndex(values.pop('Date').view('datetime64[ns]'), name='Date')
+            indicators[ticker] = pd.DataFrame(values, index=index)
+    trades = {}
+    for path in sorted(glob.glob(os.path.join(golden_dir, TRADES_DIR, '*_results.csv'))):
+        trades[os.path.basename(path)[:-len('_results.csv')]] = read_trades(path)
+    return indicators, trades
+
+
+def first_divergence(expected, actual, rtol=RTOL, atol=ATOL):
+    """
+    Function to find the first row where two frames disagree
+    - Only the columns both frames have are compared, EXACT_COLUMNS exactly and
+      the other numeric columns within rtol/atol (NaN equals NaN)
+    Returns None when they agree, otherwise a dict describing the earliest
+    difference (row, index label, column, both values, and the largest
+    absolute difference in that column)
+    """
+    if len(expected) != len(actual) or not np.array_equal(expected.index, actual.index):
+        n = min(len(expected), len(actual))
+        same = np.asarray(expected.index[:n]) == np.asarray(actual.index[:n])
+        row = int(np.argmin(same)) if not same.all() else n
+        return {
+            'row': row,
+            'label': expected.index[row] if row < len(expected) else None,
+            'column': '<index>',
+            'expected': expected.index[row] if row < len(expected) else f'{len(expected)} rows',
+            'actual': actual.index[row] if row < len(actual) else f'{len(actual)} rows',
+            'max_abs_diff': None,
+        }
+
+    first = None
+    for column in [column for column in expected.columns if column in actual.columns]:
+        want = expected[column].to_numpy()
+        got = actual[column].to_numpy()
+        if want.dtype.kind in 'fiub' and got.dtype.kind in 'fiub':
+            want = want.astype(np.float64)
+            got = got.astype(np.float64)
+            if column in EXACT_COLUMNS:
+                ok = (want == got) | (np.isnan(want) & np.isnan(got))
+            else:
+                ok = np.isclose(got, want, rtol=rtol, atol=atol, equal_nan=True)
+            diff = np.abs(got - want)
+            max_diff = float(np.nanmax(diff)) if (~np.isnan(diff)).any() else None
+        else:
+            ok = (want == got) | (pd.isna(want) & pd.isna(got))
+            max_diff = None
+        if ok.all():
+            continue
+        row = int(np.argmin(ok))
+        if first is None or row < first['row']:
+            first = {
+                'row': row,
+                'label': expected.index[row],
+                'column': column,
+                'expected': want[row],
+                'actual': got[row],
+                'max_abs_diff': max_diff,
+            }
+    return first
+
+
+def compare(golden, output, rtol=RTOL, atol=ATOL):
+    """
+    Function to compare one engine's output with the golden fixtures
+    Returns {(kind, ticker): divergence} for every ticker that differs or is missing
+    """
+    divergences = {}
+    for kind, expected_frames, actual_frames in zip(['indicators', 'trades'], golden, output):
+        if actual_frames is None:
+            continue
+        for ticker, expected in expected_frames.items():
+            if ticker not in actual_frames:
+                divergences[(kind, ticker)] = {'row': None, 'column': '<missing ticker>'}
+                continue
+            actual = actual_frames[ticker]
+            if kind == 'trades':
+                actual = normalize_trades(actual)
+            divergence = first_divergence(expected, actual, rtol, atol)
+            if divergence is not None:
+                divergences[(kind, ticker)] = divergence
+    return divergences
+
+
+def print_report(engine, golden, output, divergences, limit=10):
+    checked = [kind for kind, frames in zip(['indicators', 'trades'], output) if frames is not None]
+    status = 'OK' if not divergences else f'{len(divergences)} divergent'
+    print(f"{engine:<10} checked {' + '.join(checked)} for {len(golden[0])} tickers: {status}")
+    for (kind, ticker), d in list(divergences.items())[:limit]:
+        if d['row'] is None:
+            print(f"  {kind} {ticker}: {d['column']}")
+            continue
+        max_diff = '' if d['max_abs_diff'] is None else f", max abs diff {d['max_abs_diff']:.3g}"
+        print(f"  {kind} {ticker}: first divergence at row {d['row']} ({d['label']}) in {d['column']}: "
+              f"expected {d['expected']}, got {d['actual']}{max_diff}")
+    if len(divergences) > limit:
+        print(f"  ... {len(divergences) - limit} more")
+
+
+if __name__ == "__main__":
+    # python golden.py --snapshot            write the fixtures from the reference engine
+    # python golden.py [engine ...]          compare engines (default: all) with the fixtures
+    parser = argparse.ArgumentParser(description='Golden-output checks for the backtest engines')
+    parser.add_argument('engines', nargs='*', help=f"engines to check (default: all of {', '.join(ENGINES)})")
+    parser.add_argument('--snapshot', action='store_true')
+    parser.add_argument('--rtol', type=float, default=RTOL)
+    parser.add_argument('--atol', type=float, default=ATOL)
+    args = parser.parse_args()
+    unknown = [engine for engine in args.engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+
+    golden_dir = os.path.join(GOLDEN_DIR, sector)
+    raw = quiet(lambda: get_stock_data_csv(sector_tickers()))
+    if args.snapshot:
+        n_tickers, n_trades = snapshot(raw, golden_dir)
+        print(f"Wrote golden outputs for {n_tickers} tickers and {n_trades} trades to {golden_dir}")
+        sys.exit(0)
+
+    golden = load_golden(golden_dir)
+    failed = False
+    for engine in args.engines or list(ENGINES):
+        output = ENGINES[engine]({ticker: df.copy() for ticker, df in raw.items()})
+        divergences = compare(golden, output, args.rtol, args.atol)
+        print_report(engine, golden, output, divergences)
+        failed = failed or bool(divergences)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+from price_store import ROOT_STORE_DIR
+
+
+CACHE_DIR = os.path.join(ROOT_STORE_DIR, 'indicator_cache')
+# Least recently used series are evicted once the cache grows past this size
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Layout of the cache directory (src/store/indicator_cache/):
+# - one <ticker>_<name>_<digest>.npy per indicator series, loaded memory-mapped
+# - digest hashes the price data fingerprint, the indicator name and its
+#   parameters, so changed prices or parameters simply miss and the old files
+#   age out of the LRU
+# - a file's mtime is its last use, so the LRU order survives restarts and is
+#   shared by every process using the directory
+
+
+def fingerprint(df):
+    """
+    Function to hash a price DataFrame (dates and every column's values)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(df.index.to_numpy(dtype='datetime64[us]').view('int64').tobytes())
+    for column in df.columns:
+        digest.update(str(column).encode())
+        digest.update(str(df[column].dtype).encode())
+        digest.update(np.ascontiguousarray(df[column].to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded LRU of indicator series on disk
+    - Keys are (ticker, fingerprint, name, params); values are 1-D float arrays
+    - Hits come back as read-only memory maps
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        # Oldest first, so eviction pops from the front
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npy'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        self.index = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self.total_bytes = sum(self.index.values())
+
+    def __getstate__(self):
+        # Workers rescan the directory instead of receiving the index
+        return {'cache_dir': self.cache_dir, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['cache_dir'], state['max_bytes'])
+
+    def fingerprint(self, df):
+        return fingerprint(df)
+
+    def filename(self, ticker, fingerprint, name, params):
+        key = f"{ticker}|{fingerprint}|{name}|{params!r}"
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return f"{ticker}_{name}_{digest}.npy"
+
+    def get(self, ticker, fingerprint, name, params):
+        """
+        Function to return a cached series, or None on a miss
+        """
+        filename = self.filename(ticker, fingerprint, name, params)
+        path = os.path.join(self.cache_dir, filename)
+        try:
+            values = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted by another process, or half written by a crash
+            self.total_bytes -= self.index.pop(filename, 0)
+            return None
+        if filename in self.index:
+            self.index.move_to_end(filename)
+        else:
+            self.index[filename] = os.path.getsize(path)
+            self.total_bytes += self.index[filename]
+        return values
+
+    def put(self, ticker, fingerprint, name, params, values):
+        filename = self.filename(ticker, fingerprint, name, params)
+        path = os.path.join(self.cache_dir, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(values))
+        os.replace(tmp_path, path)
+
+        self.total_bytes -= self.index.pop(filename, 0)
+        self.index[filename] = os.path.getsize(path)
+        self.total_bytes += self.index[filename]
+        self.evict()
+
+    def fetch(self, ticker, fingerprint, name, params, compute):
+        """
+        Function to return a series from the cache, computing and storing it on a miss
+        """
+        values = self.get(ticker, fingerprint, name, params)
+        if values is not None:
+            self.hits += 1
+            return values
+        self.misses += 1
+        values = compute()
+        self.put(ticker, fingerprint, name, params, values)
+        return values
+
+    def evict(self):
+        """
+        Function to delete least recently used files until the cache fits max_bytes
+        """
+        while self.total_bytes > self.max_bytes and self.index:
+            filename, size = self.index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for filename in list(self.index):
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+        self.index.clear()
+        self.total_bytes = 0
+
+
+if __name__ == "__main__":
+    # python indicator_cache.py [--clear]: time a cold and a warm bullish_strategy run
+    from backtest_bullish_entry import tickers, get_stock_data, bullish_strategy
+    cache = DiskCache()
+    if '--clear' in sys.argv:
+        cache.clear()
+    data = get_stock_data(tickers)
+    for run in ['first', 'second']:
+        hits, misses = cache.hits, cache.misses
+        start = time.perf_counter()
+        bullish_strategy(dict(data), cache=cache)
+        elapsed = time.perf_counter() - start
+        print(f"{run} run: {elapsed:.3f}s, {cache.hits - hits} hits, {cache.misses - misses} misses")
+    print(f"{len(cache.index)} series, {cache.total_bytes / 1024:.0f}KB in {cache.cache_dir}")
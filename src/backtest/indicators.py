@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+
+def ema(close, period):
+    """
+    Function to calculate an EMA over an array of closes (same as calculate_ema)
+    """
+    return pd.Series(close).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def sma(close, period):
+    """
+    Function to calculate an SMA over an array of closes (same as calculate_sma)
+    """
+    return pd.Series(close).rolling(window=period).mean().to_numpy()
+
+
+def stochastics(high, low, close, k_period=8, d_period=3):
+    """
+    Function to calculate %K and %D arrays (same as calculate_stochastics)
+    """
+    highest_high = pd.Series(high).rolling(window=k_period).max().to_numpy()
+    lowest_low = pd.Series(low).rolling(window=k_period).min().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = (np.asarray(close) - lowest_low) / (highest_high - lowest_low)
+    d = pd.Series(k).rolling(window=d_period).mean().to_numpy()
+    return k, d
+
+
+def wilder_rsi(close, rsi_period=2):
+    """
+    Function to calculate Wilder's RSI over a NumPy array of closes
+    - Seeds the averages with the simple mean of the first rsi_period changes
+    - Smooths with avg = (prev_avg * (rsi_period - 1) + value) / rsi_period
+    Returns a float64 array the same length as close, NaN until the seed bar.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    if n <= rsi_period:
+        return rsi
+
+    change = np.empty(n)
+    change[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=change[1:])
+    # NaN comparisons are False, so the first bar counts as no gain and no loss
+    gain = np.where(change >= 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+
+    avg_gain = np.zeros(n)
+    avg_loss = np.zeros(n)
+    # Seed with the same rolling mean the original used so the sums round identically
+    seed = slice(0, rsi_period + 1)
+    avg_gain[rsi_period] = pd.Series(gain[seed]).rolling(window=rsi_period).mean().iloc[rsi_period]
+    avg_loss[rsi_period] = pd.Series(loss[seed]).rolling(window=rsi_period).mean().iloc[rsi_period]
+
+    # The recurrence is run on plain floats so every step rounds exactly like the
+    # original per-row implementation (ThinkorSwim matching values stay identical)
+    g = avg_gain[rsi_period]
+    l = avg_loss[rsi_period]
+    keep = rsi_period - 1
+    gains = gain.tolist()
+    losses = loss.tolist()
+    out_gain = avg_gain.tolist()
+    out_loss = avg_loss.tolist()
+    for i in range(rsi_period + 1, n):
+        g = (g * keep + gains[i]) / rsi_period
+        l = (l * keep + losses[i]) / rsi_period
+        out_gain[i] = g
+        out_loss[i] = l
+    avg_gain = np.array(out_gain)
+    avg_loss = np.array(out_loss)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+
+class IndicatorPipeline:
+    """
+    Indicator columns declared up front and filled into one preallocated block
+    - ema_periods / sma_periods: EMA_<period> / SMA_<period> columns
+    - rsi_period: 'rsi' column (None to leave it out)
+    - stoch_periods: (k_period, d_period) for the '%K' and '%D' columns (None to leave them out)
+    - dtype: np.float64, or np.float32 to halve the block (values are computed in
+      float64 and rounded once when stored)
+    """
+
+    def __init__(self, ema_periods=(), sma_periods=(), rsi_period=None, stoch_periods=None, dtype=np.float64):
+        self.ema_periods = tuple(ema_periods)
+        self.sma_periods = tuple(sma_periods)
+        self.rsi_period = rsi_period
+        self.stoch_periods = stoch_periods
+        self.dtype = np.dtype(dtype)
+        self.columns = [f'EMA_{period}' for period in self.ema_periods] + [f'SMA_{period}' for period in self.sma_periods]
+        if rsi_period is not None:
+            self.columns.append('rsi')
+        if stoch_periods is not None:
+            self.columns += ['%K', '%D']
+
+        # Bars before this one are NaN in at least one declared column
+        warmups = [period - 1 for period in self.sma_periods]
+        if rsi_period is not None:
+            warmups.append(rsi_period)
+        if stoch_periods is not None:
+            warmups.append(sum(stoch_periods) - 2)
+        self.warmup = max(warmups, default=0)
+
+    def allocate(self, n):
+        """
+        Function to allocate the output block for n bars
+        Column-major, so each indicator is one contiguous array and pandas wraps
+        the block without copying it
+        """
+        return np.empty((n, len(self.columns)), dtype=self.dtype, order='F')
+
+    def fill(self, close, high=None, low=None, out=None, start=0, series=None):
+        """
+        Function to compute every declared indicator into out (allocated if None)
+        - start: first bar to store, out holds bars start onwards
+        - series: optional series(name, params, compute) returning the full-length
+          array, used to serve indicators from a cache
+        """
+        if out is None:
+            out = self.allocate(max(len(close) - start, 0))
+        if series is None:
+            series = lambda name, params, compute: compute()
+        col = 0
+        for period in self.ema_periods:
+            out[:, col] = series('ema', (period,), lambda: ema(close, period))[start:]
+            col += 1
+        for period in self.sma_periods:
+            out[:, col] = series('sma', (period,), lambda: sma(close, period))[start:]
+            col += 1
+        if self.rsi_period is not None:
+            out[:, col] = series('rsi', (self.rsi_period,), lambda: wilder_rsi(close, self.rsi_period))[start:]
+            col += 1
+        if self.stoch_periods is not None:
+            # %K and %D come from one call, made at most once
+            both = []
+            def compute(i):
+                if not both:
+                    both.extend(stochastics(high, low, close, *self.stoch_periods))
+                return both[i]
+            out[:, col] = series('stoch_k', self.stoch_periods, lambda: compute(0))[start:]
+            out[:, col + 1] = series('stoch_d', self.stoch_periods, lambda: compute(1))[start:]
+        return out
+
+    def run(self, df, skip_warmup=False, cache=None, ticker=None):
+        """
+        Function to compute the declared indicators of one price DataFrame
+        - skip_warmup: leave out the first self.warmup bars, which dropna would drop anyway
+        - cache: optional indicator_cache.DiskCache, series for unchanged prices
+          are read from it instead of computed (ticker names the entries)
+        Returns a DataFrame of the indicator columns on df's index, backed by the
+        block. df itself is only read.
+        """
+        start = self.warmup if skip_warmup else 0
+        close = df['Close'].to_numpy()
+        high = df['High'].to_numpy() if self.stoch_periods is not None else None
+        low = df['Low'].to_numpy() if self.stoch_periods is not None else None
+        series = None
+        if cache is not None:
+            key = cache.fingerprint(df)
+            series = lambda name, params, compute: cache.fetch(ticker, key, name, params, compute)
+        block = self.fill(close, high, low, start=start, series=series)
+        return pd.DataFrame(block, index=df.index[start:], columns=self.columns, copy=False)
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import contextlib
+from collections import Counter, defaultdict
+
+
+# Environment switches, read once at import
+# - BACKTEST_LOG_LEVEL: DEBUG logs every entry and reinvestment, INFO one line per ticker (default),
+#   WARNING only problems
+# - BACKTEST_INSTRUMENT=1: record per-stage and per-ticker timers and counters
+# - BACKTEST_PROFILE=cprofile,tracemalloc: run the hooks around the whole run (implies BACKTEST_INSTRUMENT)
+# - BACKTEST_REPORT=path.ndjson: where the run report goes (default: a summary on stderr)
+LOG_LEVEL = os.environ.get('BACKTEST_LOG_LEVEL', 'INFO').upper()
+PROFILE = {hook.strip().lower() for hook in os.environ.get('BACKTEST_PROFILE', '').split(',') if hook.strip()}
+ENABLED = os.environ.get('BACKTEST_INSTRUMENT', '') not in ('', '0') or bool(PROFILE)
+REPORT_PATH = os.environ.get('BACKTEST_REPORT')
+# Functions listed from the cProfile stats, allocation sites from tracemalloc
+PROFILE_TOP = 25
+
+log = logging.getLogger('backtest')
+
+# Returned by stage() when disabled: entering it costs one attribute lookup
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Recorder:
+    """
+    Per-process timers and counters
+    - stages: {name: [calls, total seconds, max seconds]}
+    - records: (stage, ticker, seconds) for every timed call with a ticker
+    - counters: {name: total}
+    """
+
+    def __init__(self):
+        self.stages = defaultdict(lambda: [0, 0.0, 0.0])
+        self.records = []
+        self.counters = Counter()
+
+    @contextlib.contextmanager
+    def _timed(self, name, ticker):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, ticker)
+
+    def stage(self, name, ticker=None):
+        return self._timed(name, ticker)
+
+    def add(self, name, seconds, ticker=None):
+        totals = self.stages[name]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+        if ticker is not None:
+            self.records.append((name, ticker, seconds))
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def summary(self):
+        return {
+            'stages': {name: {'calls': calls, 'seconds': total, 'max_seconds': longest}
+                       for name, (calls, total, longest) in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def reset(self):
+        self.stages.clear()
+        self.records.clear()
+        self.counters.clear()
+
+
+recorder = Recorder()
+
+
+def stage(name, ticker=None):
+    """
+    Function to time a block as one call of a stage: with stage('indicators', ticker): ...
+    A no-op context when instrumentation is off
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return recorder.stage(name, ticker)
+
+
+def count(name, n=1):
+    """
+    Function to add n to a counter (bars processed, entries evaluated, ...)
+    """
+    if ENABLED:
+        recorder.counters[name] += n
+
+
+def configure_logging(level=None):
+    """
+    Function to send the backtest logger to stdout at BACKTEST_LOG_LEVEL
+    Library callers that never call this only see warnings (Python's default)
+    """
+    level = level or LOG_LEVEL
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+    log.setLevel(level)
+    log.propagate = False
+
+
+def _profile_lines(profiler):
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (calls, _, own, cumulative, _) in stats.stats.items():
+        rows.append({'type': 'profile', 'function': f'{os.path.basename(filename)}:{line}({function})',
+                     'calls': calls, 'own_seconds': own, 'cumulative_seconds': cumulative})
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:PROFILE_TOP]
+
+
+def _allocation_lines(snapshot):
+    rows = []
+    for stat in snapshot.statistics('lineno')[:PROFILE_TOP]:
+        frame = stat.traceback[0]
+        rows.append({'type': 'allocation', 'site': f'{os.path.basename(frame.filename)}:{frame.lineno}',
+                     'bytes': stat.size, 'blocks': stat.count})
+    return rows
+
+
+def build_report(name, wall, profiler=None, snapshot=None, peak=None):
+    """
+    Function to turn the recorder into report lines: one run line, one line per
+    ticker and stage, the summary, then the profile and allocation tops
+    """
+    lines = [{
+        'type': 'run',
+        'name': name,
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'argv': sys.argv,
+        'pid': os.getpid(),
+        'profile': sorted(PROFILE),
+    }]
+    lines += [{'type': 'stage', 'stage': stage_name, 'ticker': ticker, 'seconds': seconds}
+              for stage_name, ticker, seconds in recorder.records]
+    summary = {'type': 'summary', 'wall_seconds': wall}
+    summary.update(recorder.summary())
+    if peak is not None:
+        summary['tracemalloc_peak_bytes'] = peak
+    lines.append(summary)
+    if profiler is not None:
+        lines += _profile_lines(profiler)
+    if snapshot is not None:
+        lines += _allocation_lines(snapshot)
+    return lines
+
+
+def write_report(lines, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        for line in lines:
+            f.write(json.dumps(line, default=str) + '\n')
+
+
+def print_summary(lines, stream=None):
+    stream = stream or sys.stderr
+    summary = next(line for line in lines if line['type'] == 'summary')
+    print(f"Run took {summary['wall_seconds']:.2f}s", file=stream)
+    for name, stats in sorted(summary['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"  {name:<16}{stats['seconds']:>9.3f}s  {stats['calls']:>6} calls  max {stats['max_seconds'] * 1000:.1f}ms",
+              file=stream)
+    for name, value in sorted(summary['counters'].items()):
+        print(f"  {name:<16}{value:>10}", file=stream)
+    if 'tracemalloc_peak_bytes' in summary:
+        print(f"  tracemalloc peak {summary['tracemalloc_peak_bytes'] / 2 ** 20:.1f} MB", file=stream)
+    for line in lines:
+        if line['type'] == 'profile':
+            print(f"  {line['cumulative_seconds']:>8.3f}s cum {line['own_seconds']:>8.3f}s own  {line['function']}", file=stream)
+
+
+@contextlib.contextmanager
+def instrumented_run(name, report_path=None):
+    """
+    Function to wrap a script's main body: configures logging and, when
+    instrumentation is on, runs the profiling hooks and writes the report at the end
+    """
+    configure_logging()
+    if not ENABLED:
+        yield
+        return
+    # Profilers are only imported when a run asks for them
+    import cProfile
+    import tracemalloc
+    report_path = report_path or REPORT_PATH
+    recorder.reset()
+    profiler = cProfile.Profile() if 'cprofile' in PROFILE else None
+    if 'tracemalloc' in PROFILE:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - start
+        snapshot = peak = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        lines = build_report(name, wall, profiler, snapshot, peak)
+        if report_path:
+            write_report(lines, report_path)
+            print(f"Wrote run report to {report_path}", file=sys.stderr)
+        else:
+            print_summary(lines)
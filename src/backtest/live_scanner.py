@@ -0,0 +1,320 @@
+import sys
+import time
+import array
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+
+from streaming import IndicatorState
+from instrumentation import log, configure_logging
+
+
+FEED_HOST = '127.0.0.1'
+FEED_PORT = 8765
+# Batches of parsed bars waiting for the consumer; the reader stops reading the
+# socket when it is full, so TCP flow control pushes back on the feed
+QUEUE_BATCHES = 64
+# Entry signals waiting for on_signal
+SIGNAL_QUEUE = 1024
+READ_CHUNK = 1 << 16
+
+# Feed protocol, one ASCII line per message:
+#   T <sent time, ns since the epoch>       stamps the bars that follow
+#   <ticker>,<YYYY-MM-DD>,<High>,<Low>,<Close>,<Adj Close>
+#   E                                       end of the replay
+# Prices are written with repr, so they round trip exactly.
+
+
+def encode_days(data):
+    """
+    Function to turn {ticker: DataFrame} into the replay: one (date, bytes) per
+    trading day holding every ticker's bar of that day
+    """
+    dates, lines = [], []
+    for ticker, df in data.items():
+        day = df.index.strftime('%Y-%m-%d')
+        columns = [df[column].to_numpy(dtype=np.float64).tolist() for column in ('High', 'Low', 'Close', 'Adj Close')]
+        for date, high, low, close, adj_close in zip(day, *columns):
+            lines.append(f'{ticker},{date},{high!r},{low!r},{close!r},{adj_close!r}\n')
+        dates.append(df.index.to_numpy(dtype='datetime64[ns]'))
+    if not lines:
+        return []
+    dates = np.concatenate(dates)
+    order = np.argsort(dates, kind='stable')
+    days = []
+    bounds = np.flatnonzero(np.diff(dates[order])) + 1
+    for rows in np.split(order, bounds):
+        days.append((pd.Timestamp(dates[rows[0]]), ''.join(lines[i] for i in rows).encode()))
+    return days
+
+
+class ReplayFeed:
+    """
+    Local TCP stand-in for a live bar feed, replaying stored bars day by day
+    - speed: trading days sent per second (0 sends as fast as the client reads)
+    Each client gets the whole replay. drain() after every day blocks the feed
+    while a slow client's socket buffer is full.
+    """
+
+    def __init__(self, data, speed=0, host=FEED_HOST, port=FEED_PORT):
+        self.days = encode_days(data)
+        self.bars = sum(len(df) for df in data.values())
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.server = None
+        self.drain_seconds = 0.0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        # port 0 picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def _serve(self, reader, writer):
+        start = time.perf_counter()
+        try:
+            for i, (_, payload) in enumerate(self.days):
+                if self.speed:
+                    delay = start + i / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                writer.write(b'T %d\n' % time.time_ns())
+                writer.write(payload)
+                waited = time.perf_counter()
+                await writer.drain()
+                self.drain_seconds += time.perf_counter() - waited
+            writer.write(b'E\n')
+            await writer.drain()
+        except ConnectionError:
+            log.warning("Feed client disconnected")
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class LiveScanner:
+    """
+    Subscribes to a bar feed and evaluates the bullish entry bar by bar
+    - states: {ticker: streaming.IndicatorState}, e.g. from a checkpoint; new
+      tickers get a fresh state
+    - on_signal(ticker, values, latency_ms): called for every Entry Point bar
+      (default: log it)
+    Reading, indicator updates and signal handling are separate tasks joined by
+    bounded queues, all on one event loop.
+    """
+
+    def __init__(self, states=None, queue_batches=QUEUE_BATCHES, on_signal=None):
+        self.states = states if states is not None else {}
+        self.queue_batches = queue_batches
+        self.on_signal = on_signal or self._log_signal
+        self.signals = []
+        self.bars = 0
+        self.stale = 0
+        # Feed send -> indicator update done, per bar
+        self.latency_ns = array.array('q')
+        self.max_queue = 0
+        self.backpressure_seconds = 0.0
+        self.wall_seconds = 0.0
+        # Dates repeat across tickers, so each string is parsed once
+        self._dates = {}
+
+    @staticmethod
+    def _log_signal(ticker, values, latency_ms):
+        log.info("Entry point for %s on %s (%.2fms after the feed sent it)", ticker, f"{values['Date']:%Y-%m-%d}", latency_ms)
+
+    async def run(self, host=FEED_HOST, port=FEED_PORT):
+        """
+        Function to connect to the feed and scan until it ends
+        Returns the stats (see stats())
+        """
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(host, port, limit=READ_CHUNK * 4)
+        bars = asyncio.Queue(maxsize=self.queue_batches)
+        signals = asyncio.Queue(maxsize=SIGNAL_QUEUE)
+        tasks = [
+            asyncio.create_task(self._read(reader, bars)),
+            asyncio.create_task(self._consume(bars, signals)),
+            asyncio.create_task(self._emit(signals)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+        self.wall_seconds = time.perf_counter() - start
+        return self.stats()
+
+    async def _put(self, queue, item):
+        if queue.full():
+            waited = time.perf_counter()
+            await queue.put(item)
+            self.backpressure_seconds += time.perf_counter() - waited
+        else:
+            queue.put_nowait(item)
+
+    async def _read(self, reader, bars):
+        """
+        Reader task: split the byte stream into batches of (sent_ns, lines)
+        """
+        pending = b''
+        sent_ns = 0
+        while True:
+            chunk = await reader.read(READ_CHUNK)
+            self.max_queue = max(self.max_queue, bars.qsize())
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            batch = []
+            for line in lines:
+                if line[:2] == b'T ':
+                    if batch:
+                        await self._put(bars, (sent_ns, batch))
+                        batch = []
+                    sent_ns = int(line[2:])
+                elif line == b'E':
+                    if batch:
+                        await self._put(bars, (sent_ns, batch))
+                    await bars.put(None)
+                    return
+                elif line:
+                    batch.append(line)
+            if batch:
+                await self._put(bars, (sent_ns, batch))
+        await bars.put(None)
+
+    async def _consume(self, bars, signals):
+        """
+        Consumer task: O(1) indicator update per bar, Entry Point bars go to the signal queue
+        """
+        states = self.states
+        dates = self._dates
+        while True:
+            item = await bars.get()
+            if item is None:
+                await signals.put(None)
+                return
+            sent_ns, lines = item
+            for line in lines:
+                ticker, date, high, low, close, adj_close = line.decode().split(',')
+                state = states.get(ticker)
+                if state is None:
+                    state = states[ticker] = IndicatorState(ticker)
+                if date not in dates:
+                    dates[date] = pd.Timestamp(date)
+                values = state.update({'Date': dates[date], 'High': float(high), 'Low': float(low),
+                                       'Close': float(close), 'Adj Close': float(adj_close)})
+                latency = time.time_ns() - sent_ns
+                self.latency_ns.append(latency)
+                self.bars += 1
+                if values is None:
+                    # Replayed or out of order bar, already in the state
+                    self.stale += 1
+                elif values['Entry Point']:
+                    await signals.put((ticker, values, latency / 1e6))
+            # Let the reader and the signal task run between batches
+            await asyncio.sleep(0)
+
+    async def _emit(self, signals):
+        while True:
+            item = await signals.get()
+            if item is None:
+                return
+            ticker, values, latency_ms = item
+            self.signals.append((ticker, values['Date']))
+            self.on_signal(ticker, values, latency_ms)
+
+    def stats(self):
+        latency = np.frombuffer(self.latency_ns, dtype=np.int64) / 1e6 if self.bars else np.zeros(1)
+        return {
+            'tickers': len(self.states),
+            'bars': self.bars,
+            'stale_bars': self.stale,
+            'signals': len(self.signals),
+            'wall_seconds': self.wall_seconds,
+            'bars_per_second': self.bars / self.wall_seconds if self.wall_seconds else 0.0,
+            'latency_ms_p50': float(np.percentile(latency, 50)),
+            'latency_ms_p99': float(np.percentile(latency, 99)),
+            'latency_ms_max': float(latency.max()),
+            'max_queue_batches': self.max_queue,
+            'backpressure_seconds': self.backpressure_seconds,
+        }
+
+
+async def run_replay(data, speed=0, queue_batches=QUEUE_BATCHES, states=None, on_signal=None):
+    """
+    Function to replay data through a local feed and scan it on the same event loop
+    Returns (scanner, feed)
+    """
+    feed = ReplayFeed(data, speed, port=0)
+    port = await feed.start()
+    scanner = LiveScanner(states, queue_batches, on_signal)
+    try:
+        await scanner.run(FEED_HOST, port)
+    finally:
+        await feed.close()
+    return scanner, feed
+
+
+def print_stats(stats, feed=None):
+    print(f"{stats['tickers']} tickers, {stats['bars']} bars, {stats['signals']} entry signals "
+          f"in {stats['wall_seconds']:.2f}s ({stats['bars_per_second']:,.0f} bars/s)")
+    print(f"  latency p50 {stats['latency_ms_p50']:.2f}ms, p99 {stats['latency_ms_p99']:.2f}ms, "
+          f"max {stats['latency_ms_max']:.2f}ms")
+    print(f"  bar queue peaked at {stats['max_queue_batches']} batches, reader waited "
+          f"{stats['backpressure_seconds']:.2f}s on a full queue")
+    if feed is not None:
+        print(f"  feed waited {feed.drain_seconds:.2f}s on the socket")
+
+
+def load_feed_data(sectors, patterns=None, copies=1):
+    from run_backtest import select_tickers, load_range
+    data = load_range(select_tickers(sectors, patterns))
+    if copies > 1:
+        # Same sector under new names, to try thousands of tickers
+        data = {f'{ticker}_{i}': df for i in range(copies) for ticker, df in data.items()}
+    return data
+
+
+async def _serve_forever(feed):
+    port = await feed.start()
+    print(f"Replaying {len(feed.days)} days, {feed.bars} bars on {feed.host}:{port}")
+    async with feed.server:
+        await feed.server.serve_forever()
+
+
+if __name__ == "__main__":
+    # python live_scanner.py [--sector HealthCare] [--tickers 'A*'] [--copies 50] [--speed 0]
+    #                        [--serve [--port 8765]] [--connect host:port]
+    # Default: feed and scanner in one process over a local socket
+    parser = argparse.ArgumentParser(description='Scan streaming bars for bullish entries')
+    parser.add_argument('--sector', nargs='+', default=['HealthCare'])
+    parser.add_argument('--tickers', nargs='+')
+    parser.add_argument('--copies', type=int, default=1, help='replay the tickers this many times under new names')
+    parser.add_argument('--speed', type=float, default=0, help='trading days per second, 0 for as fast as possible')
+    parser.add_argument('--queue', type=int, default=QUEUE_BATCHES, help='bar queue size, in batches')
+    parser.add_argument('--serve', action='store_true', help='only run the replay feed')
+    parser.add_argument('--port', type=int, default=FEED_PORT)
+    parser.add_argument('--connect', help='only run the scanner, against host:port')
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        scanner = LiveScanner(queue_batches=args.queue)
+        print_stats(asyncio.run(scanner.run(host, int(port))))
+        sys.exit(0)
+
+    data = load_feed_data(args.sector, args.tickers, args.copies)
+    if args.serve:
+        asyncio.run(_serve_forever(ReplayFeed(data, args.speed, port=args.port)))
+    else:
+        scanner, feed = asyncio.run(run_replay(data, args.speed, args.queue))
+        print_stats(scanner.stats(), feed)
@@ -0,0 +1,183 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from trade_simulator import NO_PNL
+from backtest_bullish_entry import INITIAL_BALANCE
+from instrumentation import configure_logging
+
+
+METHODS = ['bootstrap', 'shuffle']
+N_PATHS = 100_000
+# Paths simulated per array pass; a chunk holds about three chunk x trades float64 arrays
+CHUNK_PATHS = 10_000
+# Below this many path x trade cells a pool costs more than it saves
+POOL_MIN_CELLS = 50_000_000
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+# Ruin: the equity falls this far below its running peak at some point of a path
+RUIN_DRAWDOWNS = [0.2, 0.3, 0.5]
+
+# Equity model: every closed trade puts `fraction` of the current balance at its
+# PNL, balance *= 1 + fraction * pnl. reinvest_winnings only compounds the
+# winners, which no reordering can change, so losses are applied here too.
+
+
+def trade_pnls(entry_points):
+    """
+    Function to collect the closed trades of evaluate_strategy's entry_points
+    Returns (PNL array, entry dates) in entry date order; entries without an
+    exit bar (PNL NO_PNL) are left out
+    """
+    frames = [df[['Date', 'PNL']] for _, df in entry_points if len(df)]
+    if not frames:
+        return np.empty(0), pd.DatetimeIndex([])
+    trades = pd.concat(frames, ignore_index=True)
+    trades = trades[trades['PNL'] != NO_PNL].sort_values('Date', kind='stable')
+    return trades['PNL'].to_numpy(dtype=np.float64), pd.DatetimeIndex(trades['Date'])
+
+
+def path_stats(growth):
+    """
+    Function to turn per-trade log growth (paths x trades) into per-path
+    (terminal equity multiple, max drawdown)
+    - growth is overwritten with the cumulative log equity
+    """
+    np.cumsum(growth, axis=1, out=growth)
+    # The starting balance is the first peak
+    peak = np.maximum.accumulate(np.maximum(growth, 0.0), axis=1)
+    # Deepest fall below the running peak, in log space until the end
+    deepest = (growth - peak).min(axis=1)
+    terminal = np.exp(growth[:, -1])
+    return terminal, -np.expm1(np.minimum(deepest, 0.0))
+
+
+def _simulate_chunk(pnl, n_paths, method, fraction, seed):
+    """
+    Worker task: simulate one chunk of paths with its own seed
+    Returns (terminal equity multiples, max drawdowns)
+    """
+    rng = np.random.default_rng(seed)
+    # A trade losing 1 / fraction or more wipes the balance out: log growth -inf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.log1p(np.maximum(fraction * pnl, -1.0))
+    if method == 'bootstrap':
+        # Trades drawn with replacement: other outcomes of the same edge
+        paths = growth[rng.integers(0, len(pnl), size=(n_paths, len(pnl)))]
+    elif method == 'shuffle':
+        # The same trades in another order: the terminal equity is fixed,
+        # only the path to it changes
+        paths = rng.permuted(np.broadcast_to(growth, (n_paths, len(pnl))), axis=1)
+    else:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    with np.errstate(invalid='ignore'):
+        return path_stats(paths)
+
+
+def simulate_paths(pnl, n_paths=N_PATHS, method='bootstrap', fraction=1.0, seed=0,
+                   chunk_paths=CHUNK_PATHS, max_workers=None):
+    """
+    Function to simulate n_paths trade sequences from a PNL array
+    - method: 'bootstrap' (resample with replacement) or 'shuffle' (reorder)
+    - fraction: share of the balance each trade puts at its PNL
+    - Paths are simulated in chunks of chunk_paths, each seeded from seed, so
+      the result does not depend on max_workers
+    - max_workers: process pool size; by default a pool is only used on more
+      than one CPU and for runs of at least POOL_MIN_CELLS path x trade cells
+    Returns (terminal equity multiples, max drawdowns), one per path
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if len(pnl) == 0:
+        return np.ones(n_paths), np.zeros(n_paths)
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if max_workers is None:
+        cpus = os.cpu_count() or 1
+        max_workers = cpus if cpus > 1 and n_paths * len(pnl) >= POOL_MIN_CELLS else 1
+
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_simulate_chunk, pnl, size, method, fraction, chunk_seed)
+                       for size, chunk_seed in zip(sizes, seeds)]
+            results = [future.result() for future in futures]
+    else:
+        results = [_simulate_chunk(pnl, size, method, fraction, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    terminal = np.concatenate([chunk[0] for chunk in results])
+    drawdown = np.concatenate([chunk[1] for chunk in results])
+    return terminal, drawdown
+
+
+def summarize(terminal, drawdown, pnl, fraction=1.0, initial_balance=INITIAL_BALANCE,
+              percentiles=PERCENTILES, ruin_drawdowns=RUIN_DRAWDOWNS):
+    """
+    Function to summarize simulated paths next to the historical trade order
+    Returns a dict with terminal equity and max drawdown percentiles, the
+    probability of losing money and the ruin probability of each drawdown level
+    """
+    historical_terminal, historical_drawdown = _simulate_history(pnl, fraction)
+    return {
+        'paths': len(terminal),
+        'trades': len(pnl),
+        'initial_balance': initial_balance,
+        'historical': {
+            'terminal_equity': float(historical_terminal * initial_balance),
+            'max_drawdown': float(historical_drawdown),
+        },
+        'terminal_equity': {p: float(v) for p, v in zip(percentiles, np.percentile(terminal, percentiles) * initial_balance)},
+        'max_drawdown': {p: float(v) for p, v in zip(percentiles, np.percentile(drawdown, percentiles))},
+        'loss_probability': float((terminal < 1.0).mean()),
+        'ruin_probability': {level: float((drawdown >= level).mean()) for level in ruin_drawdowns},
+    }
+
+
+def _simulate_history(pnl, fraction):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.log1p(np.maximum(fraction * np.asarray(pnl, dtype=np.float64), -1.0))[None, :]
+    if growth.shape[1] == 0:
+        return 1.0, 0.0
+    terminal, drawdown = path_stats(growth)
+    return terminal[0], drawdown[0]
+
+
+def print_summary(summary):
+    print(f"{summary['paths']:,} paths of {summary['trades']} trades from ${summary['initial_balance']:,.2f}")
+    historical = summary['historical']
+    print(f"  historical order: ${historical['terminal_equity']:,.2f}, "
+          f"max drawdown {historical['max_drawdown']:.1%}")
+    print(f"  {'percentile':>10}  {'terminal equity':>16}  {'max drawdown':>12}")
+    for p in summary['terminal_equity']:
+        print(f"  {p:>10}  ${summary['terminal_equity'][p]:>15,.2f}  {summary['max_drawdown'][p]:>12.1%}")
+    print(f"  P(ending below the initial balance): {summary['loss_probability']:.2%}")
+    for level, probability in summary['ruin_probability'].items():
+        print(f"  P(drawdown of {level:.0%} or more): {probability:.2%}")
+
+
+if __name__ == "__main__":
+    # python monte_carlo.py [--sector HealthCare] [--tickers 'A*'] [--paths 100000]
+    #                       [--method bootstrap|shuffle] [--fraction 1.0] [--workers N] [--seed 0]
+    from run_backtest import select_tickers, load_range
+    from backtest_bullish_entry import bullish_strategy, evaluate_strategy
+    parser = argparse.ArgumentParser(description='Monte Carlo robustness of the backtest trades')
+    parser.add_argument('--sector', nargs='+', default=['HealthCare'])
+    parser.add_argument('--tickers', nargs='+')
+    parser.add_argument('--paths', type=int, default=N_PATHS)
+    parser.add_argument('--method', choices=METHODS, default='bootstrap')
+    parser.add_argument('--fraction', type=float, default=1.0, help='share of the balance put at each trade')
+    parser.add_argument('--workers', type=int, help='process pool size (default: a pool for large runs only)')
+    parser.add_argument('--chunk', type=int, default=CHUNK_PATHS, help='paths per array pass')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    configure_logging('WARNING')
+
+    data = load_range(select_tickers(args.sector, args.tickers))
+    entry_points, _ = evaluate_strategy(bullish_strategy(data))
+    pnl, _ = trade_pnls(entry_points)
+
+    start = time.perf_counter()
+    terminal, drawdown = simulate_paths(pnl, args.paths, args.method, args.fraction, args.seed,
+                                        args.chunk, args.workers)
+    elapsed = time.perf_counter() - start
+    print_summary(summarize(terminal, drawdown, pnl, args.fraction))
+    print(f"Simulated in {elapsed:.2f}s")
@@ -0,0 +1,204 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from price_store import PRICE_COLUMNS
+
+
+class Panel:
+    """
+    Dates x tickers matrices of every price field on a common calendar
+    - Cells where a ticker has no bar (before listing, after delisting, gaps)
+      are NaN and masked out by `valid`
+    """
+
+    def __init__(self, dates, tickers, fields, valid, dtypes=None):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.fields = fields
+        self.valid = valid
+        # Source dtype per ticker and field, so frames can be rebuilt exactly
+        self.dtypes = dtypes or {}
+
+    @classmethod
+    def from_frames(cls, data):
+        """
+        Function to build a panel from {ticker: DataFrame} (as returned by get_stock_data)
+        """
+        tickers = list(data)
+        frames = [data[ticker] for ticker in tickers]
+        stamps = [df.index.to_numpy(dtype='datetime64[us]') for df in frames]
+        all_stamps = np.concatenate(stamps) if stamps else np.empty(0, dtype='datetime64[us]')
+        calendar = np.unique(all_stamps)
+        dates = pd.DatetimeIndex(calendar, name='Date')
+
+        # Scatter every ticker's rows with one fancy assignment per field
+        rows = np.searchsorted(calendar, all_stamps)
+        cols = np.repeat(np.arange(len(tickers)), [len(df) for df in frames])
+        shape = (len(dates), len(tickers))
+        valid = np.zeros(shape, dtype=bool)
+        valid[rows, cols] = True
+        fields = {}
+        for field in PRICE_COLUMNS:
+            values = np.full(shape, np.nan)
+            if frames:
+                values[rows, cols] = np.concatenate([df[field].to_numpy(dtype=np.float64) for df in frames])
+            fields[field] = values
+        dtypes = {ticker: {field: df[field].dtype for field in PRICE_COLUMNS} for ticker, df in zip(tickers, frames)}
+        return cls(dates, tickers, fields, valid, dtypes)
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+
+# Indicators run on "compacted" matrices: each column's bars are moved to the
+# top in date order, so a column is exactly the series its ticker would have on
+# its own. One pandas call then handles every ticker, and the result is moved
+# back onto the calendar.
+
+def compact(values, valid):
+    """
+    Function to move each column's valid cells to the top, keeping their order
+    Returns (compacted, order) where order undoes the move in expand()
+    """
+    order = np.argsort(~valid, axis=0, kind='stable')
+    compacted = np.take_along_axis(values, order, axis=0)
+    counts = valid.sum(axis=0)
+    compacted[np.arange(len(values))[:, None] >= counts] = np.nan
+    return compacted, order
+
+
+def expand(compacted, order, valid):
+    """
+    Function to put compacted values back on the calendar (NaN where not valid)
+    """
+    values = np.empty_like(compacted)
+    np.put_along_axis(values, order, compacted, axis=0)
+    values[~valid] = np.nan
+    return values
+
+
+def ema(compacted, period):
+    return pd.DataFrame(compacted).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def sma(compacted, period):
+    return pd.DataFrame(compacted).rolling(window=period).mean().to_numpy()
+
+
+def stochastics(high, low, close, k_period=8, d_period=3):
+    highest_high = pd.DataFrame(high).rolling(window=k_period).max().to_numpy()
+    lowest_low = pd.DataFrame(low).rolling(window=k_period).min().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = (close - lowest_low) / (highest_high - lowest_low)
+    d = pd.DataFrame(k).rolling(window=d_period).mean().to_numpy()
+    return k, d
+
+
+def wilder_rsi(compacted, rsi_period=2):
+    """
+    Function to calculate Wilder's RSI for every column at once
+    (same seed and recurrence as indicators.wilder_rsi, stepped over dates)
+    """
+    n = len(compacted)
+    change = np.full(compacted.shape, np.nan)
+    change[1:] = compacted[1:] - compacted[:-1]
+    with np.errstate(invalid='ignore'):
+        gain = np.where(change >= 0, change, 0.0)
+        loss = np.where(change < 0, -change, 0.0)
+
+    avg_gain = np.zeros(compacted.shape)
+    avg_loss = np.zeros(compacted.shape)
+    if n <= rsi_period:
+        return np.full(compacted.shape, np.nan)
+    seed = slice(0, rsi_period + 1)
+    avg_gain[rsi_period] = pd.DataFrame(gain[seed]).rolling(window=rsi_period).mean().to_numpy()[rsi_period]
+    avg_loss[rsi_period] = pd.DataFrame(loss[seed]).rolling(window=rsi_period).mean().to_numpy()[rsi_period]
+    # Each step is one vector operation across all tickers
+    for i in range(rsi_period + 1, n):
+        avg_gain[i] = (avg_gain[i - 1] * (rsi_period - 1) + gain[i]) / rsi_period
+        avg_loss[i] = (avg_loss[i - 1] * (rsi_period - 1) + loss[i]) / rsi_period
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def bullish_strategy_panel(panel, ema_periods=(8, 21, 34), sma_periods=(50, 100, 200),
+                           rsi_period=2, k_period=8, d_period=3):
+    """
+    Function to apply the bullish strategy to a whole panel in one pass
+    Returns {name: dates x tickers matrix} with the EMA/SMA/rsi columns bullish_strategy
+    adds, '%K', '%D', 'Entry Point' (0/1) and 'kept' (rows bullish_strategy's dropna keeps)
+    """
+    valid = panel.valid
+    close, order = compact(panel['Close'], valid)
+    high, _ = compact(panel['High'], valid)
+    low, _ = compact(panel['Low'], valid)
+
+    out = {}
+    for period in ema_periods:
+        out[f'EMA_{period}'] = ema(close, period)
+    for period in sma_periods:
+        out[f'SMA_{period}'] = sma(close, period)
+    out['rsi'] = wilder_rsi(close, rsi_period)
+    out['%K'], out['%D'] = stochastics(high, low, close, k_period, d_period)
+    out = {name: expand(values, order, valid) for name, values in out.items()}
+
+    ema_series = [out[f'EMA_{period}'] for period in ema_periods]
+    sma_series = [out[f'SMA_{period}'] for period in sma_periods]
+    ema_sma_trend_mask = np.logical_and.reduce(
+        [a > b for a, b in zip(ema_series, ema_series[1:])] + [a > b for a, b in zip(sma_series, sma_series[1:])]
+    )
+    retracement_stochas_mask = (out['%K'] <= 40) & (out['%D'] <= 40)
+    retracement_rsi_mask = out['rsi'] <= 10
+    low_bar_mask = panel['Adj Close'] > panel['Low']
+    single_mask = ema_sma_trend_mask & retracement_stochas_mask & retracement_rsi_mask & low_bar_mask
+    out['Entry Point'] = np.where(single_mask, 1, 0)
+
+    # Rows without a NaN in any price or indicator column bullish_strategy keeps
+    kept = valid.copy()
+    for field in PRICE_COLUMNS:
+        kept &= ~np.isnan(panel[field])
+    for name in [f'EMA_{p}' for p in ema_periods] + [f'SMA_{p}' for p in sma_periods] + ['rsi']:
+        kept &= ~np.isnan(out[name])
+    out['kept'] = kept
+    return out
+
+
+def panel_to_frames(panel, out, ema_periods=(8, 21, 34), sma_periods=(50, 100, 200)):
+    """
+    Function to turn panel results into the {ticker: DataFrame} bullish_strategy returns,
+    so evaluate_strategy and the plots work unchanged
+    """
+    columns = [f'EMA_{p}' for p in ema_periods] + [f'SMA_{p}' for p in sma_periods] + ['rsi']
+    data = {}
+    for j, ticker in enumerate(panel.tickers):
+        rows = out['kept'][:, j]
+        dtypes = panel.dtypes.get(ticker, {})
+        frame = {field: panel[field][rows, j].astype(dtypes.get(field, np.float64)) for field in PRICE_COLUMNS}
+        for name in columns:
+            frame[name] = out[name][rows, j]
+        frame['Entry Point'] = out['Entry Point'][rows, j]
+        data[ticker] = pd.DataFrame(frame, index=panel.dates[rows])
+    return data
+
+
+if __name__ == "__main__":
+    # python panel.py [copies]: time the panel pass on the sector tiled `copies` times
+    from backtest_bullish_entry import tickers, get_stock_data, bullish_strategy
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    data = get_stock_data(tickers)
+    data = {f'{ticker}_{i}': df for i in range(copies) for ticker, df in data.items()}
+
+    start = time.perf_counter()
+    panel = Panel.from_frames(data)
+    out = bullish_strategy_panel(panel)
+    panel_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bullish_strategy(dict(data))
+    loop_time = time.perf_counter() - start
+    print(f"{len(data)} tickers x {len(panel.dates)} dates: panel {panel_time:.2f}s, "
+          f"per-ticker bullish_strategy {loop_time:.2f}s, {int(out['Entry Point'].sum())} entries")
@@ -0,0 +1,205 @@
+import os
+import sys
+import math
+import time
+import logging
+import contextlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+from backtest_bullish_entry import (
+    INITIAL_BALANCE, tickers, get_stock_data, bullish_strategy,
+    evaluate_entries, reinvest_winnings, entry_point_columns, restrict_entries,
+)
+from price_store import PRICE_COLUMNS
+from indicator_cache import DiskCache
+from instrumentation import log
+
+
+# Shared price arrays attached by each worker (set in _attach_shared)
+_shared = {}
+
+
+def pack_shared(data):
+    """
+    Function to copy every ticker's prices into shared memory blocks
+    - One block per column with all tickers back to back, so workers rebuild a
+      ticker's DataFrame from views instead of unpickling it
+    Returns (blocks, layout) where layout is sent to the workers
+    """
+    names = list(data)
+    lengths = [len(data[ticker]) for ticker in names]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int) if names else []
+    total = max(int(sum(lengths)), 1)
+
+    blocks = []
+    layout = {
+        'tickers': {ticker: (int(offset), int(length)) for ticker, offset, length in zip(names, offsets, lengths)},
+        'columns': {},
+        'total': total,
+    }
+    columns = [('Date', 'int64')] + [(column, 'int64' if column == 'Volume' else 'float64') for column in PRICE_COLUMNS]
+    for column, dtype in columns:
+        block = shared_memory.SharedMemory(create=True, size=total * np.dtype(dtype).itemsize)
+        blocks.append(block)
+        values = np.ndarray((total,), dtype=dtype, buffer=block.buf)
+        for ticker, offset, length in zip(names, offsets, lengths):
+            df = data[ticker]
+            if column == 'Date':
+                source = df.index.to_numpy(dtype='datetime64[us]').view('int64')
+            else:
+                source = df[column].to_numpy(dtype=dtype)
+            values[offset:offset + length] = source
+        layout['columns'][column] = (block.name, dtype)
+
+    return blocks, layout
+
+
+def release_shared(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _attach_shared(layout):
+    """
+    Worker initializer: map the shared blocks once per process
+    """
+    _shared['layout'] = layout
+    _shared['blocks'] = []
+    _shared['arrays'] = {}
+    for column, (name, dtype) in layout['columns'].items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared['blocks'].append(block)
+        _shared['arrays'][column] = np.ndarray((layout['total'],), dtype=dtype, buffer=block.buf)
+
+
+def _shared_frame(ticker):
+    offset, length = _shared['layout']['tickers'][ticker]
+    rows = slice(offset, offset + length)
+    arrays = _shared['arrays']
+    index = pd.DatetimeIndex(arrays['Date'][rows].view('datetime64[us]'), name='Date')
+    columns = {column: arrays[column][rows] for column in PRICE_COLUMNS}
+    return pd.DataFrame(columns, index=index, columns=PRICE_COLUMNS, copy=False)
+
+
+@contextlib.contextmanager
+def quiet_log(quiet=True):
+    """
+    Function to keep the backtest logger to warnings for the duration of a block
+    when quiet, for the per-ticker info / debug messages of many tickers
+    """
+    if not quiet or log.getEffectiveLevel() >= logging.WARNING:
+        yield
+        return
+    level = log.level
+    log.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        log.setLevel(level)
+
+
+def _run_chunk(chunk, quiet=True, cache=None, entry_window=None, confirm=None, exits=None):
+    """
+    Worker task: run bullish_strategy and evaluate_entries for a chunk of tickers
+    - entry_window: optional (start, end) outside which entry points are cleared
+    - confirm: optional timeframes.TrendConfirmation passed to bullish_strategy
+    - exits: optional exit_rules.ExitEngine passed to evaluate_entries
+    Returns [(ticker, entries, bars, seconds)] and the worker pid
+    """
+    results = []
+    for ticker in chunk:
+        start = time.perf_counter()
+        df = _shared_frame(ticker)
+        with quiet_log(quiet):
+            df = bullish_strategy({ticker: df}, cache=cache, confirm=confirm)[ticker]
+            if entry_window is not None:
+                df = restrict_entries(df, *entry_window)
+            entries = evaluate_entries(df, exits=exits)
+        results.append((ticker, entries, len(df), time.perf_counter() - start))
+    return results, os.getpid()
+
+
+def default_chunksize(n_tickers, max_workers):
+    # About four chunks per worker keeps the pool busy without many tiny tasks
+    return max(1, math.ceil(n_tickers / (max_workers * 4)))
+
+
+def run_parallel(data, max_workers=None, chunksize=None, quiet=True, cache=None, entry_window=None, confirm=None,
+                 exits=None):
+    """
+    Function to run the bullish strategy and its evaluation across a process pool
+    - data: {ticker: DataFrame} as returned by get_stock_data
+    - max_workers: pool size (default: os.cpu_count())
+    - chunksize: tickers per task (default: about four tasks per worker)
+    - cache: optional indicator_cache.DiskCache shared by the workers through its directory
+    - entry_window: optional (start, end), only entries in that date range are evaluated
+    - confirm: optional timeframes.TrendConfirmation; its bars are built here when
+      stale, then workers open them themselves
+    - exits: optional exit_rules.ExitEngine closing the trades
+    - quiet: log only warnings from the workers and the reinvestment (see quiet_log)
+    Returns (entry_points, inital_balance, report) where entry_points and the
+    balance match evaluate_strategy run serially in the order of data
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    names = list(data)
+    chunksize = chunksize or default_chunksize(len(names), max_workers)
+    chunks = [names[i:i + chunksize] for i in range(0, len(names), chunksize)]
+
+    start = time.perf_counter()
+    if confirm is not None:
+        # Built here once; workers building them at the same time would race
+        confirm.prepare()
+    blocks, layout = pack_shared(data)
+    results = {}
+    workers = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_shared, initargs=(layout,)) as pool:
+            futures = [pool.submit(_run_chunk, chunk, quiet, cache, entry_window, confirm, exits) for chunk in chunks]
+            for future in as_completed(futures):
+                chunk_results, pid = future.result()
+                worker = workers.setdefault(pid, {'tickers': 0, 'bars': 0, 'seconds': 0.0})
+                for ticker, entries, bars, seconds in chunk_results:
+                    results[ticker] = entries
+                    worker['tickers'] += 1
+                    worker['bars'] += bars
+                    worker['seconds'] += seconds
+    finally:
+        release_shared(blocks)
+
+    # Reinvest in ticker order so the balance is identical to a serial run
+    entry_points = []
+    inital_balance = INITIAL_BALANCE
+    with quiet_log(quiet):
+        for ticker in names:
+            entries = results[ticker]
+            inital_balance, _ = reinvest_winnings(entries, ticker, inital_balance)
+            entry_points.append((ticker, entry_point_columns(entries)))
+
+    report = {
+        'tickers': len(names),
+        'max_workers': max_workers,
+        'chunksize': chunksize,
+        'wall_seconds': time.perf_counter() - start,
+        'workers': workers,
+    }
+    return entry_points, inital_balance, report
+
+
+def print_report(report):
+    print(f"{report['tickers']} tickers, {report['max_workers']} workers, "
+          f"chunksize {report['chunksize']}: {report['wall_seconds']:.2f}s wall")
+    for pid, worker in sorted(report['workers'].items()):
+        print(f"  worker {pid}: {worker['tickers']} tickers, {worker['bars']} bars, {worker['seconds']:.2f}s busy")
+
+
+if __name__ == "__main__":
+    # python parallel_runner.py [max_workers]
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    data = get_stock_data(tickers)
+    entry_points, inital_balance, report = run_parallel(data, max_workers=max_workers, cache=DiskCache())
+    print_report(report)
+    print(f"Final balance: ${inital_balance:.2f}")
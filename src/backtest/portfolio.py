@@ -0,0 +1,188 @@
+import sys
+import time
+import heapq
+import numpy as np
+import pandas as pd
+
+from trade_simulator import simulate_trades
+from backtest_bullish_entry import (
+    COMMS, DRAWDOWN_THRESHOLD, INITIAL_BALANCE, MAX_HOLD_DAYS, tickers, get_stock_data, bullish_strategy,
+)
+
+
+MAX_POSITIONS = 10
+# Candidate trade columns and their dtypes
+TRADE_COLUMNS = {
+    'ticker': np.int64,
+    'entry_date': 'datetime64[ns]',
+    'exit_date': 'datetime64[ns]',
+    'entry_row': np.int64,
+    'exit_row': np.int64,
+    'start_price': np.float64,
+    'pnl': np.float64,
+    'stop_hit': bool,
+}
+
+# Event kinds, in the order they are handled on the same day: capital freed by
+# an exit at the close can be used by an entry at the same close
+EXIT = 0
+ENTRY = 1
+
+
+def collect_trades(data, comms=COMMS, drawdown_threshold=DRAWDOWN_THRESHOLD, max_hold_days=MAX_HOLD_DAYS):
+    """
+    Function to simulate every entry signal of every ticker (see trade_simulator.py)
+    - data: {ticker: DataFrame} as returned by bullish_strategy
+    Returns (names, trades) where trades is a DataFrame of candidate trades sorted
+    by entry date then ticker name. Entries on the last bar have no exit and are
+    left out.
+    """
+    names = sorted(data)
+    columns = {column: [] for column in TRADE_COLUMNS}
+    for code, ticker in enumerate(names):
+        df = data[ticker]
+        entry_index = np.flatnonzero(df['Entry Point'].to_numpy() == 1)
+        if len(entry_index) == 0:
+            continue
+        trades = simulate_trades(df['Adj Close'].to_numpy(), entry_index, comms, drawdown_threshold, max_hold_days)
+        trades = trades[trades['exit_index'] >= 0]
+        dates = df.index.to_numpy(dtype='datetime64[ns]')
+        # Plain arrays per ticker, one DataFrame at the end
+        columns['ticker'].append(np.full(len(trades), code))
+        columns['entry_date'].append(dates[trades['entry_index']])
+        columns['exit_date'].append(dates[trades['exit_index']])
+        columns['entry_row'].append(trades['entry_index'])
+        columns['exit_row'].append(trades['exit_index'])
+        columns['start_price'].append(trades['start_price'])
+        columns['pnl'].append(trades['pnl'])
+        columns['stop_hit'].append(trades['stop_hit'])
+
+    trades = pd.DataFrame({column: np.concatenate(parts) if parts else np.empty(0, dtype=TRADE_COLUMNS[column])
+                           for column, parts in columns.items()})
+    trades = trades.sort_values(['entry_date', 'ticker'], kind='stable').reset_index(drop=True)
+    return names, trades
+
+
+def allocate(trades, initial_balance=INITIAL_BALANCE, max_positions=MAX_POSITIONS):
+    """
+    Function to run the candidate trades through one cash account in date order
+    - Entry and exit events share one heap ordered by (date, exits first, ticker)
+    - An entry gets an equal share of the cash left for the free position slots,
+      and is skipped when every slot is taken or its ticker already has a position
+    Returns (size, cash, skipped): the amount invested per trade (0 when skipped),
+    the final cash and the skip counts
+    """
+    entry_ns = trades['entry_date'].to_numpy(dtype='datetime64[ns]').view('int64')
+    exit_ns = trades['exit_date'].to_numpy(dtype='datetime64[ns]').view('int64')
+    ticker = trades['ticker'].to_numpy()
+    growth = 1 + trades['pnl'].to_numpy()
+
+    events = [(int(day), ENTRY, int(code), i) for i, (day, code) in enumerate(zip(entry_ns, ticker))]
+    heapq.heapify(events)
+
+    size = np.zeros(len(trades))
+    cash = float(initial_balance)
+    open_tickers = set()
+    skipped = {'slots_full': 0, 'ticker_open': 0}
+    while events:
+        day, kind, code, i = heapq.heappop(events)
+        if kind == EXIT:
+            cash += size[i] * growth[i]
+            open_tickers.discard(code)
+            continue
+        if len(open_tickers) >= max_positions:
+            skipped['slots_full'] += 1
+            continue
+        if code in open_tickers:
+            skipped['ticker_open'] += 1
+            continue
+        size[i] = cash / (max_positions - len(open_tickers))
+        cash -= size[i]
+        open_tickers.add(code)
+        heapq.heappush(events, (int(exit_ns[i]), EXIT, code, i))
+    return size, cash, skipped
+
+
+def equity_curve(data, names, trades, size, initial_balance=INITIAL_BALANCE):
+    """
+    Function to mark the portfolio to market on every date any ticker traded
+    - Cash moves on entry and exit dates; open positions are valued at their
+      ticker's latest Adj Close (carried over days the ticker has no bar)
+    """
+    calendar = np.unique(np.concatenate([data[ticker].index.to_numpy(dtype='datetime64[ns]') for ticker in names]))
+    n_days = len(calendar)
+    taken = size > 0
+    entry_day = np.searchsorted(calendar, trades['entry_date'].to_numpy(dtype='datetime64[ns]')[taken])
+    exit_day = np.searchsorted(calendar, trades['exit_date'].to_numpy(dtype='datetime64[ns]')[taken])
+    invested = size[taken]
+    proceeds = invested * (1 + trades['pnl'].to_numpy()[taken])
+
+    cash_delta = np.bincount(entry_day, weights=-invested, minlength=n_days)
+    cash_delta += np.bincount(exit_day, weights=proceeds, minlength=n_days)
+    cash = initial_balance + np.cumsum(cash_delta)
+
+    # Each position is open from its entry day up to the day before its exit
+    open_value = np.zeros(n_days)
+    codes = trades['ticker'].to_numpy()[taken]
+    start_price = trades['start_price'].to_numpy()[taken]
+    for code in np.unique(codes):
+        mine = codes == code
+        df = data[names[code]]
+        positions = np.searchsorted(calendar, df.index.to_numpy(dtype='datetime64[ns]'))
+        prices = df['Adj Close'].to_numpy(dtype=np.float64)
+        lengths = exit_day[mine] - entry_day[mine]
+        days = np.repeat(entry_day[mine] - np.cumsum(np.r_[0, lengths[:-1]]), lengths) + np.arange(lengths.sum())
+        rows = np.searchsorted(positions, days, side='right') - 1
+        shares = np.repeat(invested[mine] / start_price[mine], lengths)
+        np.add.at(open_value, days, shares * prices[rows])
+
+    return pd.Series(cash + open_value, index=pd.DatetimeIndex(calendar, name='Date'), name='Equity')
+
+
+def run_portfolio(data, initial_balance=INITIAL_BALANCE, max_positions=MAX_POSITIONS, comms=COMMS,
+                  drawdown_threshold=DRAWDOWN_THRESHOLD, max_hold_days=MAX_HOLD_DAYS):
+    """
+    Function to backtest the entry points of all tickers against one shared balance
+    - data: {ticker: DataFrame} as returned by bullish_strategy
+    - max_positions: most positions open at once
+    Trade exits, PNLs and commissions come from the same simulator as
+    evaluate_strategy. The result does not depend on the order of data.
+    Returns (trades, equity, summary): every candidate trade with the amount
+    invested ('Size', 0 if skipped), the daily equity curve and summary stats
+    """
+    names, trades = collect_trades(data, comms, drawdown_threshold, max_hold_days)
+    size, cash, skipped = allocate(trades, initial_balance, max_positions)
+    equity = equity_curve(data, names, trades, size, initial_balance) if names else pd.Series(dtype=float, name='Equity')
+
+    trades['ticker'] = [names[code] for code in trades['ticker']]
+    trades['Size'] = size
+    trades['Proceeds'] = size * (1 + trades['pnl'])
+    taken = size > 0
+    drawdown = equity / equity.cummax() - 1
+    summary = {
+        'candidates': len(trades),
+        'taken': int(taken.sum()),
+        'skipped_slots_full': skipped['slots_full'],
+        'skipped_ticker_open': skipped['ticker_open'],
+        'win_rate': float((trades['pnl'][taken] > 0).mean()) if taken.any() else float('nan'),
+        'final_equity': float(cash),
+        'total_return': float(cash / initial_balance - 1),
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+    }
+    return trades, equity, summary
+
+
+if __name__ == "__main__":
+    # python portfolio.py [copies] [max_positions]: backtest the sector, tiled `copies` times
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    max_positions = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_POSITIONS
+    data = bullish_strategy(get_stock_data(tickers))
+    data = {f'{ticker}_{i}' if copies > 1 else ticker: df for i in range(copies) for ticker, df in data.items()}
+    bars = sum(len(df) for df in data.values())
+
+    start = time.perf_counter()
+    trades, equity, summary = run_portfolio(data, max_positions=max_positions)
+    elapsed = time.perf_counter() - start
+    print(f"{len(data)} tickers, {bars} bars, {summary['candidates']} signals in {elapsed:.2f}s")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+
+# File location
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DATA_DIR = os.path.join(BASE_DIR, '../', 'csv')
+ROOT_STORE_DIR = os.path.join(BASE_DIR, '../', 'store')
+
+MANIFEST = 'manifest.json'
+STORE_VERSION = 1
+# Spare rows kept after every ticker's slice, so appended bars are written in place
+SLACK_ROWS = 64
+# Column order and dtypes of the *_data_his.csv files
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Adj Close']
+COLUMN_DTYPES = {
+    'Open': 'float64',
+    'High': 'float64',
+    'Low': 'float64',
+    'Close': 'float64',
+    'Volume': 'int64',
+    'Adj Close': 'float64',
+}
+
+# Layout of a sector store (src/store/<sector>/):
+# - data-<stamp>/ holds Date.npy and one <column>.npy per price field, each holding
+#   every ticker's rows back to back, so a ticker is one contiguous slice of each file
+# - manifest.json names that directory (data_dir) and maps ticker -> [offset, length]
+#   plus the source file stats used to detect stale entries; capacity is the
+#   ticker's length plus the spare rows after it (NaT dates, never read)
+# Every write goes to a fresh data directory and only then replaces the manifest,
+# so a crash leaves the previous manifest with its own, untouched files. Stores
+# written before data_dir existed keep their files next to the manifest.
+
+
+def _column_file(data_dir, column):
+    return os.path.join(data_dir, f"{column.replace(' ', '_')}.npy")
+
+
+def _remove_data_dirs(store_dir, keep):
+    # Earlier versions, and any left behind by a write that crashed; readers that
+    # still map their files keep them until they close
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.startswith('data-') and name != keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _csv_path(sector, ticker, source_dir=ROOT_DATA_DIR):
+    return os.path.join(source_dir, sector, f"{ticker}_data_his.csv")
+
+
+def _source_stat(path):
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+
+def _write_manifest(store_dir, manifest):
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def write_store(data, sector, store_dir=None, sources=None, slack=SLACK_ROWS):
+    """
+    Function to write a {ticker: DataFrame} dict as a columnar sector store
+    - data: frames indexed by Date with the PRICE_COLUMNS (as returned by
+      get_stock_data_csv or database_connect.get_stock_data_sector)
+    - sources: optional {ticker: path} of the files the frames came from
+    - slack: spare rows after each ticker for append_store
+    """
+    store_dir = store_dir or os.path.join(ROOT_STORE_DIR, sector)
+    os.makedirs(store_dir, exist_ok=True)
+    sources = sources or {}
+
+    tickers = sorted(data)
+    frames = [data[ticker] for ticker in tickers]
+    lengths = [len(df) for df in frames]
+    capacities = [length + slack for length in lengths]
+    offsets = np.concatenate([[0], np.cumsum(capacities)[:-1]]).astype(int) if tickers else []
+
+    data_dir = f"data-{time.time_ns()}"
+    manifest = {
+        'version': STORE_VERSION,
+        'sector': sector,
+        'created': time.time(),
+        'data_dir': data_dir,
+        'columns': PRICE_COLUMNS,
+        'dtypes': dict(COLUMN_DTYPES),
+        'tickers': {},
+    }
+    for ticker, offset, length, capacity in zip(tickers, offsets, lengths, capacities):
+        source = sources.get(ticker)
+        manifest['tickers'][ticker] = {
+            'offset': int(offset),
+            'length': int(length),
+            'capacity': int(capacity),
+            'source': os.path.abspath(source) if source else None,
+            'source_stat': _source_stat(source) if source else None,
+        }
+
+    def padded(arrays, dtype, fill):
+        # Every ticker's rows followed by its spare rows
+        if not arrays:
+            return np.empty(0, dtype=dtype)
+        spare = np.full(slack, fill, dtype=dtype)
+        return np.concatenate([part for values in arrays for part in (values, spare)])
+
+    dates = padded([df.index.to_numpy(dtype='datetime64[us]') for df in frames], 'datetime64[us]', 'NaT')
+    manifest['date_dtype'] = str(dates.dtype)
+
+    # The new files go to their own directory; replacing the manifest is the
+    # one step that switches readers over, so they never see half a store
+    os.makedirs(os.path.join(store_dir, data_dir))
+    np.save(_column_file(os.path.join(store_dir, data_dir), 'Date'), dates)
+    for column in PRICE_COLUMNS:
+        dtype = COLUMN_DTYPES[column]
+        values = padded([df[column].to_numpy(dtype=dtype) for df in frames], dtype, 0 if dtype == 'int64' else np.nan)
+        np.save(_column_file(os.path.join(store_dir, data_dir), column), values)
+
+    _write_manifest(store_dir, manifest)
+    _remove_data_dirs(store_dir, data_dir)
+    # Files of stores written before data_dir, now replaced
+    for column in ['Date'] + PRICE_COLUMNS:
+        if os.path.exists(_column_file(store_dir, column)):
+            os.remove(_column_file(store_dir, column))
+
+    return manifest
+
+
+def read_csv_prices(csv_path):
+    """
+    Function to read a <ticker>_data_his.csv as a Date-indexed frame of the PRICE_COLUMNS
+    """
+    df = pd.read_csv(csv_path, parse_dates=['Date'])
+    df.set_index('Date', inplace=True)
+    return df[PRICE_COLUMNS]
+
+
+def convert_csv_sector(sector, source_dir=ROOT_DATA_DIR, store_dir=None):
+    """
+    Function to convert every <ticker>_data_his.csv of a sector into a store
+    """
+    sector_dir = os.path.join(source_dir, sector)
+    data = {}
+    sources = {}
+    for name in sorted(os.listdir(sector_dir)):
+        if not name.endswith('_data_his.csv'):
+            continue
+        ticker = name[:-len('_data_his.csv')]
+        csv_path = os.path.join(sector_dir, name)
+        try:
+            data[ticker] = read_csv_prices(csv_path)
+            sources[ticker] = csv_path
+        except Exception as e:
+            print(f"Error reading {ticker}.csv, Error:{e}")
+
+    return write_store(data, sector, store_dir=store_dir, sources=sources)
+
+
+def append_store(data, sector, store_dir=None, sources=None, replace=None):
+    """
+    Function to append new bars to some tickers of a sector store
+    - data: {ticker: DataFrame} of bars that directly follow each ticker's stored
+      bars; a ticker that is not in the store, or bars that do not start after its
+      last stored date, raise ValueError
+    - replace: optional {ticker: DataFrame} of whole histories stored instead of
+      what the store holds (new tickers, or ones whose stored bars are out of date)
+    - sources: optional {ticker: path} whose stats are recorded again
+    The bars are written in place into the tickers' spare rows, which no reader
+    looks at, then the manifest is replaced; other tickers are not touched.
+    Only with replace, or when a ticker is out of spare rows, is the store
+    rewritten, from its own arrays and the replacing frames.
+    Returns the manifest
+    """
+    store_dir = store_dir or os.path.join(ROOT_STORE_DIR, sector)
+    store = PriceStore(sector, store_dir)
+    sources = sources or {}
+    replace = replace or {}
+    data = {ticker: df for ticker, df in data.items() if len(df) and ticker not in replace}
+    entries = store.manifest['tickers']
+    for ticker, df in data.items():
+        if ticker not in entries:
+            raise ValueError(f"{ticker} is not in the {sector} store, pass its whole history as replace")
+        dates, _ = store.arrays(ticker)
+        if len(dates) and df.index[0] <= pd.Timestamp(dates[-1]):
+            raise ValueError(f"New {ticker} bars start on {df.index[0]:%Y-%m-%d}, "
+                             f"not after the stored {pd.Timestamp(dates[-1]):%Y-%m-%d}")
+
+    if replace or any(entries[ticker]['length'] + len(df) > entries[ticker].get('capacity', 0)
+                      for ticker, df in data.items()):
+        frames = {ticker: store.frame(ticker) for ticker in entries}
+        for ticker, df in data.items():
+            frames[ticker] = pd.concat([frames[ticker], df[PRICE_COLUMNS]])
+        for ticker, df in replace.items():
+            frames[ticker] = df[PRICE_COLUMNS]
+        paths = {ticker: entry['source'] for ticker, entry in entries.items() if entry.get('source')}
+        return write_store(frames, sector, store_dir, dict(paths, **sources))
+
+    manifest = store.manifest
+    data_dir = os.path.join(store_dir, manifest.get('data_dir', ''))
+    # Only the pages of the changed rows are written back
+    for column, dtype in [('Date', manifest['date_dtype'])] + [(column, COLUMN_DTYPES[column]) for column in PRICE_COLUMNS]:
+        values = np.load(_column_file(data_dir, column), mmap_mode='r+')
+        for ticker, df in data.items():
+            new = df.index.to_numpy(dtype=dtype) if column == 'Date' else df[column].to_numpy(dtype=dtype)
+            end = entries[ticker]['offset'] + entries[ticker]['length']
+            values[end:end + len(new)] = new
+        values.flush()
+        del values
+
+    for ticker, df in data.items():
+        entries[ticker]['length'] += len(df)
+        if ticker in sources:
+            entries[ticker]['source'] = os.path.abspath(sources[ticker])
+            entries[ticker]['source_stat'] = _source_stat(sources[ticker])
+    # Data derived from the store (timeframes) is rebuilt when this changes
+    manifest['created'] = time.time()
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+class PriceStore:
+    """
+    Memory-mapped, read-only view of one sector store
+    """
+
+    def __init__(self, sector, store_dir=None):
+        self.sector = sector
+        self.store_dir = store_dir or os.path.join(ROOT_STORE_DIR, sector)
+        with open(os.path.join(self.store_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported store version in {self.store_dir}")
+
+        data_dir = os.path.join(self.store_dir, self.manifest.get('data_dir', ''))
+        # mmap_mode keeps the load zero-copy: pages are read on first touch
+        self.dates = np.load(_column_file(data_dir, 'Date'), mmap_mode='r')
+        self.columns = {
+            column: np.load(_column_file(data_dir, column), mmap_mode='r')
+            for column in self.manifest['columns']
+        }
+
+    @property
+    def tickers(self):
+        return list(self.manifest['tickers'])
+
+    def __contains__(self, ticker):
+        return ticker in self.manifest['tickers']
+
+    def is_stale(self, ticker):
+        """
+        Function to check whether the source file changed since the store was built
+        """
+        entry = self.manifest['tickers'][ticker]
+        if not entry.get('source'):
+            return False
+        return _source_stat(entry['source']) != entry['source_stat']
+
+    def arrays(self, ticker):
+        """
+        Function to return (dates, {column: array}) views for a ticker
+        """
+        entry = self.manifest['tickers'][ticker]
+        rows = slice(entry['offset'], entry['offset'] + entry['length'])
+        return self.dates[rows], {column: values[rows] for column, values in self.columns.items()}
+
+    def frame(self, ticker, start=None, end=None, before=0, after=0):
+        """
+        Function to build the same DataFrame get_stock_data_csv returns for a ticker
+        - start / end: optional inclusive date range (see range_rows), only those
+          pages of the store are read
+        """
+        dates, columns = self.arrays(ticker)
+        if start is not None or end is not None:
+            rows = range_rows(dates, start, end, before, after)
+            dates = dates[rows]
+            columns = {column: values[rows] for column, values in columns.items()}
+        index = pd.DatetimeIndex(dates, name='Date')
+        return pd.DataFrame(columns, index=index, columns=self.manifest['columns'], copy=False)
+
+
+def range_rows(dates, start=None, end=None, before=0, after=0):
+    """
+    Function to turn an inclusive date range into a slice of a ticker's sorted dates
+    - before / after: extra bars kept ahead of start (indicator warm-up) and past
+      end (exits of the last entries)
+    """
+    dates = np.asarray(dates)
+    first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), 'left'))
+    last = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), 'right'))
+    return slice(max(first - before, 0), min(last + after, len(dates)))
+
+
+def available_sectors(source_dir=ROOT_DATA_DIR, store_dir=ROOT_STORE_DIR):
+    """
+    Function to list the sectors that have a store or a CSV folder
+    """
+    sectors = set()
+    if os.path.isdir(source_dir):
+        sectors.update(name for name in os.listdir(source_dir) if os.path.isdir(os.path.join(source_dir, name)))
+    if os.path.isdir(store_dir):
+        sectors.update(name for name in os.listdir(store_dir) if os.path.exists(os.path.join(store_dir, name, MANIFEST)))
+    return sorted(sectors)
+
+
+def discover_tickers(sector, source_dir=ROOT_DATA_DIR, store_dir=None):
+    """
+    Function to list every ticker of a sector that has data, in the store or as a CSV
+    """
+    found = set()
+    sector_dir = os.path.join(source_dir, sector)
+    if os.path.isdir(sector_dir):
+        found.update(name[:-len('_data_his.csv')] for name in os.listdir(sector_dir) if name.endswith('_data_his.csv'))
+    store = open_store(sector, store_dir)
+    if store is not None:
+        found.update(store.tickers)
+    return sorted(found)
+
+
+def open_store(sector, store_dir=None):
+    """
+    Function to open a sector store, or return None when it has not been built
+    """
+    store_dir = store_dir or os.path.join(ROOT_STORE_DIR, sector)
+    if not os.path.exists(os.path.join(store_dir, MANIFEST)):
+        return None
+    return PriceStore(sector, store_dir)
+
+
+def load_stock_data(tickers, sector, store_dir=None):
+    """
+    Function to load {ticker: DataFrame} from a sector store
+    - Tickers missing from the store are reported and skipped like missing CSVs
+    """
+    store = PriceStore(sector, store_dir)
+    data = {}
+    for ticker in tickers:
+        if ticker not in store:
+            print(f"{ticker} is not in the {sector} store")
+            continue
+        data[ticker] = store.frame(ticker)
+    return data
+
+
+if __name__ == "__main__":
+    # One-shot conversion: python price_store.py [sector ...]
+    sectors = sys.argv[1:] or ['HealthCare']
+    for sector in sectors:
+        start = time.perf_counter()
+        manifest = convert_csv_sector(sector)
+        elapsed = time.perf_counter() - start
+        rows = sum(entry['length'] for entry in manifest['tickers'].values())
+        print(f"Stored {len(manifest['tickers'])} {sector} tickers ({rows} rows) in {elapsed:.2f}s")
+        # Weekly and monthly bars next to the daily ones (otherwise built on first use)
+        from timeframes import write_timeframes
+        write_timeframes(PriceStore(sector))
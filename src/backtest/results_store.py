@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import queue
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+
+# File location
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_RESULTS_DIR = os.path.join(BASE_DIR, '../', 'results')
+
+MANIFEST = 'manifest.json'
+RESULTS_VERSION = 1
+# Columns of entry_point_columns, as stored; Start Price and Stop Loss are NaN
+# where the frames hold None
+RESULT_DTYPES = {
+    'Date': 'datetime64[ns]',
+    'Entry Point': 'int64',
+    'Adj Close': 'float64',
+    'PNL': 'float64',
+    'End date': 'datetime64[ns]',
+    'Position': 'int64',
+    'Start Price': 'float64',
+    'Stop Loss': 'float64',
+}
+RESULT_COLUMNS = list(RESULT_DTYPES)
+# A batch is handed to the writer thread once it holds this many rows or tickers
+BATCH_ROWS = 50_000
+BATCH_TICKERS = 64
+# Batches waiting for the writer; add() blocks when the writer falls this far behind
+MAX_PENDING = 4
+
+# Layout of a results dataset (src/results/<run_id>/):
+# - part-00000.npz, ...: one compressed array per column, the rows of a batch of
+#   tickers back to back, each ticker sorted by Date
+# - manifest.json: run metadata, and per part the tickers with their
+#   [offset, length] and Date range, so a reader opens only the parts and
+#   columns it needs
+
+
+def _part_file(dataset_dir, number):
+    return os.path.join(dataset_dir, f'part-{number:05d}.npz')
+
+
+def _column_key(column):
+    return column.replace(' ', '_')
+
+
+def _column_values(df, column):
+    dtype = RESULT_DTYPES[column]
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(df[column]).to_numpy(dtype=dtype)
+    # None (no price kept for a losing trade) becomes NaN
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=dtype)
+
+
+def new_run_id():
+    # Sorts by start time; the pid keeps runs started in the same second apart
+    return f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+class ResultSink:
+    """
+    Appends every ticker's evaluated entries to one results dataset
+    - add() only converts the frame to arrays; full batches are compressed and
+      written by a background thread while the caller keeps computing
+    - close() flushes the last batch and writes the manifest with the run
+      metadata; nothing is visible to readers before that
+    Use as a context manager, or call close() once.
+    """
+
+    def __init__(self, run_id=None, root_dir=None, metadata=None,
+                 batch_rows=BATCH_ROWS, batch_tickers=BATCH_TICKERS):
+        self.run_id = run_id or new_run_id()
+        self.dataset_dir = os.path.join(root_dir or ROOT_RESULTS_DIR, self.run_id)
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        self.metadata = dict(metadata or {})
+        self.batch_rows = batch_rows
+        self.batch_tickers = batch_tickers
+        self.parts = []
+        self._next_part = 0
+        self._batch = []
+        self._batch_rows = 0
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._writer = threading.Thread(target=self._write_loop, name='result-sink', daemon=True)
+        self._writer.start()
+
+    def add(self, ticker, entries):
+        """
+        Function to queue one ticker's entry_point_columns frame
+        """
+        if self._error is not None:
+            raise self._error
+        arrays = {column: _column_values(entries, column) for column in RESULT_COLUMNS}
+        # The reader relies on each ticker's rows being in Date order
+        if (arrays['Date'][1:] < arrays['Date'][:-1]).any():
+            order = np.argsort(arrays['Date'], kind='stable')
+            arrays = {column: values[order] for column, values in arrays.items()}
+        self._batch.append((ticker, arrays))
+        self._batch_rows += len(entries)
+        if self._batch_rows >= self.batch_rows or len(self._batch) >= self.batch_tickers:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self._queue.put((self._next_part, self._batch))
+            self._next_part += 1
+            self._batch = []
+            self._batch_rows = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    self.parts.append(self._write_part(*item))
+                except Exception as e:
+                    self._error = e
+
+    def _write_part(self, number, batch):
+        path = _part_file(self.dataset_dir, number)
+        columns = {}
+        tickers = {}
+        offset = 0
+        for ticker, arrays in batch:
+            length = len(arrays['Date'])
+            dates = arrays['Date']
+            tickers[ticker] = {
+                'offset': offset,
+                'length': length,
+                'first': str(dates[0]) if length else None,
+                'last': str(dates[-1]) if length else None,
+            }
+            offset += length
+        for column in RESULT_COLUMNS:
+            values = [arrays[column] for _, arrays in batch]
+            columns[_column_key(column)] = np.concatenate(values) if values else np.empty(0, RESULT_DTYPES[column])
+        # datetime64 is stored as int64 so np.load never needs pickle
+        for column, dtype in RESULT_DTYPES.items():
+            if dtype.startswith('datetime64'):
+                columns[_column_key(column)] = columns[_column_key(column)].view('int64')
+        with open(path + '.tmp', 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(path + '.tmp', path)
+        return {'file': os.path.basename(path), 'rows': offset, 'tickers': tickers}
+
+    def close(self, **metadata):
+        """
+        Function to write the remaining batch and the manifest
+        - metadata: extra run fields (e.g. the final balance) merged into the manifest
+        Returns the manifest
+        """
+        if self._closed:
+            return None
+        self._closed = True
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+        self.metadata.update(metadata)
+        manifest = {
+            'version': RESULTS_VERSION,
+            'run_id': self.run_id,
+            'created': time.time(),
+            'metadata': self.metadata,
+            'columns': RESULT_COLUMNS,
+            'dtypes': RESULT_DTYPES,
+            'parts': sorted(self.parts, key=lambda part: part['file']),
+        }
+        manifest_path = os.path.join(self.dataset_dir, MANIFEST)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=1, default=str)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Stop the writer but leave no manifest: the run is incomplete
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+        return False
+
+
+class ResultsDataset:
+    """
+    Read-only view of one results dataset
+    """
+
+    def __init__(self, dataset_dir):
+        self.dataset_dir = dataset_dir
+        with open(os.path.join(dataset_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != RESULTS_VERSION:
+            raise ValueError(f"Unsupported results version in {dataset_dir}")
+
+    @property
+    def metadata(self):
+        return self.manifest['metadata']
+
+    @property
+    def tickers(self):
+        return [ticker for part in self.manifest['parts'] for ticker in part['tickers']]
+
+    def read(self, tickers=None, start=None, end=None, columns=None):
+        """
+        Function to load entries as one DataFrame with a Ticker column
+        - tickers: only these tickers; parts without any of them are never opened
+        - start / end: inclusive range of entry dates; parts and tickers whose
+          entries fall outside it are skipped from the manifest
+        - columns: only these columns are decompressed (Date is always read)
+        """
+        wanted = set(tickers) if tickers is not None else None
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        columns = [column for column in RESULT_COLUMNS if columns is None or column in columns or column == 'Date']
+
+        pieces = []
+        for part in self.manifest['parts']:
+            selected = []
+            for ticker, entry in part['tickers'].items():
+                if wanted is not None and ticker not in wanted:
+                    continue
+                if entry['length'] == 0:
+                    continue
+                if start is not None and pd.Timestamp(entry['last']) < start:
+                    continue
+                if end is not None and pd.Timestamp(entry['first']) > end:
+                    continue
+                selected.append((ticker, entry['offset'], entry['length']))
+            if not selected:
+                continue
+
+            # npz members are decompressed one column at a time, on access
+            with np.load(os.path.join(self.dataset_dir, part['file'])) as arrays:
+                values = {column: arrays[_column_key(column)] for column in columns}
+            for column in columns:
+                if RESULT_DTYPES[column].startswith('datetime64'):
+                    values[column] = values[column].view(RESULT_DTYPES[column])
+            for ticker, offset, length in selected:
+                rows = slice(offset, offset + length)
+                dates = values['Date'][rows]
+                # Rows are sorted by Date within a ticker
+                first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start), 'left'))
+                last = length if end is None else int(np.searchsorted(dates, np.datetime64(end), 'right'))
+                if first >= last:
+                    continue
+                piece = {'Ticker': np.full(last - first, ticker, dtype=object)}
+                piece.update({column: values[column][rows][first:last] for column in columns})
+                pieces.append(pd.DataFrame(piece))
+
+        if not pieces:
+            return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in
+                                 [('Ticker', object)] + [(column, RESULT_DTYPES[column]) for column in columns]})
+        return pd.concat(pieces, ignore_index=True)
+
+
+def list_runs(root_dir=None):
+    """
+    Function to list the complete runs (those with a manifest), oldest first
+    """
+    root_dir = root_dir or ROOT_RESULTS_DIR
+    if not os.path.isdir(root_dir):
+        return []
+    return sorted(name for name in os.listdir(root_dir) if os.path.exists(os.path.join(root_dir, name, MANIFEST)))
+
+
+def open_results(run_id=None, root_dir=None):
+    """
+    Function to open a run's dataset (default: the latest complete run)
+    """
+    root_dir = root_dir or ROOT_RESULTS_DIR
+    if run_id is None:
+        runs = list_runs(root_dir)
+        if not runs:
+            raise FileNotFoundError(f"No results in {root_dir}")
+        run_id = runs[-1]
+    return ResultsDataset(os.path.join(root_dir, run_id))
+
+
+def import_csv_results(csv_dir, run_id=None, root_dir=None):
+    """
+    Function to convert a folder of <ticker>_results.csv files into one dataset
+    """
+    names = sorted(name for name in os.listdir(csv_dir) if name.endswith('_results.csv'))
+    with ResultSink(run_id, root_dir, metadata={'source': os.path.abspath(csv_dir)}) as sink:
+        for name in names:
+            df = pd.read_csv(os.path.join(csv_dir, name), parse_dates=['Date', 'End date'])
+            sink.add(name[:-len('_results.csv')], df)
+    return sink.run_id
+
+
+if __name__ == "__main__":
+    # python results_store.py                      list the runs
+    # python results_store.py RUN_ID [TICKER ...]   print a run's metadata and entries
+    # python results_store.py --import CSV_DIR      convert <ticker>_results.csv files
+    if len(sys.argv) > 2 and sys.argv[1] == '--import':
+        print(f"Imported {sys.argv[2]} as run {import_csv_results(sys.argv[2])}")
+    elif len(sys.argv) > 1:
+        dataset = open_results(sys.argv[1])
+        print(json.dumps(dataset.metadata, indent=1))
+        print(dataset.read(tickers=sys.argv[2:] or None).to_string())
+    else:
+        for run_id in list_runs():
+            dataset = open_results(run_id)
+            print(f"{run_id}: {len(dataset.tickers)} tickers, "
+                  f"{sum(part['rows'] for part in dataset.manifest['parts'])} entries")
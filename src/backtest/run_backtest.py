@@ -0,0 +1,262 @@
+import os
+import sys
+import math
+import time
+import fnmatch
+import argparse
+import contextlib
+import pandas as pd
+
+from indicators import IndicatorPipeline
+from indicator_cache import DiskCache
+from instrumentation import log, stage, instrumented_run
+from price_store import ROOT_DATA_DIR, available_sectors, discover_tickers, open_store, range_rows
+from results_store import ResultSink
+from timeframes import DEFAULT_CONFIRM, TrendConfirmation
+from exit_rules import parse_exits
+from backtest_bullish_entry import (
+    BASE_DIR, COMMS, DRAWDOWN_THRESHOLD, MAX_HOLD_DAYS, INITIAL_BALANCE, sector as DEFAULT_SECTOR,
+    bullish_strategy, evaluate_strategy, restrict_entries,
+)
+
+
+BACKENDS = ['serial', 'parallel', 'panel']
+OUTPUTS = ['summary', 'dataset', 'csv', 'html']
+RESULTS_DIR = os.path.join(BASE_DIR, '../', 'winning_trades')
+# The indicators bullish_strategy computes, which set how much history a date range needs
+STRATEGY_PIPELINE = IndicatorPipeline([8, 21, 34], [50, 100, 200], rsi_period=2, stoch_periods=(8, 3))
+# EMAs are seeded from the first loaded bar; load enough bars ahead of the range
+# that the seed's weight in the longest EMA falls below this
+EMA_TOLERANCE = 1e-9
+
+
+def warmup_bars(pipeline=STRATEGY_PIPELINE, tolerance=EMA_TOLERANCE):
+    """
+    Function to return how many bars must be loaded ahead of a range start
+    - The SMA-200 / RSI / Stochastics warm-up (pipeline.warmup), or more when
+      the longest EMA needs longer to forget its seed
+    """
+    settle = [math.ceil(math.log(tolerance) / math.log(1 - 2 / (period + 1))) for period in pipeline.ema_periods]
+    return max([pipeline.warmup] + settle)
+
+
+def select_tickers(sectors, patterns=None):
+    """
+    Function to pick tickers from the sectors' stores and CSV folders
+    - patterns: shell-style globs matched against the ticker (default: all)
+    Returns [(sector, ticker)]; a ticker found in two sectors is taken from the first
+    """
+    patterns = [pattern.upper() for pattern in (patterns or ['*'])]
+    selected = []
+    seen = set()
+    for sector in sectors:
+        for ticker in discover_tickers(sector):
+            if ticker in seen or not any(fnmatch.fnmatchcase(ticker, pattern) for pattern in patterns):
+                continue
+            seen.add(ticker)
+            selected.append((sector, ticker))
+    # Names without wildcards that matched nothing are most likely typos
+    for pattern in patterns:
+        if not any(char in pattern for char in '*?[') and pattern not in seen:
+            log.warning("%s has no data in %s", pattern, ', '.join(sectors))
+    return selected
+
+
+def read_csv_range(sector, ticker, start=None, end=None, before=0, after=0):
+    csv_path = os.path.join(ROOT_DATA_DIR, sector, f"{ticker}_data_his.csv")
+    try:
+        df = pd.read_csv(csv_path, parse_dates=['Date'])
+    except Exception as e:
+        log.warning("Error reading %s.csv, Error:%s", ticker, e)
+        return None
+    df.set_index('Date', inplace=True)
+    # CSV rows have to be parsed to find the dates, so the range only saves memory
+    return df.iloc[range_rows(df.index.to_numpy(), start, end, before, after)]
+
+
+def load_range(selected, start=None, end=None, before=0, after=0):
+    """
+    Function to load {ticker: DataFrame} for the selected tickers over a date range
+    - before / after: bars kept ahead of start and past end (see range_rows)
+    - The store is used when it is fresh (only the range's pages are read),
+      the CSV otherwise
+    """
+    stores = {}
+    data = {}
+    for sector, ticker in selected:
+        if sector not in stores:
+            stores[sector] = open_store(sector)
+        store = stores[sector]
+        with stage('load', ticker):
+            if store is not None and ticker in store and not store.is_stale(ticker):
+                df = store.frame(ticker, start, end, before, after)
+            else:
+                df = read_csv_range(sector, ticker, start, end, before, after)
+        if df is not None and len(df):
+            data[ticker] = df
+    return data
+
+
+def run_backend(data, backend='serial', start=None, end=None, max_workers=None, cache=None, sink=None, confirm=None,
+                exits=None):
+    """
+    Function to run the strategy and its evaluation on one of the backends
+    - serial: bullish_strategy + evaluate_strategy
+    - parallel: parallel_runner.run_parallel across a process pool
+    - panel: panel.bullish_strategy_panel on one dates x tickers panel
+    Only entries between start and end are evaluated, and with a timeframes.TrendConfirmation
+    only those the weekly / monthly trend confirms (serial and parallel). With a results_store.ResultSink,
+    entries are written as they are evaluated (as results come back for the parallel backend).
+    exits: optional exit_rules.ExitEngine replacing the best-close exit
+    Returns (strategy, entry_points, balance); strategy is None for the parallel backend
+    """
+    if backend == 'parallel':
+        from parallel_runner import run_parallel
+        entry_points, balance, _ = run_parallel(data, max_workers=max_workers, cache=cache,
+                                                entry_window=(start, end), confirm=confirm, exits=exits)
+        if sink is not None:
+            for ticker, ticker_entry_points in entry_points:
+                sink.add(ticker, ticker_entry_points)
+        return None, entry_points, balance
+
+    if backend == 'panel':
+        from panel import Panel, bullish_strategy_panel, panel_to_frames
+        with stage('indicators'):
+            panel = Panel.from_frames(data)
+            strategy = panel_to_frames(panel, bullish_strategy_panel(panel))
+    else:
+        strategy = bullish_strategy(dict(data), cache=cache, confirm=confirm)
+    for ticker in strategy:
+        restrict_entries(strategy[ticker], start, end)
+    entry_points, balance = evaluate_strategy(strategy, sink=sink, exits=exits)
+    return strategy, entry_points, balance
+
+
+def write_results(entry_points, out_dir):
+    """
+    Function to write each ticker's entry points as <ticker>_results.csv, like the main script
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = 0
+    for ticker, ticker_entry_points in entry_points:
+        if ticker_entry_points.empty:
+            continue
+        with stage('export', ticker):
+            ticker_entry_points.to_csv(os.path.join(out_dir, f'{ticker}_results.csv'), index=False)
+        written += 1
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the bullish entry backtest over a ticker universe')
+    parser.add_argument('--sector', nargs='+', default=[DEFAULT_SECTOR],
+                        help="sectors to draw tickers from, or 'all' (default: %(default)s)")
+    parser.add_argument('--tickers', nargs='+', help="ticker names or globs such as 'A*' (default: all)")
+    parser.add_argument('--start', help='first entry date, e.g. 2022-01-01 (default: first bar)')
+    parser.add_argument('--end', help='last entry date (default: last bar)')
+    parser.add_argument('--backend', choices=BACKENDS, default='serial')
+    parser.add_argument('--workers', type=int, help='process pool size for the parallel backend')
+    parser.add_argument('--output', choices=OUTPUTS, default='summary',
+                        help='summary only, one results dataset (see results_store.py), per-ticker result CSVs, or HTML charts')
+    parser.add_argument('--out-dir', help='where the output goes (default: src/results, src/winning_trades or src/reports)')
+    parser.add_argument('--confirm', action='store_true',
+                        help='only take entries the weekly and monthly trend confirms (see timeframes.DEFAULT_CONFIRM)')
+    parser.add_argument('--exits', help="exit rules instead of the best close, e.g. 'stop=0.05,target=0.1,trail=0.08,time=14,cross=EMA_8'")
+    parser.add_argument('--no-cache', action='store_true', help='do not use the indicator cache')
+    parser.add_argument('--list', action='store_true', help='list the sectors and tickers that would run, then exit')
+    args = parser.parse_args(argv)
+
+    if args.sector == ['all']:
+        args.sector = available_sectors()
+    for name in ('start', 'end'):
+        if getattr(args, name) is not None:
+            try:
+                setattr(args, name, pd.Timestamp(getattr(args, name)))
+            except ValueError:
+                parser.error(f"--{name}: not a date: {getattr(args, name)}")
+    if args.start is not None and args.end is not None and args.start > args.end:
+        parser.error('--start is after --end')
+    if args.confirm and args.backend == 'panel':
+        parser.error('--confirm is not supported on the panel backend')
+    if args.exits is not None:
+        try:
+            args.exits = parse_exits(args.exits, COMMS)
+        except ValueError as e:
+            parser.error(f"--exits: {e}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = select_tickers(args.sector, args.tickers)
+    if args.list:
+        for sector in args.sector:
+            names = [ticker for ticker_sector, ticker in selected if ticker_sector == sector]
+            print(f"{sector}: {len(names)} tickers")
+            if names:
+                print('  ' + ' '.join(names))
+        return 0
+    if not selected:
+        log.warning("No tickers selected")
+        return 1
+
+    start_time = time.perf_counter()
+    before = warmup_bars() if args.start is not None else 0
+    # Exits of entries near the end look up to MAX_HOLD_DAYS bars ahead, or the
+    # exit engine's horizon
+    horizon = args.exits.horizon if args.exits else MAX_HOLD_DAYS
+    after = horizon if args.end is not None else 0
+    data = load_range(selected, args.start, args.end, before, after)
+    bars = sum(len(df) for df in data.values())
+    log.info("Loaded %d bars for %d tickers", bars, len(data))
+
+    cache = None if args.no_cache else DiskCache()
+    # The weekly / monthly bars come from next to the daily store, derived once per store
+    confirm = TrendConfirmation(DEFAULT_CONFIRM, args.sector) if args.confirm else None
+    sink = None
+    if args.output == 'dataset':
+        sink = ResultSink(root_dir=args.out_dir, metadata={
+            'script': 'run_backtest', 'argv': sys.argv, 'sectors': args.sector, 'tickers': list(data),
+            'start': args.start, 'end': args.end, 'backend': args.backend,
+            'confirm': DEFAULT_CONFIRM if args.confirm else None,
+            'exits': [(type(rule).__name__, vars(rule)) for rule in args.exits.rules] if args.exits else None,
+            'comms': COMMS, 'drawdown_threshold': DRAWDOWN_THRESHOLD, 'max_hold_days': MAX_HOLD_DAYS,
+            'initial_balance': INITIAL_BALANCE,
+        })
+    with sink if sink is not None else contextlib.nullcontext():
+        strategy, entry_points, balance = run_backend(data, args.backend, args.start, args.end, args.workers,
+                                                      cache, sink, confirm, args.exits)
+        if sink is not None:
+            with stage('export'):
+                sink.close(final_balance=balance)
+            print(f"Wrote results run {sink.run_id} to {sink.dataset_dir}")
+
+    if args.output == 'csv':
+        out_dir = args.out_dir or RESULTS_DIR
+        written = write_results(entry_points, out_dir)
+        print(f"Wrote {written} result files to {out_dir}")
+    elif args.output == 'html':
+        from charts import write_reports
+        if strategy is None:
+            # The parallel workers filled the cache, so this is mostly reads
+            strategy = bullish_strategy(dict(data), cache=cache, confirm=confirm)
+        # Charts cover the selected range, not the warm-up bars
+        charted = {ticker: df.loc[args.start:args.end] for ticker, df in strategy.items()}
+        with stage('plot'):
+            written = write_reports(charted, [8, 21, 34], [50, 100, 200], args.out_dir, cache=cache)
+        print(f"Wrote {len(written)} charts")
+
+    n_entries = sum(len(df) for _, df in entry_points)
+    print(f"{len(data)} tickers, {bars} bars, {n_entries} entries on the {args.backend} backend "
+          f"in {time.perf_counter() - start_time:.2f}s")
+    print(f"Final balance: ${balance:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    # python run_backtest.py [--sector HealthCare ...|all] [--tickers 'A*' LLY] [--start 2022-01-01] [--end 2023-12-31]
+    #                        [--backend serial|parallel|panel] [--workers N] [--output summary|csv|html] [--out-dir dir]
+    #                        [--confirm] [--exits stop=0.05,time=14] [--no-cache] [--list]
+    with instrumented_run('run_backtest'):
+        status = main()
+    sys.exit(status)
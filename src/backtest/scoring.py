@@ -0,0 +1,191 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from panel import Panel, bullish_strategy_panel, panel_to_frames
+
+
+# The conditions bullish_strategy ANDs together, scored in this order
+CONDITIONS = ['ema_stack', 'sma_stack', 'stoch_depth', 'rsi_depth', 'low_bar']
+DEFAULT_WEIGHTS = {
+    'ema_stack': 0.25,
+    'sma_stack': 0.25,
+    'stoch_depth': 0.15,
+    'rsi_depth': 0.25,
+    'low_bar': 0.10,
+}
+# Levels the scores are 0.5 at. %K / %D are 0-1 fractions (calculate_stochastics
+# does not scale them), so the stochastic level is 0.4; bullish_strategy's hard
+# mask compares them with 40, which every bar meets, and is left as it is
+STOCH_LEVEL = 0.4
+RSI_LEVEL = 10
+# Gap between two stacked averages, relative to the slower one, that scores 1
+STACK_SPREAD = 0.02
+TOP_N = 5
+
+
+def _stack_score(series, spread=STACK_SPREAD):
+    """
+    Function to score how far each faster average sits above the next slower one,
+    averaged over the pairs (0.5 when they are equal, 1 at spread or more)
+    """
+    pairs = list(zip(series, series[1:]))
+    total = np.zeros_like(series[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for faster, slower in pairs:
+            total += np.clip(0.5 + (faster - slower) / (2 * spread * slower), 0.0, 1.0)
+    return total / len(pairs)
+
+
+def _depth_score(values, level):
+    # 1 at 0, 0.5 at the level, 0 at twice the level or above
+    return np.clip(1.0 - values / (2.0 * level), 0.0, 1.0)
+
+
+def condition_scores(panel, out, ema_periods=(8, 21, 34), sma_periods=(50, 100, 200),
+                     stoch_level=STOCH_LEVEL, rsi_level=RSI_LEVEL, spread=STACK_SPREAD, dtype=np.float64):
+    """
+    Function to turn each condition of bullish_strategy into a continuous 0-1 score
+    - out: the bullish_strategy_panel matrices of the panel
+    Returns a (conditions, dates, tickers) block in CONDITIONS order, NaN where a
+    bar is missing or an indicator is still warming up. Every bar bullish_strategy
+    enters on scores above 0.5 on every condition but stoch_depth, whose hard mask
+    holds on every bar.
+    """
+    scores = np.empty((len(CONDITIONS),) + panel.valid.shape, dtype=dtype)
+    scores[0] = _stack_score([out[f'EMA_{period}'] for period in ema_periods], spread)
+    scores[1] = _stack_score([out[f'SMA_{period}'] for period in sma_periods], spread)
+    # %K and %D are both held under the level, so the higher of the two counts
+    scores[2] = _depth_score(np.fmax(out['%K'], out['%D']), stoch_level)
+    scores[3] = _depth_score(out['rsi'], rsi_level)
+    # Where Adj Close sits in the bar's range: 0.5 on the low, 1 on the high
+    adj_close, low, high = panel['Adj Close'], panel['Low'], panel['High']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores[4] = np.clip(0.5 + 0.5 * (adj_close - low) / (high - low), 0.0, 1.0)
+    # Flat bars (high == low) count as sitting on the low unless Adj Close is above it
+    scores[4][(high == low) & ~(adj_close > low)] = 0.5
+    scores[:, ~out['kept']] = np.nan
+    return scores
+
+
+def weight_vector(weights=None):
+    """
+    Function to order a {condition: weight} dict as CONDITIONS, normalized to sum to 1
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    unknown = set(weights) - set(CONDITIONS)
+    if unknown:
+        raise ValueError(f"Unknown conditions {sorted(unknown)}, expected {CONDITIONS}")
+    vector = np.array([weights[name] for name in CONDITIONS], dtype=np.float64)
+    if vector.sum() <= 0:
+        raise ValueError("The weights must sum to more than 0")
+    return vector / vector.sum()
+
+
+def combine(scores, weights=None):
+    """
+    Function to weight the condition scores into one dates x tickers score
+    - One matrix product: (conditions,) @ (conditions, dates * tickers)
+    """
+    vector = weight_vector(weights).astype(scores.dtype)
+    n = scores.shape[0]
+    return (vector @ scores.reshape(n, -1)).reshape(scores.shape[1:])
+
+
+def top_n(score, n=TOP_N, min_score=None):
+    """
+    Function to pick the n best tickers of every date
+    - argpartition finds them without sorting the whole row; only the n picks
+      are then sorted, best first
+    - NaN scores (missing bars, warm-up) and scores below min_score are never picked
+    Returns (columns, scores), dates x n; a date with fewer candidates is padded
+    with -1 / NaN
+    """
+    n = min(n, score.shape[1])
+    if n == 0:
+        return np.empty((len(score), 0), dtype=np.int64), np.empty((len(score), 0))
+    # -inf sorts last, so unpickable cells only fill a row that runs out of candidates
+    ranked = np.where(np.isnan(score), -np.inf, score)
+    if min_score is not None:
+        ranked[ranked < min_score] = -np.inf
+    columns = np.argpartition(-ranked, n - 1, axis=1)[:, :n]
+    picked = np.take_along_axis(ranked, columns, axis=1)
+    order = np.argsort(-picked, axis=1, kind='stable')
+    columns = np.take_along_axis(columns, order, axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+    missing = np.isneginf(picked)
+    columns[missing] = -1
+    picked[missing] = np.nan
+    return columns, picked
+
+
+def rank_candidates(panel, columns, scores):
+    """
+    Function to list the picks as one row per (date, rank)
+    """
+    rows, ranks = np.nonzero(columns >= 0)
+    tickers = np.asarray(panel.tickers, dtype=object)
+    return pd.DataFrame({
+        'Date': panel.dates[rows],
+        'Rank': ranks + 1,
+        'Ticker': tickers[columns[rows, ranks]],
+        'Score': scores[rows, ranks],
+    })
+
+
+def score_entries(panel, out, columns):
+    """
+    Function to make the picks the panel's Entry Points, so panel_to_frames and
+    evaluate_strategy evaluate them like bullish_strategy entries
+    """
+    entries = np.zeros(panel.valid.shape, dtype=out['Entry Point'].dtype)
+    rows, ranks = np.nonzero(columns >= 0)
+    entries[rows, columns[rows, ranks]] = 1
+    return dict(out, **{'Entry Point': entries})
+
+
+def score_panel(panel, weights=None, n=TOP_N, min_score=None, dtype=np.float64, out=None):
+    """
+    Function to run the whole scoring model on a panel
+    - out: bullish_strategy_panel results, computed when None
+    Returns (out with the picks as Entry Point, candidates DataFrame)
+    """
+    if out is None:
+        out = bullish_strategy_panel(panel)
+    score = combine(condition_scores(panel, out, dtype=dtype), weights)
+    columns, scores = top_n(score, n, min_score)
+    return score_entries(panel, out, columns), rank_candidates(panel, columns, scores)
+
+
+if __name__ == "__main__":
+    # python scoring.py [--top 5] [--min-score 0.8] [--synthetic TICKERS YEARS]
+    # Scores the sector (or a synthetic panel) and evaluates the daily picks
+    import argparse
+    from backtest_bullish_entry import tickers, get_stock_data, evaluate_strategy
+    parser = argparse.ArgumentParser(description='Rank weighted entry scores across a panel')
+    parser.add_argument('--top', type=int, default=TOP_N, help='picks per date')
+    parser.add_argument('--min-score', type=float, help='lowest weighted score that can be picked')
+    parser.add_argument('--synthetic', nargs=2, type=float, metavar=('TICKERS', 'YEARS'),
+                        help='score a synthetic panel instead of the sector')
+    args = parser.parse_args()
+    if args.synthetic:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+        from synthetic import synthetic_sector
+        data = dict(synthetic_sector(int(args.synthetic[0]), args.synthetic[1]))
+    else:
+        data = get_stock_data(tickers)
+
+    start = time.perf_counter()
+    panel = Panel.from_frames(data)
+    out = bullish_strategy_panel(panel)
+    indicators_time = time.perf_counter() - start
+    start = time.perf_counter()
+    picked, candidates = score_panel(panel, n=args.top, min_score=args.min_score, out=out)
+    score_time = time.perf_counter() - start
+    print(f"{len(panel.tickers)} tickers x {len(panel.dates)} dates: indicators {indicators_time:.2f}s, "
+          f"scores + top {args.top} {score_time:.2f}s, {len(candidates)} picks")
+
+    entry_points, balance = evaluate_strategy(panel_to_frames(panel, picked))
+    print(f"{sum(len(df) for _, df in entry_points)} entries, final balance: ${balance:.2f}")
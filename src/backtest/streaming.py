@@ -0,0 +1,396 @@
+import os
+import sys
+import json
+import math
+import time
+from collections import deque
+
+import pandas as pd
+
+from price_store import ROOT_STORE_DIR
+
+
+# Bar by bar versions of the indicators used by bullish_strategy. Each one
+# repeats the arithmetic of the pandas call it replaces, in the same order, so
+# a stream of bars gives the same values as a batch run over the full history.
+
+class RollingMean:
+    """
+    Streaming Series.rolling(window).mean(): ring buffer plus a compensated
+    running sum, updated in O(1) per value
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev = math.nan
+        self.value = math.nan
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum + y
+            self.comp_add = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            self.same_ct = self.same_ct + 1 if val == self.prev else 1
+            self.prev = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.comp_remove
+            t = self.sum + y
+            self.comp_remove = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def update(self, val):
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+
+        if self.nobs >= self.window:
+            result = self.sum / self.nobs
+            if self.same_ct >= self.nobs:
+                result = self.prev
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            self.value = result
+        else:
+            self.value = math.nan
+        return self.value
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state['values'] = list(self.values)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'])
+        obj.__dict__.update(state)
+        obj.values = deque(state['values'])
+        return obj
+
+
+class RollingExtreme:
+    """
+    Streaming Series.rolling(window).max() / .min() with a monotonic deque
+    """
+
+    def __init__(self, window, kind='max'):
+        self.window = window
+        self.kind = kind
+        self.count = 0
+        self.candidates = deque()  # (bar number, value), best value first
+        self.valid = deque()       # whether each bar in the window had a value
+        self.nobs = 0
+        self.value = math.nan
+
+    def update(self, val):
+        i = self.count
+        self.count += 1
+
+        self.valid.append(val == val)
+        self.nobs += val == val
+        if len(self.valid) > self.window:
+            self.nobs -= self.valid.popleft()
+        while self.candidates and self.candidates[0][0] <= i - self.window:
+            self.candidates.popleft()
+
+        if val == val:
+            if self.kind == 'max':
+                while self.candidates and self.candidates[-1][1] <= val:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= val:
+                    self.candidates.pop()
+            self.candidates.append((i, val))
+
+        self.value = self.candidates[0][1] if self.nobs >= self.window else math.nan
+        return self.value
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state['candidates'] = [list(c) for c in self.candidates]
+        state['valid'] = list(self.valid)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'], state['kind'])
+        obj.__dict__.update(state)
+        obj.candidates = deque(tuple(c) for c in state['candidates'])
+        obj.valid = deque(state['valid'])
+        return obj
+
+
+class Ema:
+    """
+    Streaming Series.ewm(span=span, adjust=False).mean()
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.value = math.nan
+
+    def update(self, val):
+        alpha = 2.0 / (self.span + 1.0)
+        keep = 1.0 - alpha
+        if self.value != self.value:
+            self.value = val
+        elif val == val and self.value != val:
+            self.value = (keep * self.value + alpha * val) / (keep + alpha)
+        return self.value
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['span'])
+        obj.__dict__.update(state)
+        return obj
+
+
+class WilderRsi:
+    """
+    Streaming indicators.wilder_rsi
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.prev_close = math.nan
+        self.seed_gain = RollingMean(period)
+        self.seed_loss = RollingMean(period)
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = math.nan
+
+    def update(self, close):
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = change if change >= 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        i = self.count
+        self.count += 1
+
+        if i < self.period:
+            self.seed_gain.update(gain)
+            self.seed_loss.update(loss)
+            self.value = math.nan
+            return self.value
+        if i == self.period:
+            self.avg_gain = self.seed_gain.update(gain)
+            self.avg_loss = self.seed_loss.update(loss)
+            self.seed_gain = self.seed_loss = None
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.avg_loss == 0:
+            rs = math.nan if self.avg_gain == 0 or self.avg_gain != self.avg_gain else math.inf
+        else:
+            rs = self.avg_gain / self.avg_loss
+        self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state['seed_gain'] = self.seed_gain.to_dict() if self.seed_gain else None
+        state['seed_loss'] = self.seed_loss.to_dict() if self.seed_loss else None
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['period'])
+        obj.__dict__.update(state)
+        obj.seed_gain = RollingMean.from_dict(state['seed_gain']) if state['seed_gain'] else None
+        obj.seed_loss = RollingMean.from_dict(state['seed_loss']) if state['seed_loss'] else None
+        return obj
+
+
+class IndicatorState:
+    """
+    Per-ticker indicator state for the bullish strategy, updated one bar at a time
+    - EMA: 8, 21, 34
+    - SMA: 50, 100, 200
+    - RSI: 2 day period
+    - Stochastics: 8, 3
+    """
+
+    def __init__(self, ticker, ema_periods=(8, 21, 34), sma_periods=(50, 100, 200),
+                 rsi_period=2, k_period=8, d_period=3):
+        self.ticker = ticker
+        self.last_date = None
+        self.bars = 0
+        self.ema = {period: Ema(period) for period in ema_periods}
+        self.sma = {period: RollingMean(period) for period in sma_periods}
+        self.rsi = WilderRsi(rsi_period)
+        self.highest_high = RollingExtreme(k_period, 'max')
+        self.lowest_low = RollingExtreme(k_period, 'min')
+        self.d = RollingMean(d_period)
+
+    def update(self, bar):
+        """
+        Function to add one daily bar (Date, High, Low, Close, Adj Close)
+        Returns the indicator values and the Entry Point flag for that bar,
+        or None when the bar is not newer than the last one seen
+        """
+        date = pd.Timestamp(bar['Date'])
+        if self.last_date is not None and date <= self.last_date:
+            return None
+        self.last_date = date
+        self.bars += 1
+
+        close = float(bar['Close'])
+        values = {'Date': date}
+        for period, ema in self.ema.items():
+            values[f'EMA_{period}'] = ema.update(close)
+        for period, sma in self.sma.items():
+            values[f'SMA_{period}'] = sma.update(close)
+        values['rsi'] = self.rsi.update(close)
+
+        high = self.highest_high.update(float(bar['High']))
+        low = self.lowest_low.update(float(bar['Low']))
+        price_range = high - low
+        if price_range == 0:
+            k = math.nan if close - low == 0 else math.copysign(math.inf, close - low)
+        else:
+            k = (close - low) / price_range
+        values['%K'] = k
+        values['%D'] = self.d.update(k)
+        values['Entry Point'] = int(self.is_entry(values, float(bar['Adj Close']), float(bar['Low'])))
+        return values
+
+    def is_entry(self, values, adj_close, low):
+        """
+        Function to apply the bullish_strategy masks to one bar of indicator values
+        """
+        ema = [values[f'EMA_{period}'] for period in self.ema]
+        sma = [values[f'SMA_{period}'] for period in self.sma]
+        # NaN comparisons are False, so warm-up bars never signal
+        ema_sma_trend = all(a > b for a, b in zip(ema, ema[1:])) and all(a > b for a, b in zip(sma, sma[1:]))
+        retracement_stochas = values['%K'] <= 40 and values['%D'] <= 40
+        retracement_rsi = values['rsi'] <= 10
+        low_bar = adj_close > low
+        return ema_sma_trend and retracement_stochas and retracement_rsi and low_bar
+
+    def catch_up(self, df):
+        """
+        Function to feed every bar of df newer than the last one seen
+        Returns the values of the newest bar, or None if nothing was new
+        """
+        latest = None
+        first = 0 if self.last_date is None else df.index.searchsorted(self.last_date, side='right')
+        if first >= len(df):
+            return None
+        rows = df.iloc[first:]
+        columns = [rows[column].to_numpy().tolist() for column in ('High', 'Low', 'Close', 'Adj Close')]
+        for date, high, low, close, adj_close in zip(rows.index, *columns):
+            latest = self.update({'Date': date, 'High': high, 'Low': low, 'Close': close, 'Adj Close': adj_close})
+        return latest
+
+    def to_dict(self):
+        return {
+            'ticker': self.ticker,
+            'last_date': self.last_date.isoformat() if self.last_date is not None else None,
+            'bars': self.bars,
+            'ema': {str(p): ema.to_dict() for p, ema in self.ema.items()},
+            'sma': {str(p): sma.to_dict() for p, sma in self.sma.items()},
+            'rsi': self.rsi.to_dict(),
+            'highest_high': self.highest_high.to_dict(),
+            'lowest_low': self.lowest_low.to_dict(),
+            'd': self.d.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['ticker'])
+        obj.last_date = pd.Timestamp(state['last_date']) if state['last_date'] else None
+        obj.bars = state['bars']
+        obj.ema = {int(p): Ema.from_dict(s) for p, s in state['ema'].items()}
+        obj.sma = {int(p): RollingMean.from_dict(s) for p, s in state['sma'].items()}
+        obj.rsi = WilderRsi.from_dict(state['rsi'])
+        obj.highest_high = RollingExtreme.from_dict(state['highest_high'])
+        obj.lowest_low = RollingExtreme.from_dict(state['lowest_low'])
+        obj.d = RollingMean.from_dict(state['d'])
+        return obj
+
+
+def checkpoint_path(sector):
+    return os.path.join(ROOT_STORE_DIR, sector, 'indicator_state.json')
+
+
+def save_checkpoint(states, path):
+    """
+    Function to write {ticker: IndicatorState} to a JSON checkpoint
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({ticker: state.to_dict() for ticker, state in states.items()}, f)
+    os.replace(path + '.tmp', path)
+
+
+def load_checkpoint(path):
+    """
+    Function to read {ticker: IndicatorState} from a JSON checkpoint ({} if missing)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {ticker: IndicatorState.from_dict(state) for ticker, state in json.load(f).items()}
+
+
+def scan(states, data):
+    """
+    Function to bring every ticker's state up to date with data and flag new entries
+    - data: {ticker: DataFrame} as returned by get_stock_data
+    Returns {ticker: values of the newest bar} for tickers that received new bars
+    """
+    latest = {}
+    for ticker, df in data.items():
+        state = states.setdefault(ticker, IndicatorState(ticker))
+        values = state.catch_up(df)
+        if values is not None:
+            latest[ticker] = values
+    return latest
+
+
+if __name__ == "__main__":
+    # python streaming.py [sector]: update the checkpoint and list today's entries
+    from run_backtest import select_tickers, load_range
+
+    sector = sys.argv[1] if len(sys.argv) > 1 else 'HealthCare'
+    # The sector's own tickers, from its store or CSV folder, so its checkpoint
+    # only ever holds its own state
+    selected = select_tickers([sector])
+    if not selected:
+        sys.exit(f"{sector} has no data in the store or the CSV folder")
+    path = checkpoint_path(sector)
+    states = load_checkpoint(path)
+    data = load_range(selected)
+
+    start = time.perf_counter()
+    latest = scan(states, data)
+    elapsed = time.perf_counter() - start
+    save_checkpoint(states, path)
+
+    print(f"Updated {len(latest)} tickers in {elapsed * 1000:.1f}ms")
+    for ticker, values in latest.items():
+        if values['Entry Point']:
+            print(f"Entry point for {ticker} on {values['Date']:%Y-%m-%d}")
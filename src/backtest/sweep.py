@@ -0,0 +1,239 @@
+import sys
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from indicators import ema, sma, stochastics, wilder_rsi
+from trade_simulator import simulate_trades
+from backtest_bullish_entry import COMMS, DRAWDOWN_THRESHOLD, INITIAL_BALANCE, tickers, get_stock_data
+
+
+# Parameters of bullish_strategy / evaluate_strategy that can be swept.
+# Every value is a list of candidates; the sweep runs their full product.
+DEFAULT_GRID = {
+    'ema_periods': [(8, 21, 34)],
+    'sma_periods': [(50, 100, 200)],
+    'rsi_period': [2],
+    'rsi_threshold': [10],
+    'k_period': [8],
+    'd_period': [3],
+    'stoch_threshold': [40],
+    'max_hold_days': [14],
+}
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Adj Close']
+STAT_FIELDS = ['entries', 'wins', 'stops', 'total_pnl', 'log_growth']
+
+
+def expand_grid(grid):
+    """
+    Function to turn a parameter grid into a list of parameter dicts
+    - Missing keys take their value from DEFAULT_GRID
+    """
+    grid = {**DEFAULT_GRID, **grid}
+    keys = list(DEFAULT_GRID)
+    combos = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        combo = dict(zip(keys, values))
+        combo['ema_periods'] = tuple(combo['ema_periods'])
+        combo['sma_periods'] = tuple(combo['sma_periods'])
+        combos.append(combo)
+    return combos
+
+
+class IndicatorCache:
+    """
+    Indicator arrays of one ticker, each computed the first time it is asked for
+    """
+
+    def __init__(self, arrays, disk=None, ticker=None, fingerprint=None):
+        self.arrays = arrays
+        self.close = arrays['Close']
+        self.cache = {}
+        # Optional indicator_cache.DiskCache holding the series across runs, under
+        # the same names bullish_strategy's pipeline uses
+        self.disk = disk
+        self.ticker = ticker
+        self.fingerprint = fingerprint
+        # Rows bullish_strategy's dropna keeps depend on the price columns too
+        self.prices_valid = np.logical_and.reduce([~np.isnan(arrays[field].astype(np.float64)) for field in PRICE_FIELDS])
+        self.low_bar = arrays['Adj Close'] > arrays['Low']
+
+    def get(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def series(self, name, params, compute):
+        if self.disk is None:
+            return compute()
+        return self.disk.fetch(self.ticker, self.fingerprint, name, params, compute)
+
+    def ema(self, period):
+        return self.get(('ema', period), lambda: self.series('ema', (period,), lambda: ema(self.close, period)))
+
+    def sma(self, period):
+        return self.get(('sma', period), lambda: self.series('sma', (period,), lambda: sma(self.close, period)))
+
+    def rsi(self, period):
+        return self.get(('rsi', period), lambda: self.series('rsi', (period,), lambda: wilder_rsi(self.close, period)))
+
+    def stochastics(self, k_period, d_period):
+        def compute():
+            both = []
+            def compute_both(i):
+                if not both:
+                    both.extend(stochastics(self.arrays['High'], self.arrays['Low'], self.close, k_period, d_period))
+                return both[i]
+            params = (k_period, d_period)
+            return (self.series('stoch_k', params, lambda: compute_both(0)),
+                    self.series('stoch_d', params, lambda: compute_both(1)))
+        return self.get(('stoch', k_period, d_period), compute)
+
+    def stack_mask(self, kind, periods):
+        """
+        Function to return the mask of fast > ... > slow for an EMA or SMA stack
+        """
+        def compute():
+            series = [getattr(self, kind)(period) for period in periods]
+            return np.logical_and.reduce([a > b for a, b in zip(series, series[1:])])
+        return self.get(('stack', kind, periods), compute)
+
+    def stoch_mask(self, k_period, d_period, threshold):
+        def compute():
+            k, d = self.stochastics(k_period, d_period)
+            return (k <= threshold) & (d <= threshold)
+        return self.get(('stoch_mask', k_period, d_period, threshold), compute)
+
+    def rsi_mask(self, period, threshold):
+        return self.get(('rsi_mask', period, threshold), lambda: self.rsi(period) <= threshold)
+
+    def kept_rows(self, ema_periods, sma_periods, rsi_period):
+        """
+        Function to return the rows left after bullish_strategy's dropna and their prices
+        """
+        def compute():
+            valid = self.prices_valid.copy()
+            for period in ema_periods:
+                valid &= ~np.isnan(self.ema(period))
+            for period in sma_periods:
+                valid &= ~np.isnan(self.sma(period))
+            valid &= ~np.isnan(self.rsi(rsi_period))
+            return valid, self.arrays['Adj Close'][valid]
+        return self.get(('kept', ema_periods, sma_periods, rsi_period), compute)
+
+    def window_rows(self, ema_periods, sma_periods, rsi_period, rows):
+        """
+        Function to return kept_rows limited to the bars in the slice rows
+        """
+        def compute():
+            valid, _ = self.kept_rows(ema_periods, sma_periods, rsi_period)
+            valid = valid.copy()
+            valid[:rows.start] = False
+            valid[rows.stop:] = False
+            return valid, self.arrays['Adj Close'][valid]
+        return self.get(('window', ema_periods, sma_periods, rsi_period, rows.start, rows.stop), compute)
+
+
+def sweep_ticker(arrays, combos, comms=COMMS, drawdown_threshold=DRAWDOWN_THRESHOLD, rows=None, cache=None):
+    """
+    Function to evaluate every parameter combination on one ticker
+    - arrays: {column: NumPy array} of the ticker's prices
+    - rows: optional slice of bars to trade in; indicators still use the bars before it
+    - cache: IndicatorCache of arrays to reuse between calls
+    Returns a (len(combos), len(STAT_FIELDS)) float array
+    """
+    cache = cache or IndicatorCache(arrays)
+    stats = np.zeros((len(combos), len(STAT_FIELDS)))
+    for row, combo in enumerate(combos):
+        mask = (
+            cache.stack_mask('ema', combo['ema_periods'])
+            & cache.stack_mask('sma', combo['sma_periods'])
+            & cache.stoch_mask(combo['k_period'], combo['d_period'], combo['stoch_threshold'])
+            & cache.rsi_mask(combo['rsi_period'], combo['rsi_threshold'])
+            & cache.low_bar
+        )
+        if rows is None:
+            kept, prices = cache.kept_rows(combo['ema_periods'], combo['sma_periods'], combo['rsi_period'])
+        else:
+            kept, prices = cache.window_rows(combo['ema_periods'], combo['sma_periods'], combo['rsi_period'], rows)
+        entry_index = np.flatnonzero(mask[kept])
+        if len(entry_index) == 0:
+            continue
+
+        trades = simulate_trades(prices, entry_index, comms, drawdown_threshold, combo['max_hold_days'])
+        # Entries on the last bar have no exit and are left out of the statistics
+        trades = trades[trades['exit_index'] >= 0]
+        pnl = trades['pnl']
+        wins = pnl > 0
+        # Every trade compounds, losses too. A pnl at or below -1 (a total loss
+        # plus commission) wipes the balance out: clipped to -1, log growth -inf
+        with np.errstate(divide='ignore'):
+            log_growth = np.log1p(np.maximum(pnl, -1.0)).sum()
+        stats[row] = [len(pnl), wins.sum(), trades['stop_hit'].sum(), pnl.sum(), log_growth]
+    return stats
+
+
+def _sweep_task(arrays, combos):
+    return sweep_ticker(arrays, combos)
+
+
+def ticker_arrays(df):
+    return {field: df[field].to_numpy() for field in PRICE_FIELDS}
+
+
+def run_sweep(data, grid=None, max_workers=None):
+    """
+    Function to evaluate a parameter grid of the bullish strategy over many tickers
+    - data: {ticker: DataFrame} as returned by get_stock_data
+    - grid: {parameter: [values]} (see DEFAULT_GRID)
+    - max_workers: process pool size, 1 runs in this process
+    Returns one row per combination, best final balance first. final_balance
+    compounds every trade, losses included, so unlike evaluate_strategy's
+    reinvested winnings it can end below INITIAL_BALANCE.
+    """
+    combos = expand_grid(grid or {})
+    names = list(data)
+
+    if max_workers == 1:
+        per_ticker = [sweep_ticker(ticker_arrays(data[ticker]), combos) for ticker in names]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_sweep_task, ticker_arrays(data[ticker]), combos) for ticker in names]
+            per_ticker = [future.result() for future in futures]
+
+    totals = np.sum(per_ticker, axis=0) if per_ticker else np.zeros((len(combos), len(STAT_FIELDS)))
+    results = pd.DataFrame(combos)
+    for i, field in enumerate(STAT_FIELDS):
+        results[field] = totals[:, i]
+    results[['entries', 'wins', 'stops']] = results[['entries', 'wins', 'stops']].astype(int)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['win_rate'] = results['wins'] / results['entries']
+        results['avg_pnl'] = results['total_pnl'] / results['entries']
+    results['final_balance'] = INITIAL_BALANCE * np.exp(results['log_growth'])
+    results = results.drop(columns='log_growth')
+    return results.sort_values('final_balance', ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python sweep.py [max_workers]: sweep the entry points mentioned in bullish_strategy
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    data = get_stock_data(tickers)
+    grid = {
+        'ema_periods': [(8, 21, 34), (8, 21, 50), (8, 34, 50), (21, 34, 50)],
+        'sma_periods': [(50, 100, 200), (20, 50, 100)],
+        'rsi_period': [2, 3, 5],
+        'rsi_threshold': [5, 10, 20, 30],
+        'k_period': [8, 14],
+        'd_period': [3],
+        'stoch_threshold': [0.2, 0.4, 40],
+        'max_hold_days': [5, 10, 14],
+    }
+    start = time.perf_counter()
+    results = run_sweep(data, grid, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} combinations over {len(data)} tickers in {elapsed:.2f}s")
+    print(results.head(10).to_string())
@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import shutil
+import numpy as np
+
+from indicators import ema, sma
+from price_store import PRICE_COLUMNS, open_store
+
+
+TIMEFRAMES_MANIFEST = 'timeframes.json'
+# Earlier builds are removed once they are this old
+STALE_BUILD_SECONDS = 600
+# W: Monday to Sunday weeks, M: calendar months
+FREQS = ('W', 'M')
+# Higher-timeframe trend confirmation, as (freq, ema_periods, sma_periods): the
+# close is above the first average and each average above the next
+DEFAULT_CONFIRM = (('W', (8, 21), ()), ('M', (), (10,)))
+
+# Layout of the higher-timeframe bars of a sector store (src/store/<sector>/):
+# - timeframes-<stamp>/<freq>/ holds the same Date.npy / <column>.npy files as the
+#   daily store, one row per period and ticker; Date is the period's last daily
+#   bar, the day the bar is complete
+# - timeframes.json names that directory (data_dir), maps freq -> ticker ->
+#   [offset, length], and records the daily manifest's created stamp so a
+#   rebuilt store rebuilds them
+# Like price_store.write_store, each build writes a fresh directory and then
+# replaces the manifest, so builds in several processes never share a file.
+
+
+def period_keys(dates, freq):
+    """
+    Function to number the period each date falls in (consecutive periods differ by 1)
+    """
+    dates = np.asarray(dates)
+    if freq == 'W':
+        # 1970-01-01 was a Thursday, +3 starts the weeks on Monday
+        return (dates.astype('datetime64[D]').view('int64') + 3) // 7
+    if freq == 'M':
+        return dates.astype('datetime64[M]').view('int64')
+    raise ValueError(f"Unknown timeframe {freq!r}, expected one of {FREQS}")
+
+
+def period_starts(dates, freq, breaks=()):
+    """
+    Function to return the first row of every period of sorted daily dates
+    - breaks: extra rows that start a period (ticker offsets and ends in a store column)
+    """
+    keys = period_keys(dates, freq)
+    starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    breaks = np.asarray(breaks, dtype=np.int64)
+    return np.union1d(np.concatenate([[0], starts]), breaks[breaks < len(keys)]).astype(np.int64)
+
+
+def resample_arrays(dates, columns, freq, breaks=()):
+    """
+    Function to aggregate daily bars into weekly or monthly bars
+    - columns: {column: array} with any of PRICE_COLUMNS
+    Returns (period dates, {column: array}); each period is dated by its last daily bar
+    """
+    dates = np.asarray(dates)
+    if len(dates) == 0:
+        return dates[:0], {column: np.asarray(values)[:0] for column, values in columns.items()}
+    return _aggregate(dates, columns, period_starts(dates, freq, breaks))
+
+
+def _aggregate(dates, columns, starts):
+    ends = np.append(starts[1:], len(dates)) - 1
+    bars = {}
+    for column, values in columns.items():
+        values = np.asarray(values)
+        if column == 'Open':
+            bars[column] = values[starts]
+        elif column == 'High':
+            bars[column] = np.maximum.reduceat(values, starts)
+        elif column == 'Low':
+            bars[column] = np.minimum.reduceat(values, starts)
+        elif column == 'Volume':
+            bars[column] = np.add.reduceat(values, starts)
+        else:
+            # Close and Adj Close
+            bars[column] = values[ends]
+    return dates[ends], bars
+
+
+def write_timeframes(store, freqs=FREQS):
+    """
+    Function to derive the higher-timeframe bars of every ticker of a PriceStore
+    - One pass per freq over the whole store columns, tickers kept apart by
+      their offsets and ends
+    """
+    tickers = store.manifest['tickers']
+    # Tickers start and end periods: the spare rows between them never join one
+    breaks = [row for entry in tickers.values() for row in (entry['offset'], entry['offset'] + entry['length'])]
+    # The pid keeps builds running at once in several processes apart
+    data_dir = f"timeframes-{time.time_ns()}-{os.getpid()}"
+    manifest = {'store_created': store.manifest['created'], 'data_dir': data_dir, 'freqs': {}}
+    for freq in freqs:
+        if len(store.dates):
+            starts = period_starts(store.dates, freq, breaks)
+            dates, bars = _aggregate(store.dates, store.columns, starts)
+        else:
+            starts = np.empty(0, np.int64)
+            dates, bars = resample_arrays(store.dates, store.columns, freq)
+        freq_dir = os.path.join(store.store_dir, data_dir, freq)
+        os.makedirs(freq_dir)
+        # A period row belongs to the ticker whose rows it starts in
+        entries = {}
+        for ticker, entry in tickers.items():
+            first = int(np.searchsorted(starts, entry['offset'], 'left'))
+            last = int(np.searchsorted(starts, entry['offset'] + entry['length'], 'left'))
+            entries[ticker] = [first, last - first]
+        manifest['freqs'][freq] = entries
+        np.save(os.path.join(freq_dir, 'Date.npy'), dates)
+        for column in store.columns:
+            np.save(os.path.join(freq_dir, f"{column.replace(' ', '_')}.npy"), bars[column])
+
+    manifest_path = os.path.join(store.store_dir, TIMEFRAMES_MANIFEST)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    _remove_timeframe_dirs(store.store_dir, data_dir)
+    return manifest
+
+
+def _remove_timeframe_dirs(store_dir, keep):
+    # Earlier builds, and the <freq>/ folders of stores written before data_dir.
+    # Builds newer than STALE_BUILD_SECONDS are left alone: another process may
+    # be writing or about to open one
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name == keep or not os.path.isdir(path):
+            continue
+        if name in FREQS or (name.startswith('timeframes-')
+                             and time.time() - os.path.getmtime(path) > STALE_BUILD_SECONDS):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class TimeframeStore:
+    """
+    Memory-mapped higher-timeframe bars of one sector store, built on first use
+    """
+
+    def __init__(self, store, freqs=FREQS):
+        self.store = store
+        manifest_path = os.path.join(store.store_dir, TIMEFRAMES_MANIFEST)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        if (manifest is None or manifest['store_created'] != store.manifest['created']
+                or any(freq not in manifest['freqs'] for freq in freqs)):
+            manifest = write_timeframes(store, sorted(set(freqs) | set(manifest['freqs'] if manifest else ())))
+        self.manifest = manifest
+        self.arrays = {}
+        for freq in manifest['freqs']:
+            freq_dir = os.path.join(store.store_dir, manifest.get('data_dir', ''), freq)
+            dates = np.load(os.path.join(freq_dir, 'Date.npy'), mmap_mode='r')
+            columns = {column: np.load(os.path.join(freq_dir, f"{column.replace(' ', '_')}.npy"), mmap_mode='r')
+                       for column in store.manifest['columns']}
+            self.arrays[freq] = (dates, columns)
+
+    def bars(self, ticker, freq):
+        """
+        Function to return (period dates, {column: array}) views, or None when the
+        ticker's daily bars are not in the store or changed since it was built
+        """
+        entry = self.manifest['freqs'].get(freq, {}).get(ticker)
+        if entry is None or self.store.is_stale(ticker):
+            return None
+        dates, columns = self.arrays[freq]
+        rows = slice(entry[0], entry[0] + entry[1])
+        return dates[rows], {column: values[rows] for column, values in columns.items()}
+
+
+def align(period_dates, values, daily_dates):
+    """
+    Function to give every daily bar the value of the last period complete on that day
+    - A period is complete on its last daily bar, so no bar sees a later close
+    - Bars before the first complete period get the fill value of values' dtype
+      (NaN, or False for masks)
+    """
+    daily_dates = np.asarray(daily_dates).astype(np.asarray(period_dates).dtype)
+    fill = False if values.dtype == bool else np.nan
+    if len(values) == 0:
+        return np.full(len(daily_dates), fill)
+    idx = np.searchsorted(period_dates, daily_dates, 'right') - 1
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], fill)
+
+
+def trend_mask(close, ema_periods=(), sma_periods=()):
+    """
+    Function to flag bars whose close is above the first average and each average
+    above the next (False while any of them is still warming up)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    lines = [close] + [ema(close, period) for period in ema_periods] + [sma(close, period) for period in sma_periods]
+    mask = np.ones(len(close), dtype=bool)
+    for faster, slower in zip(lines, lines[1:]):
+        # NaN comparisons are False
+        mask &= faster > slower
+    return mask
+
+
+class TrendConfirmation:
+    """
+    Weekly / monthly trend conditions aligned back to daily bars
+    - rules: (freq, ema_periods, sma_periods) tuples, all of which must hold
+    - sectors: stores the higher-timeframe bars are read from; tickers that are
+      in none of them (or are stale) are resampled from their daily frame
+    The daily frame may be any date range: bars from the store cover the whole
+    history, so the first weeks of a range are not cut short.
+    """
+
+    def __init__(self, rules=DEFAULT_CONFIRM, sectors=(), store_dir=None):
+        self.rules = tuple((freq, tuple(emas), tuple(smas)) for freq, emas, smas in rules)
+        self.sectors = tuple(sectors)
+        self.store_dir = store_dir
+        self._timeframes = None
+
+    def __getstate__(self):
+        # Workers open the memory maps themselves
+        return {'rules': self.rules, 'sectors': self.sectors, 'store_dir': self.store_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state['rules'], state['sectors'], state['store_dir'])
+
+    @property
+    def timeframes(self):
+        if self._timeframes is None:
+            freqs = sorted({freq for freq, _, _ in self.rules})
+            self._timeframes = []
+            for sector in self.sectors:
+                store = open_store(sector, self.store_dir)
+                if store is not None:
+                    self._timeframes.append(TimeframeStore(store, freqs))
+        return self._timeframes
+
+    def prepare(self):
+        """
+        Function to open the stores' higher-timeframe bars, building any that are
+        missing or stale, so pool workers started afterwards only read them
+        """
+        return self.timeframes
+
+    def bars(self, ticker, df, freq):
+        for timeframes in self.timeframes:
+            stored = timeframes.bars(ticker, freq)
+            if stored is not None:
+                return stored
+        columns = {column: df[column].to_numpy() for column in PRICE_COLUMNS if column in df}
+        return resample_arrays(df.index.to_numpy(), columns, freq)
+
+    def mask(self, ticker, df):
+        """
+        Function to return a bool array over df's rows, True where every rule holds
+        """
+        daily_dates = df.index.to_numpy()
+        mask = np.ones(len(df), dtype=bool)
+        for freq, ema_periods, sma_periods in self.rules:
+            dates, bars = self.bars(ticker, df, freq)
+            mask &= align(dates, trend_mask(bars['Close'], ema_periods, sma_periods), daily_dates)
+        return mask
+
+
+if __name__ == "__main__":
+    # python timeframes.py [sector ...]: derive the weekly and monthly bars of the stores
+    for sector in sys.argv[1:] or ['HealthCare']:
+        store = open_store(sector)
+        if store is None:
+            print(f"{sector} has no store, run price_store.py {sector} first")
+            continue
+        start = time.perf_counter()
+        manifest = write_timeframes(store)
+        elapsed = time.perf_counter() - start
+        counts = ', '.join(f"{sum(length for _, length in entries.values())} {freq} bars"
+                           for freq, entries in manifest['freqs'].items())
+        print(f"Resampled {len(store.tickers)} {sector} tickers ({counts}) in {elapsed:.3f}s")
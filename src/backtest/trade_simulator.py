@@ -0,0 +1,73 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# One row per simulated trade
+TRADE_DTYPE = np.dtype([
+    ('entry_index', np.int64),   # bar of the entry
+    ('exit_index', np.int64),    # bar of the chosen exit, -1 when there was no bar to exit on
+    ('hold_days', np.int64),     # bars available after the end-of-data truncation
+    ('start_price', np.float64),
+    ('exit_price', np.float64),
+    ('pnl', np.float64),
+    ('stop_hit', np.bool_),
+    ('position', np.int8),       # 1 when the best exit was profitable
+])
+
+NO_PNL = -999  # PNL of an entry on the last bar, same sentinel as the original loop
+
+
+def simulate_trades(adj_close, entry_index, comms=0.008, drawdown_threshold=-0.10, max_hold_days=14):
+    """
+    Function to evaluate every entry at once over an Adj Close array
+    - Each entry looks at the next max_hold_days closes (fewer at the end of the data)
+    - The exit is the best close in that window, unless a new best close meets the
+      stop condition abs(pnl) > drawdown_threshold * start_price first, in which
+      case the trade stops there (same rule and order as evaluate_strategy)
+    Returns a TRADE_DTYPE structured array in entry order.
+    """
+    prices = np.asarray(adj_close, dtype=np.float64)
+    entry_index = np.asarray(entry_index, dtype=np.int64)
+    n_entries = len(entry_index)
+    result = np.zeros(n_entries, dtype=TRADE_DTYPE)
+    result['entry_index'] = entry_index
+    result['exit_index'] = -1
+    result['pnl'] = NO_PNL
+    result['exit_price'] = np.nan
+    if n_entries == 0:
+        return result
+
+    start_price = prices[entry_index]
+    result['start_price'] = start_price
+    hold_days = np.minimum(max_hold_days, len(prices) - entry_index - 1)
+    result['hold_days'] = hold_days
+    if max_hold_days <= 0:
+        return result
+
+    # Row k of the strided view is the window of closes after bar k; padding
+    # the tail with NaN lets entries near the end share the same view
+    padded = np.concatenate([prices[1:], np.full(max_hold_days, np.nan)])
+    windows = sliding_window_view(padded, max_hold_days)[entry_index]
+    in_window = np.arange(max_hold_days) < hold_days[:, None]
+
+    pnl = (windows - start_price[:, None]) / start_price[:, None] - comms
+    # Missing closes never beat the running best, as in the loop
+    pnl = np.where(in_window & ~np.isnan(pnl), pnl, -np.inf)
+
+    # A bar is a new best when it beats every earlier bar and the starting sentinel
+    best_before = np.maximum.accumulate(np.concatenate([np.full((n_entries, 1), float(NO_PNL)), pnl[:, :-1]], axis=1), axis=1)
+    new_best = (pnl > best_before) & in_window
+    stop = new_best & (np.abs(pnl) > drawdown_threshold * start_price[:, None])
+
+    stop_hit = stop.any(axis=1)
+    # argmax returns the first True / first maximum, matching the strict '>' of the loop
+    offset = np.where(stop_hit, stop.argmax(axis=1), pnl.argmax(axis=1))
+    has_exit = hold_days > 0
+
+    rows = np.arange(n_entries)
+    result['exit_index'] = np.where(has_exit, entry_index + 1 + offset, -1)
+    result['exit_price'] = np.where(has_exit, windows[rows, offset], np.nan)
+    result['pnl'] = np.where(has_exit, pnl[rows, offset], NO_PNL)
+    result['stop_hit'] = stop_hit & has_exit
+    result['position'] = result['pnl'] > 0
+    return result
@@ -0,0 +1,186 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from sweep import STAT_FIELDS, IndicatorCache, expand_grid, sweep_ticker, ticker_arrays
+from parallel_runner import pack_shared, release_shared, _attach_shared, _shared, _shared_frame
+from indicator_cache import DiskCache, fingerprint
+from backtest_bullish_entry import INITIAL_BALANCE, tickers, get_stock_data
+
+
+TRAIN_DAYS = 252
+TEST_DAYS = 63
+# Parameters chosen on a train window are the ones with the best value of this stat
+# (log growth compounds every trade, losses included)
+SELECT_BY = 'log_growth'
+
+# IndicatorCache per ticker, kept for every fold a worker runs
+_worker_caches = {}
+
+
+def make_folds(calendar, train_days=TRAIN_DAYS, test_days=TEST_DAYS, step=None, anchored=False):
+    """
+    Function to split a trading calendar into walk-forward folds
+    - train_days / test_days: window lengths in trading days
+    - step: days between fold starts (default: test_days, so test windows tile)
+    - anchored: train windows all start at the first date (expanding) instead of rolling
+    Returns [(train_start, train_end, test_start, test_end)] as half-open date ranges,
+    test_end is None for a window that runs to the last date
+    """
+    calendar = np.asarray(calendar)
+    step = step or test_days
+    folds = []
+    start = 0
+    while start + train_days < len(calendar):
+        train_start = calendar[0] if anchored else calendar[start]
+        test_start = start + train_days
+        test_stop = test_start + test_days
+        test_end = calendar[test_stop] if test_stop < len(calendar) else None
+        folds.append((train_start, calendar[test_start], calendar[test_start], test_end))
+        start += step
+    return folds
+
+
+def window_slice(dates, start, end):
+    """
+    Function to turn a half-open date range into a slice of one ticker's bars
+    """
+    first = np.searchsorted(dates, start)
+    last = len(dates) if end is None else np.searchsorted(dates, end)
+    return slice(int(first), int(last))
+
+
+def _ticker_cache(ticker, disk):
+    """
+    Function to return the worker's IndicatorCache for a ticker
+    Indicators cover the whole history once; every fold only picks its rows
+    """
+    if ticker not in _worker_caches:
+        df = _shared_frame(ticker)
+        arrays = ticker_arrays(df)
+        key = fingerprint(df) if disk is not None else None
+        _worker_caches[ticker] = (IndicatorCache(arrays, disk, ticker, key), df.index.to_numpy())
+    return _worker_caches[ticker]
+
+
+def _run_fold(fold, combos, disk=None):
+    """
+    Worker task: pick the best combination on the train window and evaluate it on the test window
+    Returns (chosen index, train stats of every combo, test stats of the chosen one)
+    """
+    train_start, train_end, test_start, test_end = fold
+    train = np.zeros((len(combos), len(STAT_FIELDS)))
+    for ticker in _shared['layout']['tickers']:
+        cache, dates = _ticker_cache(ticker, disk)
+        rows = window_slice(dates, train_start, train_end)
+        train += sweep_ticker(cache.arrays, combos, rows=rows, cache=cache)
+
+    chosen = int(np.argmax(train[:, STAT_FIELDS.index(SELECT_BY)]))
+    test = np.zeros(len(STAT_FIELDS))
+    for ticker in _shared['layout']['tickers']:
+        cache, dates = _ticker_cache(ticker, disk)
+        rows = window_slice(dates, test_start, test_end)
+        test += sweep_ticker(cache.arrays, [combos[chosen]], rows=rows, cache=cache)[0]
+    return chosen, train, test
+
+
+def _stats_columns(prefix, stats):
+    entries, wins, stops, total_pnl, log_growth = stats
+    return {
+        f'{prefix}_entries': int(entries),
+        f'{prefix}_win_rate': wins / entries if entries else np.nan,
+        f'{prefix}_avg_pnl': total_pnl / entries if entries else np.nan,
+        f'{prefix}_return': np.expm1(log_growth),
+    }
+
+
+def run_walkforward(data, grid=None, train_days=TRAIN_DAYS, test_days=TEST_DAYS, step=None,
+                    anchored=False, max_workers=None, cache=None):
+    """
+    Function to walk the bullish strategy forward over a sector
+    - data: {ticker: DataFrame} as returned by get_stock_data
+    - grid: {parameter: [values]} searched on every train window (see sweep.DEFAULT_GRID)
+    - train_days, test_days, step, anchored: fold layout (see make_folds)
+    - max_workers: process pool size, folds run in parallel
+    - cache: optional indicator_cache.DiskCache, so series computed by one worker,
+      one run or bullish_strategy are read back instead of recomputed
+    Returns (folds, stability): one row per fold with the chosen parameters and the
+    train and test statistics (return compounds every trade, losses included),
+    and a dict of aggregate stability metrics
+    """
+    combos = expand_grid(grid or {})
+    calendar = np.unique(np.concatenate([df.index.to_numpy() for df in data.values()]))
+    folds = make_folds(calendar, train_days, test_days, step, anchored)
+
+    blocks, layout = pack_shared(data)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_shared, initargs=(layout,)) as pool:
+            futures = [pool.submit(_run_fold, fold, combos, cache) for fold in folds]
+            results = [future.result() for future in futures]
+    finally:
+        release_shared(blocks)
+
+    rows = []
+    for number, (fold, (chosen, train, test)) in enumerate(zip(folds, results)):
+        train_start, train_end, test_start, test_end = fold
+        row = {
+            'fold': number,
+            'train_start': pd.Timestamp(train_start),
+            'train_end': pd.Timestamp(train_end),
+            'test_start': pd.Timestamp(test_start),
+            'test_end': pd.Timestamp(test_end) if test_end is not None else pd.NaT,
+            'combo': chosen,
+        }
+        row.update(combos[chosen])
+        row.update(_stats_columns('train', train[chosen]))
+        row.update(_stats_columns('test', test))
+        rows.append(row)
+    folds = pd.DataFrame(rows)
+    return folds, stability_metrics(folds)
+
+
+def stability_metrics(folds):
+    """
+    Function to summarize how well the chosen parameters hold out of sample
+    """
+    if folds.empty:
+        return {'folds': 0}
+    counts = folds['combo'].value_counts()
+    test_return = folds['test_return']
+    return {
+        'folds': len(folds),
+        'distinct_params': len(counts),
+        # Share of folds that picked the most common parameters
+        'modal_share': counts.iloc[0] / len(folds),
+        'test_return_mean': test_return.mean(),
+        'test_return_std': test_return.std(ddof=0),
+        'positive_test_folds': (test_return > 0).mean(),
+        # How much of the in-sample return survives out of sample, per fold on average
+        'train_test_gap': (folds['train_return'] - test_return).mean(),
+        'compounded_test_balance': INITIAL_BALANCE * np.prod(1 + test_return),
+    }
+
+
+if __name__ == "__main__":
+    # python walkforward.py [max_workers] [--anchored]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    max_workers = int(args[0]) if args else None
+    data = get_stock_data(tickers)
+    grid = {
+        'ema_periods': [(8, 21, 34), (8, 21, 50)],
+        'rsi_period': [2, 3],
+        'rsi_threshold': [5, 10, 20],
+        # %K / %D are 0-1 fractions, so thresholds of 20 or 40 would pass every bar
+        'stoch_threshold': [0.2, 0.4],
+        'max_hold_days': [5, 14],
+    }
+    start = time.perf_counter()
+    folds, stability = run_walkforward(data, grid, anchored='--anchored' in sys.argv,
+                                       max_workers=max_workers, cache=DiskCache())
+    elapsed = time.perf_counter() - start
+    print(f"{len(folds)} folds x {len(expand_grid(grid))} combinations over {len(data)} tickers in {elapsed:.2f}s")
+    print(folds.to_string())
+    for key, value in stability.items():
+        print(f"  {key}: {value}")
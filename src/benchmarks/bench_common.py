@@ -0,0 +1,36 @@
+import os
+import sys
+import glob
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'backtest'))
+
+from backtest_bullish_entry import ROOT_DATA_DIR, sector
+
+
+def sector_tickers():
+    """
+    Function to list every ticker that has a CSV in the sector folder
+    """
+    paths = glob.glob(os.path.join(ROOT_DATA_DIR, sector, '*_data_his.csv'))
+    return sorted(os.path.basename(p).replace('_data_his.csv', '') for p in paths)
+
+
+def time_samples(func, repeat=3):
+    """
+    Function to return the wall time of each of repeat calls
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_call(func, repeat=3):
+    """
+    Function to return the best wall time of repeat calls
+    """
+    return min(time_samples(func, repeat))
@@ -0,0 +1,112 @@
+import io
+import contextlib
+import numpy as np
+
+from bench_common import sector_tickers, time_call
+from trade_simulator import simulate_trades
+from backtest_bullish_entry import sector, get_stock_data_csv, bullish_strategy
+from exit_rules import StopLoss, ProfitTarget, TrailingStop, TimeExit, IndicatorExit, parse_exits
+
+
+SPECS = [
+    'time=14',
+    'stop=0.05,target=0.10,time=14',
+    'stop=0.05,trail=0.08,target=0.15,cross=EMA_8,time=20',
+]
+
+
+def quiet(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+def loop_exits(engine, arrays, entry_index):
+    """
+    Function to close every entry bar by bar in Python, the way a per-entry loop
+    would, as the reference for ExitEngine.run
+    Returns [(exit_index, exit_price, rule)] with (-1, nan, -1) when there is no bar to exit on
+    """
+    adj_close = np.asarray(arrays['Adj Close'], dtype=np.float64)
+    factor = adj_close / np.asarray(arrays['Close'], dtype=np.float64)
+    open_ = np.asarray(arrays['Open']) * factor
+    high = np.asarray(arrays['High']) * factor
+    low = np.asarray(arrays['Low']) * factor
+    n = len(adj_close)
+    results = []
+    for entry in entry_index:
+        start_price = adj_close[entry]
+        last = min(entry + engine.horizon, n - 1)
+        if last == entry:
+            results.append((-1, np.nan, -1))
+            continue
+        peak = start_price
+        exit_ = (last, adj_close[last], -1)
+        for bar in range(entry + 1, last + 1):
+            fired = None
+            for i, rule in enumerate(engine.rules):
+                if isinstance(rule, StopLoss):
+                    level = start_price * (1 - rule.pct)
+                    if low[bar] <= level:
+                        fired = (bar, min(level, open_[bar]), i)
+                elif isinstance(rule, ProfitTarget):
+                    level = start_price * (1 + rule.pct)
+                    if high[bar] >= level:
+                        fired = (bar, max(level, open_[bar]), i)
+                elif isinstance(rule, TrailingStop):
+                    level = peak * (1 - rule.pct)
+                    if low[bar] <= level:
+                        fired = (bar, min(level, open_[bar]), i)
+                elif isinstance(rule, TimeExit):
+                    if bar - entry == rule.days:
+                        fired = (bar, adj_close[bar], i)
+                elif isinstance(rule, IndicatorExit):
+                    fast, slow = arrays[rule.fast], arrays[rule.slow]
+                    if fast[bar] < slow[bar] and fast[bar - 1] >= slow[bar - 1]:
+                        fired = (bar, adj_close[bar], i)
+                if fired:
+                    break
+            if fired:
+                exit_ = fired
+                break
+            peak = max(peak, high[bar])
+        results.append(exit_)
+    return results
+
+
+def check(engine, inputs, trades):
+    # The engine must match the loop before timing means anything
+    for (arrays, entry_index), got in zip(inputs, trades):
+        expected = loop_exits(engine, arrays, entry_index)
+        for exit_index, price, rule, (want_index, want_price, want_rule) in zip(
+                got['exit_index'], got['exit_price'], got['rule'], expected):
+            if exit_index != want_index or rule != want_rule or not np.isclose(price, want_price, equal_nan=True):
+                raise SystemExit(f"Exit mismatch: {(exit_index, price, rule)} != {(want_index, want_price, want_rule)}")
+
+
+def run_specs(data, label):
+    inputs = []
+    for df in data.values():
+        entry_index = np.flatnonzero(df['Entry Point'].to_numpy() == 1)
+        inputs.append(({column: df[column].to_numpy() for column in df.columns}, entry_index))
+    n_entries = sum(len(entry_index) for _, entry_index in inputs)
+
+    print(f"{label}: {len(data)} {sector} tickers, {n_entries} entries")
+    print(f"  {'rules':<54}{'loop':>10}{'engine':>10}{'speedup':>9}")
+    for spec in SPECS:
+        engine = parse_exits(spec)
+        check(engine, inputs, [engine.run(arrays, entry_index) for arrays, entry_index in inputs])
+        loop = time_call(lambda: [loop_exits(engine, arrays, entry_index) for arrays, entry_index in inputs])
+        vectorized = time_call(lambda: [engine.run(arrays, entry_index) for arrays, entry_index in inputs])
+        print(f"  {spec:<54}{loop * 1000:>8.2f}ms{vectorized * 1000:>8.2f}ms{loop / vectorized:>8.1f}x")
+
+    # The original best-close exit on the same entries, for scale
+    best_close = time_call(lambda: [simulate_trades(arrays['Adj Close'], entry_index) for arrays, entry_index in inputs])
+    print(f"  {'best close (trade_simulator)':<54}{'':>10}{best_close * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    # python bench_exits.py: the strategy's entries, then every bar as an entry
+    data = quiet(lambda: bullish_strategy(get_stock_data_csv(sector_tickers())))
+    run_specs(data, 'Strategy entries')
+    dense = {ticker: df.assign(**{'Entry Point': 1}) for ticker, df in data.items()}
+    run_specs(dense, 'Every bar an entry')
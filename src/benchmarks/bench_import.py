@@ -0,0 +1,81 @@
+import os
+import sys
+import subprocess
+
+from bench_common import BASE_DIR
+
+
+BACKTEST_DIR = os.path.join(BASE_DIR, '..', 'backtest')
+DATA_DIR = os.path.join(BASE_DIR, '..', '..', 'data')
+# Most import time each headless entry point may add on top of `import pandas`, in ms
+IMPORT_BUDGETS = {
+    'backtest_bullish_entry': 75,
+    'run_backtest': 100,
+    'parallel_runner': 75,
+    'database_connect': 75,
+}
+# Loaded on first use only; importing any entry point above must not pull them in
+LAZY_MODULES = ['plotly', 'pymongo', 'bson', 'dotenv', 'cProfile', 'pstats']
+REPEAT = 5
+
+
+def import_profile(module):
+    """
+    Function to import a module in a fresh interpreter under python -X importtime
+    Returns (cumulative ms of the module, {top-level package: cumulative ms} of everything loaded)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKTEST_DIR, DATA_DIR]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=env, check=True)
+    # Lines look like "import time:  self [us] | cumulative | <indent>name"
+    loaded = {}
+    total = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        package = name.strip().split('.')[0]
+        loaded[package] = max(loaded.get(package, 0.0), int(cumulative) / 1000)
+        if name.strip() == module:
+            total = int(cumulative) / 1000
+    return total, loaded
+
+
+def best_import_time(module, repeat=REPEAT):
+    """
+    Function to return the best of repeat import times (ms) and the packages loaded
+    """
+    runs = [import_profile(module) for _ in range(repeat)]
+    return min(total for total, _ in runs), runs[0][1]
+
+
+def check_budgets(budgets=None, repeat=REPEAT):
+    """
+    Function to compare every entry point's import time with its budget
+    Returns (rows, failures) where rows are (module, ms, ms over pandas, budget, eager lazy modules)
+    """
+    budgets = budgets or IMPORT_BUDGETS
+    pandas_ms, _ = best_import_time('pandas', repeat)
+    rows = []
+    failures = []
+    for module, budget in budgets.items():
+        total, loaded = best_import_time(module, repeat)
+        eager = [name for name in LAZY_MODULES if name in loaded]
+        overhead = total - pandas_ms
+        rows.append((module, total, overhead, budget, eager))
+        if overhead > budget or eager:
+            failures.append(module)
+    return pandas_ms, rows, failures
+
+
+if __name__ == "__main__":
+    # python bench_import.py [repeat]: exits with status 1 when an entry point is over budget
+    # or imports plotly / pymongo eagerly
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else REPEAT
+    pandas_ms, rows, failures = check_budgets(repeat=repeat)
+    print(f"import pandas: {pandas_ms:.0f}ms (best of {repeat})")
+    for module, total, overhead, budget, eager in rows:
+        status = 'OK' if module not in failures else 'OVER'
+        note = f", imports {', '.join(eager)}" if eager else ''
+        print(f"  {module:<24}{total:>7.0f}ms  +{overhead:>4.0f}ms over pandas (budget {budget}ms)  {status}{note}")
+    sys.exit(1 if failures else 0)
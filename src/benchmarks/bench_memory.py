@@ -0,0 +1,64 @@
+import os
+import sys
+import resource
+import subprocess
+
+import legacy
+from bench_common import BASE_DIR, sector_tickers
+import numpy as np
+
+from backtest_bullish_entry import sector, get_stock_data_csv, calculate_rsi, bullish_strategy
+
+
+MODES = {
+    'copy chain': lambda data: legacy.bullish_strategy(data, calculate_rsi=calculate_rsi),
+    'pipeline': bullish_strategy,
+    'pipeline float32': lambda data: bullish_strategy(data, dtype=np.float32),
+}
+
+
+def tiled_data(n_tickers):
+    """
+    Function to load the sector and repeat it up to n_tickers independent frames
+    """
+    data = get_stock_data_csv(sector_tickers())
+    frames = list(data.values())
+    return {f'T{i}': frames[i % len(frames)].copy() for i in range(n_tickers)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, n_tickers):
+    """
+    Function to run one mode and return the peak RSS it added, in MB
+    Both the price frames and the result stay alive, as they do when a backtest
+    keeps its loaded data and hands bullish_strategy a copy of the dict
+    """
+    data = tiled_data(n_tickers)
+    before = peak_rss_mb()
+    result = MODES[mode](dict(data))
+    after = peak_rss_mb()
+    del result
+    return after - before
+
+
+if __name__ == "__main__":
+    # python bench_memory.py [n_tickers]
+    # Each mode runs in a fresh interpreter, since peak RSS never goes back down
+    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
+        mode, n_tickers = sys.argv[2], int(sys.argv[3])
+        print(measure(mode, n_tickers))
+        raise SystemExit
+
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    script = os.path.join(BASE_DIR, 'bench_memory.py')
+    print(f"bullish_strategy peak RSS, {n_tickers} tickers tiled from {sector}")
+    print(f"{'':<20}{'added':>12}{'per 1,000 tickers':>20}")
+    for mode in MODES:
+        output = subprocess.run([sys.executable, script, '--mode', mode, str(n_tickers)],
+                                capture_output=True, text=True, check=True).stdout
+        added = float(output.strip().splitlines()[-1])
+        print(f"{mode:<20}{added:>10.1f}MB{added * 1000 / n_tickers:>18.1f}MB")
@@ -0,0 +1,75 @@
+import os
+import sys
+import io
+import time
+import contextlib
+
+import pymongo
+import mongomock
+
+from bench_common import BASE_DIR, sector_tickers
+from backtest_bullish_entry import sector, get_stock_data_csv
+
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'data'))
+import database_connect
+
+
+def seed_collection(data, client):
+    """
+    Function to fill a scratch collection with the CSV rows in the Atlas document layout
+    """
+    collection = client["bench_sector_historical_data"]["ticker_data"]
+    collection.drop()
+    docs = []
+    fields = database_connect.PRICE_FIELDS
+    for ticker, df in data.items():
+        columns = [df[field].tolist() for field in fields]
+        for date, *values in zip(df.index.to_pydatetime(), *columns):
+            doc = {"TickerSymbol": ticker, "Sector": sector, "Date": date}
+            doc.update(zip(fields, values))
+            docs.append(doc)
+    collection.insert_many(docs)
+    database_connect.ensure_indexes(collection)
+    return collection, len(docs)
+
+
+if __name__ == "__main__":
+    # python bench_mongo_loader.py [n_tickers]
+    # Runs against a local mongod when BENCH_MONGO_URI is set (e.g. mongodb://localhost:27017),
+    # otherwise against an in-memory mongomock stand-in. mongomock copies the whole
+    # collection per query, so it defaults to a slice of the sector and skips the
+    # threaded mode, which it would serialize anyway.
+    uri = os.environ.get('BENCH_MONGO_URI')
+    client = pymongo.MongoClient(uri) if uri else mongomock.MongoClient()
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else (None if uri else 10)
+    csv_data = get_stock_data_csv(sector_tickers()[:n_tickers])
+    collection, n_rows = seed_collection(csv_data, client)
+    database_connect.ticker_collection = collection
+
+    quiet = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        old = database_connect.get_stock_data_sector(sector)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        new = database_connect.get_stock_data_sector_bulk(sector, collection=collection)
+    new_time = time.perf_counter() - start
+
+    timings = [('find per ticker', old_time), ('bulk cursor', new_time)]
+    loaded = [new]
+    if uri:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            threaded = database_connect.get_stock_data_sector_bulk(sector, collection=collection, concurrent=True)
+        timings.append(('threaded cursors', time.perf_counter() - start))
+        loaded.append(threaded)
+
+    for ticker, df in old.items():
+        if not all(df.equals(other[ticker]) for other in loaded):
+            raise SystemExit(f"Loader mismatch for {ticker}")
+
+    print(f"Mongo loader benchmark ({'mongod' if uri else 'mongomock'}), {len(old)} {sector} tickers, {n_rows} rows")
+    for name, elapsed in timings:
+        print(f"{name:<20}{elapsed:>8.2f}s{n_rows / elapsed:>12,.0f} rows/sec")
@@ -0,0 +1,27 @@
+import numpy as np
+
+import legacy
+from bench_common import sector_tickers, time_call
+from backtest_bullish_entry import sector, get_stock_data_csv, calculate_rsi
+
+
+if __name__ == "__main__":
+    data = get_stock_data_csv(sector_tickers())
+    ticker = 'LLY' if 'LLY' in data else next(iter(data))
+
+    # Both engines must agree bit for bit before timing means anything
+    for name, df in data.items():
+        old = legacy.calculate_rsi(df.copy()).to_numpy()
+        new = calculate_rsi(df).to_numpy()
+        if not np.array_equal(old, new, equal_nan=True):
+            raise SystemExit(f"RSI mismatch for {name}")
+
+    old_one = time_call(lambda: legacy.calculate_rsi(data[ticker].copy()))
+    new_one = time_call(lambda: calculate_rsi(data[ticker]))
+    old_all = time_call(lambda: [legacy.calculate_rsi(df.copy()) for df in data.values()], repeat=1)
+    new_all = time_call(lambda: [calculate_rsi(df) for df in data.values()])
+
+    print(f"RSI(2) benchmark, {len(data)} {sector} tickers")
+    print(f"{'':<22}{'per-row .loc':>14}{'wilder_rsi':>14}{'speedup':>10}")
+    print(f"{ticker + ' (1 ticker)':<22}{old_one * 1000:>12.2f}ms{new_one * 1000:>12.2f}ms{old_one / new_one:>9.0f}x")
+    print(f"{'full sector':<22}{old_all * 1000:>12.2f}ms{new_all * 1000:>12.2f}ms{old_all / new_all:>9.0f}x")
@@ -0,0 +1,44 @@
+import io
+import contextlib
+
+import legacy
+from bench_common import sector_tickers, time_call
+import numpy as np
+
+from trade_simulator import simulate_trades
+from backtest_bullish_entry import sector, get_stock_data_csv, bullish_strategy, evaluate_entries
+
+
+def quiet(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+if __name__ == "__main__":
+    data = quiet(lambda: bullish_strategy(get_stock_data_csv(sector_tickers())))
+    n_entries = sum(int(df['Entry Point'].sum()) for df in data.values())
+    ticker = max(data, key=lambda name: data[name]['Entry Point'].sum())
+
+    # The array simulator must reproduce the loop exactly before timing means anything
+    for name, df in data.items():
+        if not legacy.evaluate_entries(df).equals(quiet(lambda: evaluate_entries(df))):
+            raise SystemExit(f"Trade evaluation mismatch for {name}")
+
+    old_one = time_call(lambda: legacy.evaluate_entries(data[ticker]))
+    new_one = time_call(lambda: quiet(lambda: evaluate_entries(data[ticker])))
+    old_all = time_call(lambda: [legacy.evaluate_entries(df) for df in data.values()])
+    new_all = time_call(lambda: quiet(lambda: [evaluate_entries(df) for df in data.values()]))
+
+    # Engine alone on precomputed arrays, and a threshold the stop never meets so
+    # every entry scans its whole 14 day window
+    arrays = [(df['Adj Close'].to_numpy(), np.flatnonzero(df['Entry Point'].to_numpy() == 1)) for df in data.values()]
+    sim_all = time_call(lambda: [simulate_trades(prices, idx) for prices, idx in arrays])
+    old_full = time_call(lambda: [legacy.evaluate_entries(df, drawdown_threshold=10.0) for df in data.values()])
+    new_full = time_call(lambda: [simulate_trades(prices, idx, drawdown_threshold=10.0) for prices, idx in arrays])
+
+    print(f"Trade evaluation benchmark, {len(data)} {sector} tickers, {n_entries} entries")
+    print(f"{'':<22}{'iterrows/iloc':>14}{'simulator':>14}{'speedup':>10}")
+    print(f"{ticker + ' (1 ticker)':<22}{old_one * 1000:>12.2f}ms{new_one * 1000:>12.2f}ms{old_one / new_one:>9.1f}x")
+    print(f"{'full sector':<22}{old_all * 1000:>12.2f}ms{new_all * 1000:>12.2f}ms{old_all / new_all:>9.1f}x")
+    print(f"{'sector, engine only':<22}{old_all * 1000:>12.2f}ms{sim_all * 1000:>12.2f}ms{old_all / sim_all:>9.1f}x")
+    print(f"{'sector, full windows':<22}{old_full * 1000:>12.2f}ms{new_full * 1000:>12.2f}ms{old_full / new_full:>9.1f}x")
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+
+# Original implementations kept as the baseline for the benchmarks, verbatim
+# except where a docstring says otherwise
+
+def calculate_rsi(data, rsi_period=2):
+    """
+    Original per-row RSI (writes scratch columns into data)
+    """
+    df = data
+    df['change']  = df['Close'] - df['Close'].shift(1)
+    df['gain'] = np.where(df['change'] >= 0, df['change'], 0)
+    df['loss'] = np.where(df['change'] < 0, -1 * df['change'], 0)
+
+    #Initialize avg_gain and avg_loss
+    df['avg_gain'] = 0.0
+    df['avg_loss'] = 0.0
+
+    # Calculate the initial average gain and loss
+    df.loc[df.index[rsi_period], 'avg_gain'] = df['gain'].rolling(window=rsi_period).mean().iloc[rsi_period]
+    df.loc[df.index[rsi_period], 'avg_loss'] = df['loss'].rolling(window=rsi_period).mean().iloc[rsi_period]
+
+   # Apply Wilder's smoothing
+    for i in range(rsi_period + 1, len(df)):
+        df.loc[df.index[i], 'avg_gain'] = (df.loc[df.index[i-1], 'avg_gain'] * (rsi_period - 1) + df.loc[df.index[i], 'gain']) / rsi_period
+        df.loc[df.index[i], 'avg_loss'] = (df.loc[df.index[i-1], 'avg_loss'] * (rsi_period - 1) + df.loc[df.index[i], 'loss']) / rsi_period
+
+    df['rs'] = df['avg_gain'] / df['avg_loss']
+    df['rsi'] = 100 - (100 / (1 + df['rs']))
+    df.dropna()
+
+    return df['rsi']
+
+def evaluate_entries(df, comms=0.008, drawdown_threshold=-0.10, max_hold_days=14):
+    """
+    Original iterrows/iloc evaluation of one ticker's entry points, with one
+    change: the end-of-data truncation shortens a per-entry hold_days. The
+    original shrank max_hold_days itself, so every later entry kept the shorter
+    window; evaluate_entries fixed that, and the copy follows so bench_trades
+    can check both give the same trades
+    """
+    # Find entry points
+    entries = df[df['Entry Point'] == 1].copy()
+
+    # Calculate PNLs
+    entries['PNL'] = np.nan
+    entries['End date'] = pd.NaT
+
+    # Initalize tracking
+    entries['Position'] = 0
+    entries['Start Price'] = None
+    entries ['Stop Loss'] = None
+
+
+    for i, row in entries.iterrows():
+        start_price = row['Adj Close']
+        start_index = df.index.get_loc(i)
+
+        # Find the best PNL in a 14 day window
+        max_pnl = -999 #ludicrously low so it always gets overwritten
+        stop_loss = None
+
+         # check if there is a trade being identified at the end of the dataset
+        hold_days = max_hold_days
+        if start_index + hold_days >= len(df):
+            hold_days = len(df) - start_index - 1
+
+
+        for end_index in range(start_index + 1, start_index + hold_days + 1):
+            end_price = df.iloc[end_index]['Adj Close']
+            pnl = (end_price - start_price) / start_price - comms
+            if pnl > max_pnl:
+                max_pnl = pnl
+                max_end_date = df.index[end_index]
+
+                #Check stop loss 
+                if abs(pnl) > drawdown_threshold * start_price:
+                    stop_loss = end_price
+                    break
+
+        entries.at[i, 'PNL'] = max_pnl
+        entries.at[i, 'End date'] = max_end_date
+
+        #Manage Position
+        if max_pnl > 0: 
+            entries.at[i, 'Position'] = 1
+            entries.at[i, 'Start Price'] = start_price
+            entries.at[i, 'Stop Loss'] = stop_loss
+        else:
+            entries.at[i, 'Position'] = 0
+
+    return entries
+
+def calculate_ema(data, ema_periods):
+    """
+    Original EMA (copies the whole frame)
+    """
+    df = data.copy()
+    for period in ema_periods:
+        df[f'EMA_{period}'] = df['Close'].ewm(span=period, adjust=False).mean()
+    return df
+
+def calculate_sma(data, sma_periods):
+    """
+    Original SMA (copies the whole frame)
+    """
+    df = data.copy()
+    for period in sma_periods:
+        df[f'SMA_{period}'] = df['Close'].rolling(window=period).mean()
+    return df
+
+def bullish_strategy(data, calculate_rsi=calculate_rsi):
+    """
+    Original bullish_strategy chain: two frame copies, RSI added in place, dropna copy
+    - calculate_rsi: pass the current one to leave the per-row RSI loop out of timings
+    """
+    for ticker in data:
+        df = data[ticker]
+
+        df = calculate_ema(df, [8, 21, 34])
+        df = calculate_sma(df, [50,100, 200])
+
+        bullish_rsi = calculate_rsi(df)
+        df['rsi'] = bullish_rsi
+        highest_high = df['High'].rolling(window=8).max()
+        lowest_low = df['Low'].rolling(window=8).min()
+        k = ((df['Close'] - lowest_low) / (highest_high - lowest_low))
+        d = k.rolling(window=3).mean()
+
+        ema_sma_trend_mask = (
+            (df['EMA_8'] > df['EMA_21']) &
+            (df['EMA_21'] > df['EMA_34']) &
+            (df['SMA_50'] > df['SMA_100']) &
+            (df['SMA_100'] > df['SMA_200'])
+        )
+        retracement_stochas_mask = (k <= 40) & (d <= 40)
+        retracement_rsi_mask = bullish_rsi <= 10
+        low_bar_mask = df['Adj Close'] > df['Low']
+
+        single_mask =  ema_sma_trend_mask & retracement_stochas_mask & retracement_rsi_mask  & low_bar_mask
+        df['Entry Point'] = np.where(single_mask, 1, 0)
+        df = df.dropna()
+        data[ticker] = df
+
+    return data
@@ -0,0 +1,274 @@
+import io
+import os
+import sys
+import json
+import platform
+import argparse
+import datetime
+import contextlib
+import subprocess
+import statistics
+
+from bench_common import BASE_DIR, sector_tickers, time_samples
+from synthetic import write_synthetic_csvs
+from bench_import import import_profile
+import backtest_bullish_entry as backtest
+
+
+HISTORY_PATH = os.path.join(BASE_DIR, 'results', 'history.json')
+SYNTHETIC_DIR = os.path.join(BASE_DIR, 'synthetic')
+# A benchmark fails when its best time is this much slower than its baseline
+THRESHOLD = 0.25
+# The baseline is the median best time of this many previous runs
+BASELINE_RUNS = 5
+# mongomock copies the collection on every query, so the loader runs on a slice
+MONGO_TICKERS = 10
+
+
+def quiet(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+@contextlib.contextmanager
+def csv_source(root_dir, sector):
+    """
+    Function to point get_stock_data_csv at another CSV folder for the duration
+    """
+    saved = backtest.ROOT_DATA_DIR, backtest.sector
+    backtest.ROOT_DATA_DIR, backtest.sector = root_dir, sector
+    try:
+        yield
+    finally:
+        backtest.ROOT_DATA_DIR, backtest.sector = saved
+
+
+class Context:
+    """
+    Inputs shared by the benchmarks, built the first time each is needed
+    - dataset: 'bundled' (the HealthCare CSVs) or 'synthetic:<tickers>:<years>'
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        if dataset == 'bundled':
+            self.root_dir, self.sector = backtest.ROOT_DATA_DIR, backtest.sector
+            self.tickers = sector_tickers()
+        else:
+            _, n_tickers, years = dataset.split(':')
+            self.sector = f'SYN_{int(n_tickers)}x{float(years):g}'
+            self.root_dir = SYNTHETIC_DIR
+            self.tickers = write_synthetic_csvs(SYNTHETIC_DIR, self.sector, int(n_tickers), float(years))
+        self._data = None
+        self._strategy = None
+        self._panel = None
+        self._mongo = None
+
+    def load(self):
+        with csv_source(self.root_dir, self.sector):
+            return quiet(lambda: backtest.get_stock_data_csv(self.tickers))
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.load()
+        return self._data
+
+    @property
+    def strategy(self):
+        if self._strategy is None:
+            self._strategy = backtest.bullish_strategy(dict(self.data))
+        return self._strategy
+
+    @property
+    def panel(self):
+        """
+        Dates x tickers panel of the data with its bullish_strategy_panel matrices
+        """
+        if self._panel is None:
+            from panel import Panel, bullish_strategy_panel
+            panel = Panel.from_frames(self.data)
+            self._panel = (panel, bullish_strategy_panel(panel))
+        return self._panel
+
+    @property
+    def mongo(self):
+        """
+        Scratch mongomock collection holding the first MONGO_TICKERS tickers
+        """
+        if self._mongo is None:
+            import mongomock
+            from bench_mongo_loader import seed_collection
+            subset = {ticker: self.data[ticker] for ticker in list(self.data)[:MONGO_TICKERS]}
+            collection, _ = seed_collection(subset, mongomock.MongoClient())
+            # seed_collection tags documents with the bundled sector name
+            self._mongo = (collection, backtest.sector)
+        return self._mongo
+
+
+def bench_load(ctx):
+    ctx.load()
+
+
+def bench_ema(ctx):
+    for df in ctx.data.values():
+        backtest.calculate_ema(df, [8, 21, 34])
+
+
+def bench_sma(ctx):
+    for df in ctx.data.values():
+        backtest.calculate_sma(df, [50, 100, 200])
+
+
+def bench_rsi(ctx):
+    for df in ctx.data.values():
+        backtest.calculate_rsi(df)
+
+
+def bench_stochastics(ctx):
+    for df in ctx.data.values():
+        backtest.calculate_stochastics(df)
+
+
+def bench_strategy(ctx):
+    backtest.bullish_strategy(dict(ctx.data))
+
+
+def bench_evaluate(ctx):
+    quiet(lambda: backtest.evaluate_strategy(ctx.strategy))
+
+
+def bench_score(ctx):
+    from scoring import score_panel
+    panel, out = ctx.panel
+    score_panel(panel, out=out)
+
+
+def bench_mongo(ctx):
+    collection, sector = ctx.mongo
+    import database_connect  # on sys.path once bench_mongo_loader is imported
+    quiet(lambda: database_connect.get_stock_data_sector_bulk(sector, collection=collection))
+
+
+def bench_import(ctx):
+    # A fresh interpreter importing the backtest, as each CLI run or spawned worker does
+    import_profile('backtest_bullish_entry')
+
+
+# (name, benchmark, untimed setup building the inputs it needs)
+BENCHMARKS = [
+    ('get_stock_data_csv', bench_load, lambda ctx: None),
+    ('calculate_ema', bench_ema, lambda ctx: ctx.data),
+    ('calculate_sma', bench_sma, lambda ctx: ctx.data),
+    ('calculate_rsi', bench_rsi, lambda ctx: ctx.data),
+    ('calculate_stochastics', bench_stochastics, lambda ctx: ctx.data),
+    ('bullish_strategy', bench_strategy, lambda ctx: ctx.data),
+    ('evaluate_strategy', bench_evaluate, lambda ctx: ctx.strategy),
+    ('score_top_n', bench_score, lambda ctx: ctx.panel),
+    ('mongo_bulk_loader', bench_mongo, lambda ctx: ctx.mongo),
+    ('import_backtest', bench_import, lambda ctx: None),
+]
+
+
+def machine_id():
+    return f"{platform.node()}|{platform.machine()}|py{platform.python_version()}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(history, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def baseline(history, dataset, name, runs=BASELINE_RUNS):
+    """
+    Function to return the median best time of the last runs of a benchmark on
+    this machine and dataset, or None without history
+    """
+    machine = machine_id()
+    times = [run['results'][name]['best'] for run in history
+             if run['machine'] == machine and run['dataset'] == dataset and name in run['results']]
+    return statistics.median(times[-runs:]) if times else None
+
+
+def run_suite(dataset='bundled', names=None, repeat=3, threshold=THRESHOLD, history_path=HISTORY_PATH, record=True):
+    """
+    Function to run the benchmarks, compare them with their history and record the run
+    Returns (run, regressions) where regressions lists the benchmarks slower than
+    their baseline by more than threshold
+    """
+    ctx = Context(dataset)
+    history = load_history(history_path)
+    results = {}
+    regressions = []
+    print(f"Benchmarks on {dataset} ({len(ctx.tickers)} tickers)")
+    print(f"{'':<24}{'best':>10}{'median':>10}{'baseline':>10}{'change':>9}")
+    for name, func, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        try:
+            setup(ctx)
+        except ImportError as e:
+            print(f"{name:<24}skipped ({e})")
+            continue
+        # One untimed call warms imports, allocator and file caches
+        func(ctx)
+        samples = time_samples(lambda: func(ctx), repeat)
+        best = min(samples)
+        results[name] = {'best': best, 'median': statistics.median(samples), 'repeat': repeat}
+        base = baseline(history, dataset, name)
+        change = '' if base is None else f"{best / base - 1:+.0%}"
+        regressed = base is not None and best > base * (1 + threshold)
+        if regressed:
+            regressions.append(name)
+        base_text = '' if base is None else f"{base * 1000:.1f}ms"
+        print(f"{name:<24}{best * 1000:>8.1f}ms{results[name]['median'] * 1000:>8.1f}ms{base_text:>10}{change:>9}"
+              f"{'  REGRESSED' if regressed else ''}")
+
+    run = {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'machine': machine_id(),
+        'dataset': dataset,
+        'results': results,
+    }
+    if record:
+        save_history(history + [run], history_path)
+    return run, regressions
+
+
+if __name__ == "__main__":
+    # python suite.py [--dataset bundled|synthetic:5000:30] [--only name ...] [--repeat 3]
+    #                 [--threshold 0.25] [--no-record]
+    # Exits with status 1 when a benchmark regressed past the threshold
+    parser = argparse.ArgumentParser(description='Backtest hot path benchmarks')
+    parser.add_argument('--dataset', default='bundled')
+    parser.add_argument('--only', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-record', action='store_true', help='compare without adding this run to the history')
+    args = parser.parse_args()
+
+    run, regressions = run_suite(args.dataset, args.only, args.repeat, args.threshold, args.history,
+                                 record=not args.no_record)
+    if regressions:
+        print(f"Regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from bench_common import BASE_DIR
+
+
+BARS_PER_YEAR = 252
+# Last bar of every synthetic history
+END_DATE = '2024-12-31'
+
+
+def synthetic_ticker(rng, n_bars, end=END_DATE):
+    """
+    Function to generate one ticker's daily bars in the *_data_his.csv layout
+    - Close follows a geometric random walk with a per-ticker drift and volatility
+    - Open gaps from the previous close, High/Low wrap Open and Close
+    - Adj Close is Close times a slowly falling dividend factor
+    """
+    drift = rng.normal(0.0003, 0.0004)
+    vol = rng.uniform(0.01, 0.03)
+    close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(drift, vol, n_bars)))
+    open_ = np.empty(n_bars)
+    open_[0] = close[0]
+    open_[1:] = close[:-1] * (1 + rng.normal(0, vol / 3, n_bars - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, vol / 2, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, vol / 2, n_bars)))
+    adj_factor = np.exp(-np.arange(n_bars)[::-1] * rng.uniform(0, 0.0002))
+    volume = rng.integers(100_000, 10_000_000, n_bars)
+    dates = pd.bdate_range(end=end, periods=n_bars, name='Date')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'Adj Close': close * adj_factor,
+    }, index=dates)
+
+
+def synthetic_sector(n_tickers, years, seed=0):
+    """
+    Function to yield (ticker, DataFrame) for a synthetic sector one ticker at a
+    time, so 5,000 tickers x 30 years never has to fit in memory at once
+    """
+    rng = np.random.default_rng(seed)
+    n_bars = int(years * BARS_PER_YEAR)
+    for i in range(n_tickers):
+        yield f'SYN{i:05d}', synthetic_ticker(rng, n_bars)
+
+
+def write_synthetic_csvs(root_dir, sector, n_tickers, years, seed=0):
+    """
+    Function to write a synthetic sector as <root_dir>/<sector>/<ticker>_data_his.csv
+    (the layout get_stock_data_csv reads). Existing files are kept, so a
+    generated sector is reused by later runs.
+    Returns the tickers
+    """
+    sector_dir = os.path.join(root_dir, sector)
+    os.makedirs(sector_dir, exist_ok=True)
+    names = []
+    for ticker, df in synthetic_sector(n_tickers, years, seed):
+        path = os.path.join(sector_dir, f'{ticker}_data_his.csv')
+        if not os.path.exists(path):
+            df.to_csv(path)
+        names.append(ticker)
+    return names
+
+
+if __name__ == "__main__":
+    # python synthetic.py n_tickers years [out_dir]: write a synthetic sector of CSVs
+    n_tickers = int(sys.argv[1])
+    years = float(sys.argv[2])
+    out_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(BASE_DIR, 'synthetic')
+    start = time.perf_counter()
+    names = write_synthetic_csvs(out_dir, f'SYN_{n_tickers}x{years:g}', n_tickers, years)
+    print(f"Wrote {len(names)} tickers x {int(years * BARS_PER_YEAR)} bars to {out_dir} "
+          f"in {time.perf_counter() - start:.1f}s")